@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AuthorityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authority'
-    verbose_name = '用户认证与授权'
\ No newline at end of file
+    verbose_name = '用户认证与授权'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""异步只读接口的基础设施
+
+DRF 的 APIView 只能同步执行，在 ASGI 下每个请求都要切换到同步线程。
+这里为热点只读接口提供轻量的异步视图装饰器：
+
+- JWT 认证和权限检查以异步方式执行，令牌声明模式下不访问数据库；
+- 错误响应的格式与 DRF 的默认异常处理一致；
+- 响应体由 DRF 的 JSONRenderer 渲染，与对应的同步接口逐字节一致。
+"""
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import ClaimsJWTAuthentication
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+renderer = JSONRenderer()
+
+
+def render(data, status=200):
+    """按 DRF 的 JSON 格式渲染响应"""
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def drf_request(request):
+    """为序列化器、分页器构造 DRF Request，沿用已认证的用户"""
+    wrapped = Request(request)
+    wrapped.user = request.user
+    wrapped.auth = request.auth
+    return wrapped
+
+
+def error_response(exc, authenticator):
+    """与 DRF 默认异常处理相同的错误响应"""
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = render(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.status_code = 401
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request=None)
+    return response
+
+
+async def authenticate(request, authenticator):
+    result = await authenticator.aauthenticate(request)
+    if result is None:
+        request.user, request.auth = AnonymousUser(), None
+    else:
+        request.user, request.auth = result
+
+
+async def check_permissions(request, permissions):
+    for permission in permissions:
+        if hasattr(permission, 'ahas_permission'):
+            allowed = await permission.ahas_permission(request, None)
+        else:
+            allowed = permission.has_permission(request, None)
+        if not allowed:
+            if request.auth is None:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+
+def async_api_view(permissions=None):
+    """异步只读视图装饰器，permissions 为权限实例列表，默认要求登录"""
+    def decorator(func):
+        @wraps(func)
+        async def view(request, *args, **kwargs):
+            authenticator = ClaimsJWTAuthentication()
+            try:
+                if request.method not in SAFE_METHODS:
+                    raise exceptions.MethodNotAllowed(request.method)
+                await authenticate(request, authenticator)
+                await check_permissions(request, permissions or [IsAuthenticated()])
+                return await func(request, *args, **kwargs)
+            except Http404 as exc:
+                return error_response(exceptions.NotFound(*exc.args), authenticator)
+            except exceptions.APIException as exc:
+                return error_response(exc, authenticator)
+        return view
+    return decorator
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('users/me/', async_views.me, name='async-user-me'),
+    path('menus/user_menus/', async_views.user_menus, name='async-menu-user-menus'),
+]
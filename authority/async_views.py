@@ -0,0 +1,24 @@
+"""用户信息和菜单的异步只读接口，挂载在 /api/async/auth/ 下，输出与同步接口一致"""
+from asgiref.sync import sync_to_async
+
+from .async_api import async_api_view, render
+from .authentication import aresolve_user
+from .menus import aget_menu_tree
+from .roles import aget_role_access
+from .serializers import UserSerializer
+
+
+@async_api_view()
+async def me(request):
+    """获取当前用户信息"""
+    user = await aresolve_user(request.user)
+    data = await sync_to_async(lambda: UserSerializer(user).data)()
+    return render(data)
+
+
+@async_api_view()
+async def user_menus(request):
+    """获取当前用户可访问的菜单，按角色集合缓存"""
+    user = request.user
+    role_ids = [] if user.is_superuser else (await aget_role_access(request)).role_ids
+    return render(await aget_menu_tree(role_ids, user.is_superuser))
@@ -0,0 +1,216 @@
+"""基于令牌声明的 JWT 认证
+
+登录和刷新令牌时把用户的 id、用户名、is_staff、is_superuser 和角色名称写入令牌。
+只读请求直接用这些声明构造轻量的 ClaimsUser，不再为了 ``request.user`` 查询用户表；
+写请求以及确实需要完整用户模型的代码，通过短时间的进程内缓存获取 User 实例。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.async_cache import aget, aset
+from .roles import get_user_role_access
+
+User = get_user_model()
+
+USER_CACHE_ALIAS = 'local'
+
+
+def _user_cache_key(user_id):
+    return f'authority:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """通过短时间的进程内缓存获取用户模型，不存在时返回 None"""
+    cache = caches[USER_CACHE_ALIAS]
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            cache.set(key, user, getattr(settings, 'AUTHORITY_USER_CACHE_TTL', 30))
+    return user
+
+
+async def aget_cached_user(user_id):
+    """get_cached_user 的异步版本"""
+    cache = caches[USER_CACHE_ALIAS]
+    key = _user_cache_key(user_id)
+    user = await aget(cache, key)
+    if user is None:
+        user = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is not None:
+            await aset(cache, key, user, getattr(settings, 'AUTHORITY_USER_CACHE_TTL', 30))
+    return user
+
+
+def invalidate_cached_user(user_id):
+    caches[USER_CACHE_ALIAS].delete(_user_cache_key(user_id))
+
+
+def add_user_claims(token, user):
+    """把用户身份信息写入令牌"""
+    token['username'] = user.get_username()
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token['roles'] = sorted(get_user_role_access(user.pk).role_names)
+    return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """带有用户身份声明的刷新令牌，由其生成的访问令牌会继承这些声明"""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+
+class ClaimsUser:
+    """根据令牌声明构造的轻量用户
+
+    提供权限判断常用的属性；访问其他属性时会加载完整的用户模型（走短时缓存），
+    因此对只读接口来说可以透明替代 User。需要把用户赋值给外键等场景请使用
+    ``resolve_user(request.user)`` 获取真正的模型实例。
+    """
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.token = token
+        self.id = self.pk = token[api_settings.USER_ID_CLAIM]
+        self.username = token.get('username', '')
+        self.is_staff = token.get('is_staff', False)
+        self.is_superuser = token.get('is_superuser', False)
+        self.role_names = frozenset(token.get('roles', ()))
+        self._model = None
+
+    def __str__(self):
+        return self.username
+
+    def __eq__(self, other):
+        if isinstance(other, (ClaimsUser, User)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def get_username(self):
+        return self.username
+
+    @property
+    def model(self):
+        """完整的用户模型实例"""
+        if self._model is None:
+            self._model = get_cached_user(self.pk)
+            if self._model is None:
+                raise AuthenticationFailed('用户不存在', code='user_not_found')
+        return self._model
+
+    def __getattr__(self, name):
+        # 只有在实例属性和类属性中都找不到时才会调用，回退到完整用户模型
+        if name.startswith('__') or name in ('token', '_model'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def resolve_user(user):
+    """把 ClaimsUser 转换为完整的用户模型，其他用户对象原样返回"""
+    if isinstance(user, ClaimsUser):
+        return user.model
+    return user
+
+
+async def aresolve_user(user):
+    """resolve_user 的异步版本"""
+    if isinstance(user, ClaimsUser):
+        if user._model is None:
+            user._model = await aget_cached_user(user.pk)
+        return user.model
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """只读请求不查询用户表的 JWT 认证
+
+    ``AUTHORITY_STATELESS_JWT`` 为 False，或令牌中没有身份声明（旧令牌），
+    或请求方法会修改数据时，行为与 JWTAuthentication 相同。
+    注意：声明模式下用户被禁用后，已签发的访问令牌在过期前仍可用于只读请求。
+    """
+
+    def _validate(self, request):
+        """解析并校验令牌（不访问数据库），返回 (令牌, 声明用户或 None)"""
+        header = self.get_header(request)
+        if header is None:
+            return None, None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None, None
+
+        validated_token = self.get_validated_token(raw_token)
+        if (
+            getattr(settings, 'AUTHORITY_STATELESS_JWT', True)
+            and request.method in SAFE_METHODS
+            and 'username' in validated_token
+        ):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise AuthenticationFailed('令牌中没有可识别的用户标识', code='bad_token')
+            return validated_token, ClaimsUser(validated_token)
+        return validated_token, None
+
+    def authenticate(self, request):
+        validated_token, user = self._validate(request)
+        if validated_token is None:
+            return None
+        return user or self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        """异步视图使用的认证，声明模式下完全不访问数据库"""
+        validated_token, user = self._validate(request)
+        if validated_token is None:
+            return None
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+        return user, validated_token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """刷新令牌时重新读取用户信息并写入最新的身份声明"""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+        add_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # 未安装 token_blacklist 应用
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
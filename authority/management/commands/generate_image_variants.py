@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.images import IMAGE_KINDS, generate_variants
+
+
+def _init_worker():
+    # spawn 方式启动的子进程需要重新初始化 Django；fork 方式下为空操作
+    django.setup()
+
+
+def _process(item):
+    kind, pk, force = item
+    return kind, generate_variants(kind, pk, force)
+
+
+class Command(BaseCommand):
+    help = '为已有的头像和商品图片生成各尺寸的 WebP 衍生图（多进程并行，只处理缺少或已过期的图片）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=sorted(IMAGE_KINDS), help='图片类别，可重复，默认全部')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='工作进程数，默认 CPU 核数')
+        parser.add_argument('--force', action='store_true', help='重新生成全部图片的衍生图')
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or sorted(IMAGE_KINDS)
+        items = [
+            (kind, pk, options['force'])
+            for kind in kinds
+            for pk in IMAGE_KINDS[kind].pending_ids(options['force'])
+        ]
+        if not items:
+            self.stdout.write(self.style.SUCCESS('没有需要处理的图片'))
+            return
+
+        processes = max(1, min(options['processes'], len(items)))
+        self.stdout.write(f'共 {len(items)} 张图片，使用 {processes} 个进程')
+        # 子进程不能复用父进程的数据库连接
+        connections.close_all()
+        start = time.perf_counter()
+        images = files = 0
+        with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+            for done, (kind, count) in enumerate(pool.imap_unordered(_process, items, chunksize=8), 1):
+                images += bool(count)
+                files += count
+                if done % 100 == 0 or done == len(items):
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'  {done}/{len(items)}  {done / elapsed:.1f} 张/秒', ending='\r')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'已为 {images} 张图片生成 {files} 个衍生图，耗时 {elapsed:.1f}s（{len(items) / elapsed:.1f} 张/秒）'
+        ))
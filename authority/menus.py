@@ -0,0 +1,99 @@
+"""用户菜单树缓存
+
+一次加载全部菜单及菜单-角色关联，在内存中按角色过滤并组装菜单树。
+结果按用户角色集合缓存，同一组角色的用户共享同一份菜单树；
+菜单、角色或菜单-角色关联变更时更新缓存版本号，使旧缓存全部失效；
+版本号保存在数据库中（``CacheVersion``），所有工作进程同时失效。
+"""
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core.async_cache import aget, aset
+
+from .models import Menu
+from .versions import aget_versions, bump_versions, get_versions
+
+MENU_CACHE_VERSION_KEY = 'authority:menus'
+
+# 与 MenuSerializer 输出的字段保持一致
+MENU_NODE_FIELDS = ('id', 'name', 'path', 'component', 'icon', 'sort_order', 'is_visible')
+
+
+def build_menu_tree(role_ids, is_superuser=False):
+    """构建指定角色可访问的菜单树
+
+    - 超级管理员可以看到所有可见菜单；
+    - 顶级菜单需要与用户角色有交集；
+    - 子菜单未单独分配角色时继承父菜单的可见性，分配了角色时同样需要有交集；
+    - 不可见的菜单及其子菜单都不返回。
+    """
+    role_ids = set(role_ids)
+    rows = Menu.objects.order_by('sort_order', 'id').values(*MENU_NODE_FIELDS, 'parent_id')
+    menu_roles = defaultdict(set)
+    for menu_id, role_id in Menu.roles.through.objects.values_list('menu_id', 'role_id'):
+        menu_roles[menu_id].add(role_id)
+
+    nodes = {}
+    children = defaultdict(list)
+    roots = []
+    for row in rows:
+        parent_id = row.pop('parent_id')
+        nodes[row['id']] = row
+        if parent_id is None:
+            roots.append(row)
+        else:
+            children[parent_id].append(row)
+
+    def allowed(node, is_root):
+        if not node['is_visible']:
+            return False
+        if is_superuser:
+            return True
+        assigned = menu_roles.get(node['id'])
+        if not assigned:
+            return not is_root
+        return bool(assigned & role_ids)
+
+    def attach(node):
+        node['children'] = [attach(child) for child in children.get(node['id'], ()) if allowed(child, False)]
+        return node
+
+    return [attach(node) for node in roots if allowed(node, True)]
+
+
+def get_menu_cache_version():
+    return get_versions(MENU_CACHE_VERSION_KEY)[0]
+
+
+def _menu_cache_key(version, role_ids, is_superuser):
+    role_key = 'all' if is_superuser else ','.join(str(role_id) for role_id in sorted(set(role_ids)))
+    return f'authority:menus:{version}:{role_key}'
+
+
+def get_menu_tree(role_ids, is_superuser=False):
+    """获取菜单树，按排序后的角色ID缓存"""
+    key = _menu_cache_key(get_menu_cache_version(), role_ids, is_superuser)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_menu_tree(role_ids, is_superuser)
+        cache.set(key, tree, getattr(settings, 'AUTHORITY_MENU_CACHE_TIMEOUT', 3600))
+    return tree
+
+
+async def aget_menu_tree(role_ids, is_superuser=False):
+    """get_menu_tree 的异步版本，缓存未命中时才访问数据库"""
+    version, = await aget_versions(MENU_CACHE_VERSION_KEY)
+    key = _menu_cache_key(version, role_ids, is_superuser)
+    tree = await aget(cache, key)
+    if tree is None:
+        tree = await sync_to_async(build_menu_tree)(role_ids, is_superuser)
+        await aset(cache, key, tree, getattr(settings, 'AUTHORITY_MENU_CACHE_TIMEOUT', 3600))
+    return tree
+
+
+def invalidate_menus():
+    """更新缓存版本号，使所有菜单树缓存失效"""
+    bump_versions(MENU_CACHE_VERSION_KEY)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authority', '0002_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='键')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+            ],
+            options={
+                'verbose_name': '缓存版本',
+                'verbose_name_plural': '缓存版本',
+            },
+        ),
+    ]
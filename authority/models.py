@@ -28,6 +28,7 @@ class User(AbstractUser):
     """自定义用户模型"""
     nickname = models.CharField(_('昵称'), max_length=50, blank=True)
     avatar = models.ImageField(_('头像'), upload_to='avatars/', blank=True, null=True)
+    avatar_variants = models.JSONField(_('头像衍生图'), default=dict, blank=True, editable=False)
     phone = models.CharField(_('手机号'), max_length=20, blank=True)
     bio = models.TextField(_('个人简介'), blank=True)
     roles = models.ManyToManyField(
@@ -80,4 +81,16 @@ class Menu(models.Model):
         ordering = ['sort_order']
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class CacheVersion(models.Model):
+    """缓存版本号，数据变更时加一；保存在数据库中，各进程使用进程内缓存时也能同时失效"""
+    key = models.CharField(_('键'), max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(_('版本号'), default=0)
+
+    class Meta:
+        verbose_name = _('缓存版本')
+        verbose_name_plural = _('缓存版本')
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .roles import get_role_access, aget_role_access
+
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """对象所有者或管理员权限"""
@@ -43,11 +45,38 @@ class HasRolePermission(permissions.BasePermission):
             return True
             
         # 检查用户是否拥有所需角色
-        user_roles = request.user.roles.all()
-        user_role_names = [role.name for role in user_roles]
-        
-        for role_name in self.required_roles:
-            if role_name in user_role_names:
-                return True
-                
-        return False
\ No newline at end of file
+        return get_role_access(request).has_any_role(self.required_roles)
+
+    async def ahas_permission(self, request, view):
+        """异步视图使用的权限检查"""
+        if not request.user or not request.user.is_authenticated:
+            return False
+        if request.user.is_superuser or not self.required_roles:
+            return True
+        return (await aget_role_access(request)).has_any_role(self.required_roles)
+
+
+class HasRolePerms(permissions.BasePermission):
+    """基于角色所授予的权限代码（app_label.codename）控制访问"""
+    
+    def __init__(self, required_perms=None):
+        self.required_perms = required_perms or []
+    
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+            
+        if request.user.is_superuser:
+            return True
+            
+        access = get_role_access(request)
+        return all(access.has_perm(perm) for perm in self.required_perms)
+
+    async def ahas_permission(self, request, view):
+        """异步视图使用的权限检查"""
+        if not request.user or not request.user.is_authenticated:
+            return False
+        if request.user.is_superuser:
+            return True
+        access = await aget_role_access(request)
+        return all(access.has_perm(perm) for perm in self.required_perms)
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""用户角色与权限解析
+
+一次性加载用户的有效角色名称和权限代码，保存在当前请求上供所有权限类复用，
+并通过缓存在请求之间共享。缓存键中带有全局版本号和用户版本号：
+角色或角色权限变更时更新全局版本号，用户角色变更时更新该用户的版本号。
+版本号保存在数据库中（``CacheVersion``），撤销角色后所有工作进程立即生效。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+from core.async_cache import aget, aset
+from .models import Role
+from .versions import aget_versions, bump_versions, get_versions
+
+ROLE_ACCESS_VERSION_KEY = 'authority:access'
+REQUEST_ATTR = '_role_access'
+
+
+class RoleAccess:
+    """用户的有效角色和权限"""
+    __slots__ = ('role_ids', 'role_names', 'permissions')
+
+    def __init__(self, role_ids=(), role_names=(), permissions=()):
+        self.role_ids = frozenset(role_ids)
+        self.role_names = frozenset(role_names)
+        self.permissions = frozenset(permissions)
+
+    def __getstate__(self):
+        return (self.role_ids, self.role_names, self.permissions)
+
+    def __setstate__(self, state):
+        self.role_ids, self.role_names, self.permissions = state
+
+    def has_any_role(self, role_names):
+        return not self.role_names.isdisjoint(role_names)
+
+    def has_perm(self, perm):
+        """perm 格式为 ``app_label.codename``"""
+        return perm in self.permissions
+
+
+EMPTY_ACCESS = RoleAccess()
+
+
+def load_role_access(user_id):
+    """从数据库加载用户的有效角色和权限（两次查询）"""
+    roles = list(Role.objects.filter(users__id=user_id, is_active=True).values_list('id', 'name'))
+    role_ids = [role_id for role_id, _ in roles]
+    permissions = []
+    if role_ids:
+        permissions = [
+            f'{app_label}.{codename}'
+            for app_label, codename in Permission.objects.filter(role__id__in=role_ids)
+            .values_list('content_type__app_label', 'codename').distinct()
+        ]
+    return RoleAccess(role_ids, [name for _, name in roles], permissions)
+
+
+def _user_version_key(user_id):
+    return f'{ROLE_ACCESS_VERSION_KEY}:user:{user_id}'
+
+
+def _access_key(user_id, versions):
+    global_version, user_version = versions
+    return f'authority:access:{user_id}:{global_version}:{user_version}'
+
+
+def _role_cache_timeout():
+    return getattr(settings, 'AUTHORITY_ROLE_CACHE_TIMEOUT', 600)
+
+
+def get_user_role_access(user_id):
+    """获取用户的有效角色和权限，优先读取缓存"""
+    key = _access_key(user_id, get_versions(ROLE_ACCESS_VERSION_KEY, _user_version_key(user_id)))
+    access = cache.get(key)
+    if access is None:
+        access = load_role_access(user_id)
+        cache.set(key, access, _role_cache_timeout())
+    return access
+
+
+def get_role_access(request):
+    """获取当前请求用户的有效角色和权限，同一请求内只解析一次"""
+    # DRF 的 Request 与 Django 的 HttpRequest 共用同一份结果
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, REQUEST_ATTR, None)
+    if access is None:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            access = EMPTY_ACCESS
+        else:
+            access = get_user_role_access(user.pk)
+        setattr(http_request, REQUEST_ATTR, access)
+    return access
+
+
+async def aget_user_role_access(user_id):
+    """get_user_role_access 的异步版本，缓存未命中时才访问数据库"""
+    key = _access_key(user_id, await aget_versions(ROLE_ACCESS_VERSION_KEY, _user_version_key(user_id)))
+    access = await aget(cache, key)
+    if access is None:
+        access = await sync_to_async(load_role_access)(user_id)
+        await aset(cache, key, access, _role_cache_timeout())
+    return access
+
+
+async def aget_role_access(request):
+    """get_role_access 的异步版本"""
+    access = getattr(request, REQUEST_ATTR, None)
+    if access is None:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            access = EMPTY_ACCESS
+        else:
+            access = await aget_user_role_access(user.pk)
+        setattr(request, REQUEST_ATTR, access)
+    return access
+
+
+def invalidate_all_role_access():
+    """角色或角色权限变更时，使所有用户的缓存失效"""
+    bump_versions(ROLE_ACCESS_VERSION_KEY)
+
+
+def invalidate_user_role_access(user_ids):
+    """用户角色变更时，使这些用户的缓存失效"""
+    bump_versions(*(_user_version_key(user_id) for user_id in user_ids))
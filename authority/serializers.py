@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from core.images import VariantURLsField
 from .models import Role, Menu
 
 User = get_user_model()
@@ -38,10 +39,11 @@ class UserSerializer(serializers.ModelSerializer):
         required=False,
         source='roles'
     )
+    avatar_urls = VariantURLsField(source='avatar_variants')
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'nickname', 'avatar', 'phone', 'bio', 
+        fields = ['id', 'username', 'email', 'nickname', 'avatar', 'avatar_urls', 'phone', 'bio', 
                   'is_active', 'date_joined', 'last_login', 'roles', 'role_ids']
         read_only_fields = ['id', 'date_joined', 'last_login']
 
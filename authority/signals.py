@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.images import IMAGE_KINDS
+from .models import Role, Menu
+from .menus import invalidate_menus
+from .roles import invalidate_all_role_access, invalidate_user_role_access
+from .authentication import invalidate_cached_user
+from .tasks import avatar_variants
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=Role)
+@receiver(m2m_changed, sender=Menu.roles.through)
+def menus_changed(sender, **kwargs):
+    """菜单、角色或菜单-角色关联变更后清除菜单树缓存"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        invalidate_menus()
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_access_changed(sender, **kwargs):
+    """角色或角色权限变更后清除所有用户的角色缓存"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        invalidate_all_role_access()
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """用户角色变更后清除相关用户的角色缓存"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user_role_access([instance.pk])
+    elif pk_set:
+        invalidate_user_role_access(pk_set)
+    else:
+        # 从角色一侧 clear() 时拿不到受影响的用户
+        invalidate_all_role_access()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    """用户信息变更后清除进程内的用户缓存"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def avatar_changed(sender, instance, **kwargs):
+    """上传或更换头像后提交生成衍生图的任务"""
+    if not IMAGE_KINDS['avatar'].is_current(instance):
+        avatar_variants.enqueue({'user_id': instance.pk}, dedup_key=f'authority.avatar_variants:{instance.pk}')
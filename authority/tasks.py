@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+
+from core.images import generate_variants
+from jobs.queue import task
+
+User = get_user_model()
+
+
+@task('authority.record_login', priority=-10)
+def record_login(user_id, ip):
+    """记录最后登录IP"""
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        user.last_login_ip = ip
+        user.save(update_fields=['last_login_ip'])
+
+
+@task('authority.avatar_variants')
+def avatar_variants(user_id):
+    """生成头像的各尺寸衍生图"""
+    generate_variants('avatar', user_id)
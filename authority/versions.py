@@ -0,0 +1,43 @@
+"""数据库中的缓存版本号
+
+角色权限、菜单树等缓存的键中带有版本号，数据变更时版本号加一，旧的缓存不再被使用。
+版本号不放在缓存里：默认的缓存是进程内缓存，写操作只能清除本进程的缓存，
+其他工作进程会继续使用已撤销的角色。读取版本号只需一次主键查询。
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+def _versions(rows, keys):
+    versions = dict(rows)
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def get_versions(*keys):
+    """读取版本号，尚未更新过的键为 0"""
+    return _versions(CacheVersion.objects.filter(key__in=keys).values_list('key', 'version'), keys)
+
+
+async def aget_versions(*keys):
+    rows = [row async for row in CacheVersion.objects.filter(key__in=keys).values_list('key', 'version')]
+    return _versions(rows, keys)
+
+
+def _bump(keys):
+    updated = CacheVersion.objects.filter(key__in=keys).update(version=F('version') + 1)
+    if updated < len(keys):
+        # 第一次更新的键（如用户的版本号）在这里补建
+        CacheVersion.objects.bulk_create([CacheVersion(key=key, version=1) for key in keys], ignore_conflicts=True)
+
+
+def bump_versions(*keys):
+    """版本号加一；在 atomic 块中时于事务提交后执行，不在写事务中持有版本号行的锁"""
+    keys = tuple(dict.fromkeys(keys))
+    if not keys:
+        return
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(keys))
+    else:
+        _bump(keys)
@@ -2,8 +2,11 @@ from django.contrib.auth import get_user_model, authenticate
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import ClaimsRefreshToken, resolve_user
 from .models import Role, Menu
+from .menus import get_menu_tree
+from .roles import get_role_access
+from .tasks import record_login
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserLoginSerializer,
     PasswordChangeSerializer, UserProfileUpdateSerializer,
@@ -53,15 +56,14 @@ class UserViewSet(viewsets.ModelViewSet):
 
         user = authenticate(username=username, password=password)
         if user:
-            refresh = RefreshToken.for_user(user)
-            # 更新最后登录IP
+            refresh = ClaimsRefreshToken.for_user(user)
+            # 最后登录IP由后台任务写库，不阻塞登录请求
             x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
             if x_forwarded_for:
                 ip = x_forwarded_for.split(',')[0]
             else:
                 ip = request.META.get('REMOTE_ADDR')
-            user.last_login_ip = ip
-            user.save(update_fields=['last_login_ip'])
+            record_login.enqueue({'user_id': user.pk, 'ip': ip})
 
             return Response({
                 'refresh': str(refresh),
@@ -79,7 +81,7 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """获取当前用户信息"""
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(resolve_user(request.user))
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
@@ -122,19 +124,7 @@ class MenuViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def user_menus(self, request):
-        """获取当前用户可访问的菜单"""
+        """获取当前用户可访问的菜单，按角色集合缓存"""
         user = request.user
-        if user.is_superuser:
-            # 超级管理员可以访问所有菜单
-            menus = Menu.objects.filter(parent=None, is_visible=True).order_by('sort_order')
-        else:
-            # 普通用户根据角色获取菜单
-            user_roles = user.roles.all()
-            menus = Menu.objects.filter(
-                parent=None,
-                is_visible=True,
-                roles__in=user_roles
-            ).distinct().order_by('sort_order')
-
-        serializer = self.get_serializer(menus, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        role_ids = [] if user.is_superuser else get_role_access(request).role_ids
+        return Response(get_menu_tree(role_ids, user.is_superuser))
\ No newline at end of file
@@ -0,0 +1 @@
+# 性能基准脚本，使用独立的 SQLite 数据库运行，不会影响开发数据库
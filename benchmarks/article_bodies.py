@@ -0,0 +1,94 @@
+"""对比正文内联存储与压缩分表存储
+
+    python -m benchmarks.article_bodies --articles 2000 --rows 100
+
+先按当前结构生成数据，然后把 wiki 迁移回 0005（正文写回 wiki_article.content），
+测量“迁移前”的存储大小和列表查询耗时；再执行 0006 迁移（正文压缩移入 ArticleBody）
+并测量“迁移后”。列表查询与 ORM 加载整行文章（后台变更列表、get_object）相同，
+即 ``SELECT * FROM wiki_article ... LIMIT n``。
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import setup, measure, print_table
+
+WORDS = (
+    '知识库', '文章', '分类', '标签', '评论', '附件', '用户', '角色', '权限', '菜单', '缓存', '索引',
+    '数据库', '查询', '接口', '部署', '配置', '性能', '优化', '文档', '发布', '归档', '检索', '统计',
+    'Django', 'MySQL', 'API', 'JSON', 'HTTP', 'Python', 'nginx', 'Redis',
+)
+
+
+def populate(count, paragraphs):
+    from authority.models import User
+    from wiki.models import Article, ArticleBody, Category
+
+    rng = random.Random(42)
+    author = User.objects.create_user('author', password='x')
+    category = Category.objects.create(name='分类')
+
+    def body():
+        lines = []
+        for _ in range(paragraphs):
+            lines.append('，'.join(''.join(rng.choices(WORDS, k=rng.randint(3, 8))) for _ in range(6)) + '。')
+        return '\n\n'.join(lines)
+
+    articles = Article.objects.bulk_create([
+        Article(title=f'文章标题{i}', summary='摘要' * 20, content=body(),
+                category=category, author=author, status='published')
+        for i in range(count)
+    ])
+    ArticleBody.objects.bulk_create([ArticleBody.from_text(article, article.content) for article in articles])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=2000, help='生成的文章数')
+    parser.add_argument('--paragraphs', type=int, default=20, help='每篇正文的段落数')
+    parser.add_argument('--rows', type=int, default=100, help='每页行数')
+    parser.add_argument('--iterations', type=int, default=50, help='重复查询的次数')
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+
+    populate(args.articles, args.paragraphs)
+    list_sql = (
+        "SELECT * FROM wiki_article WHERE status = 'published' "
+        "ORDER BY is_pinned DESC, created_at DESC, id LIMIT %d" % args.rows
+    )
+
+    def fetch_page():
+        with connection.cursor() as cursor:
+            cursor.execute(list_sql)
+            return cursor.fetchall()
+
+    def scalar(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0] or 0
+
+    rows = []
+    call_command('migrate', 'wiki', '0005', verbosity=0)
+    inline_bytes = scalar('SELECT SUM(LENGTH(CAST(content AS BINARY))) FROM wiki_article'
+                          if connection.vendor == 'mysql' else
+                          'SELECT SUM(LENGTH(CAST(content AS BLOB))) FROM wiki_article')
+    pages_per_second, latency = measure(fetch_page, args.iterations, warmup=3)
+    rows.append(('内联 TEXT（迁移前）', inline_bytes, f'{latency:.2f}', f'{pages_per_second * args.rows:.0f}'))
+
+    start = time.perf_counter()
+    call_command('migrate', 'wiki', '0006', verbosity=0)
+    migrate_seconds = time.perf_counter() - start
+    stored_bytes = scalar('SELECT SUM(stored_size) FROM wiki_articlebody')
+    pages_per_second, latency = measure(fetch_page, args.iterations, warmup=3)
+    rows.append(('压缩分表（迁移后）', stored_bytes, f'{latency:.2f}', f'{pages_per_second * args.rows:.0f}'))
+
+    print(f'{args.articles} 篇文章，每篇 {args.paragraphs} 段，每页 {args.rows} 行；'
+          f'迁移 0006 耗时 {migrate_seconds:.2f}s，正文压缩到 {stored_bytes / inline_bytes:.1%}')
+    print_table(('存储方式', '正文字节数', '列表每页耗时(ms)', '行/秒'), rows)
+
+
+if __name__ == '__main__':
+    main()
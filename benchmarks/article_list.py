@@ -0,0 +1,81 @@
+"""对比文章列表的序列化方式
+
+    python -m benchmarks.article_list --articles 2000 --rows 100
+
+- serializer：原 ArticleListSerializer，逐行查询作者、分类和标签
+- serializer+prefetch：同一序列化器配合 select_related/prefetch_related
+- plan：values() + 一次标签查询 + 预编译字段计划（ArticleViewSet.list 当前使用的方式）
+
+同时校验三种方式渲染出的 JSON 逐字节一致。
+"""
+import argparse
+import random
+
+from benchmarks.utils import setup, measure, count_queries, print_table
+
+
+def populate(count):
+    from authority.models import User
+    from wiki.models import Article, ArticleBody, Category, Tag
+
+    rng = random.Random(42)
+    authors = [User.objects.create_user(f'author{i}', password='x', nickname=f'作者{i}') for i in range(20)]
+    categories = [Category.objects.create(name=f'分类{i}') for i in range(20)]
+    tags = [Tag.objects.create(name=f'标签{i}') for i in range(50)]
+    articles = Article.objects.bulk_create([
+        Article(
+            title=f'文章标题{i}', summary='摘要' * 20, content='正文内容' * 500,
+            category=rng.choice(categories), author=rng.choice(authors), status='published',
+        )
+        for i in range(count)
+    ])
+    ArticleBody.objects.bulk_create([ArticleBody.from_text(article, article.content) for article in articles])
+    through = Article.tags.through
+    links = []
+    for article in articles:
+        for tag in rng.sample(tags, rng.randint(0, 5)):
+            links.append(through(article_id=article.pk, tag_id=tag.pk))
+    through.objects.bulk_create(links)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=2000, help='生成的文章数')
+    parser.add_argument('--rows', type=int, default=100, help='每页行数')
+    parser.add_argument('--iterations', type=int, default=50, help='每种方式重复的次数')
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from wiki.listing import article_list_plan
+    from wiki.models import Article
+    from wiki.serializers import ArticleListSerializer
+
+    populate(args.articles)
+    base = Article.objects.filter(status='published').order_by('-is_pinned', '-created_at', 'id')
+    renderer = JSONRenderer()
+
+    def plain():
+        return renderer.render(ArticleListSerializer(base[:args.rows], many=True).data)
+
+    def prefetched():
+        queryset = base.select_related('author', 'category').prefetch_related('tags')[:args.rows]
+        return renderer.render(ArticleListSerializer(queryset, many=True).data)
+
+    def plan():
+        return renderer.render(article_list_plan.serialize(article_list_plan.queryset(base)[:args.rows]))
+
+    outputs = {plain(), prefetched(), plan()}
+    assert len(outputs) == 1, '三种方式的输出不一致'
+
+    rows = []
+    for name, func in (('serializer', plain), ('serializer+prefetch', prefetched), ('plan', plan)):
+        pages_per_second, latency = measure(func, args.iterations, warmup=3)
+        rows.append((name, f'{pages_per_second * args.rows:.0f}', f'{latency:.2f}', count_queries(func)))
+
+    print(f'{args.articles} 篇文章，每页 {args.rows} 行，输出逐字节一致')
+    print_table(('方式', '行/秒', '每页耗时(ms)', 'SQL查询数'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""对比同步视图与异步视图在 ASGI / WSGI 下的并发吞吐量
+
+    python -m benchmarks.async_views --requests 400 --concurrency 32
+
+在进程内直接调用 ``core.asgi.application`` 和 ``core.wsgi.application``，不经过网络：
+
+- asgi：与 uvicorn 相同的调用方式，单个事件循环上并发 ``concurrency`` 个请求；
+- wsgi：与多线程 WSGI 服务器（如 gunicorn gthread）相同，``concurrency`` 个线程各自处理请求。
+
+每个接口分别请求同步路由（/api/...）和异步路由（/api/async/...），
+请求头带令牌声明模式的 JWT，缓存预热后再计时。
+"""
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.utils import setup, print_table
+
+ENDPOINTS = (
+    ('文章列表', '/api/wiki/articles/', '/api/async/wiki/articles/'),
+    ('文章详情', '/api/wiki/articles/{article}/', '/api/async/wiki/articles/{article}/'),
+    ('分类树', '/api/wiki/categories/all/', '/api/async/wiki/categories/all/'),
+    ('标签列表', '/api/wiki/tags/', '/api/async/wiki/tags/'),
+    ('当前用户', '/api/auth/users/me/', '/api/async/auth/users/me/'),
+    ('用户菜单', '/api/auth/menus/user_menus/', '/api/async/auth/menus/user_menus/'),
+)
+
+
+def populate(count):
+    from authority.authentication import ClaimsRefreshToken
+    from authority.models import User, Role, Menu
+    from wiki.models import Article, ArticleBody, Category, Tag
+
+    role = Role.objects.create(name='editor')
+    user = User.objects.create_user('bench', password='bench')
+    user.roles.add(role)
+    for i in range(10):
+        menu = Menu.objects.create(name=f'菜单{i}', path=f'/menu{i}')
+        menu.roles.add(role)
+
+    category = Category.objects.create(name='分类')
+    for i in range(10):
+        Category.objects.create(name=f'子分类{i}', parent=category)
+    tags = [Tag.objects.create(name=f'标签{i}') for i in range(20)]
+    articles = Article.objects.bulk_create([
+        Article(title=f'文章{i}', summary='摘要', content='正文' * 200, category=category,
+                author=user, status='published')
+        for i in range(count)
+    ])
+    ArticleBody.objects.bulk_create([ArticleBody.from_text(article, article.content) for article in articles])
+    Article.tags.through.objects.bulk_create([
+        Article.tags.through(article_id=article.pk, tag_id=tags[article.pk % len(tags)].pk) for article in articles
+    ])
+    return str(ClaimsRefreshToken.for_user(user).access_token), articles[0].pk
+
+
+def asgi_get(app, path, token):
+    """按 ASGI 协议调用应用，返回状态码"""
+    url = urlsplit(path)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+        'query_string': url.query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    done = asyncio.Event()
+    sent_body = False
+    status = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # 与服务器一样，响应结束后才报告连接断开
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    async def call():
+        await app(scope, receive, send)
+        return status[0]
+
+    return call()
+
+
+def wsgi_get(app, path, token):
+    url = urlsplit(path)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'Bearer {token}', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    response = app(environ, lambda code, headers, exc_info=None: status.append(int(code[:3])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return status[0]
+
+
+def run_asgi(app, path, token, requests, concurrency):
+    async def worker(count):
+        for _ in range(count):
+            assert await asgi_get(app, path, token) == 200, path
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in _split(requests, concurrency)))
+        return time.perf_counter() - start
+
+    return requests / asyncio.run(main())
+
+
+def run_wsgi(app, path, token, requests, concurrency):
+    from django.db import connections
+
+    def worker(count):
+        try:
+            for _ in range(count):
+                assert wsgi_get(app, path, token) == 200, path
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, _split(requests, concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+def _split(total, parts):
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=200, help='生成的文章数')
+    parser.add_argument('--requests', type=int, default=400, help='每个接口每种方式的请求数')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发请求数（协程数或线程数）')
+    args = parser.parse_args()
+
+    setup()
+    from core.asgi import application as asgi_app
+    from core.wsgi import application as wsgi_app
+
+    token, article_id = populate(args.articles)
+    modes = (
+        ('WSGI 同步', wsgi_app, run_wsgi, 1),
+        ('ASGI 同步', asgi_app, run_asgi, 1),
+        ('ASGI 异步', asgi_app, run_asgi, 2),
+        ('WSGI 异步', wsgi_app, run_wsgi, 2),
+    )
+    rows = []
+    for name, sync_path, async_path in ENDPOINTS:
+        row = [name]
+        for _, app, runner, column in modes:
+            path = (sync_path, async_path)[column - 1].format(article=article_id)
+            runner(app, path, token, args.concurrency, args.concurrency)  # 预热缓存
+            row.append(f'{runner(app, path, token, args.requests, args.concurrency):.0f}')
+        rows.append(row)
+
+    print(f'{args.articles} 篇文章，每个接口 {args.requests} 次请求，并发 {args.concurrency}（请求/秒）')
+    print_table(['接口'] + [mode[0] for mode in modes], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""对比两种 JWT 认证模式的吞吐量
+
+    python -m benchmarks.auth_modes --requests 2000
+
+- db：每个请求按令牌中的用户ID查询用户表（原 JWTAuthentication 行为）
+- claims：只读请求直接使用令牌中的身份声明构造用户
+"""
+import argparse
+
+from benchmarks.utils import setup, measure, count_queries, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='每种模式发送的请求数')
+    parser.add_argument('--path', default='/api/auth/menus/user_menus/', help='请求的只读接口')
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+    from authority.authentication import ClaimsRefreshToken
+    from authority.models import User, Role, Menu
+
+    role = Role.objects.create(name='editor')
+    user = User.objects.create_user('bench', password='bench')
+    user.roles.add(role)
+    menu = Menu.objects.create(name='知识库', path='/wiki')
+    menu.roles.add(role)
+
+    token = str(ClaimsRefreshToken.for_user(user).access_token)
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def request():
+        response = client.get(args.path)
+        assert response.status_code == 200, response.content
+
+    rows = []
+    for mode, stateless in (('db', False), ('claims', True)):
+        with override_settings(AUTHORITY_STATELESS_JWT=stateless):
+            rps, latency = measure(request, args.requests)
+            queries = count_queries(request)
+        rows.append((mode, f'{rps:.0f}', f'{latency:.3f}', queries))
+
+    print(f'GET {args.path}，每种模式 {args.requests} 次请求')
+    print_table(('模式', '请求/秒', '平均耗时(ms)', 'SQL查询数'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""数据库连接池：每个请求新建连接与使用连接池时的吞吐量
+
+    python -m benchmarks.db_pool --requests 2000 --concurrency 1 8
+    BENCHMARK_USE_MYSQL=true python -m benchmarks.db_pool   # 使用 .env 中的 MySQL
+
+两种方式分别在子进程中运行（数据库后端在 Django 初始化时确定）：默认后端每个请求结束时关闭连接，
+连接池后端（core.db.backends.*）把连接放回池中。请求经 WSGI 处理器在进程内调用，
+``concurrency`` 个线程并发请求。SQLite 建立连接只需打开文件，MySQL 还有 TCP 握手和认证，
+连接池的收益会更明显。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.utils import setup, print_table
+
+ENDPOINTS = (
+    ('标签列表', '/api/wiki/tags/'),
+    ('文章列表', '/api/wiki/articles/'),
+)
+
+
+def child(args):
+    setup()
+    from django.db import connection, connections
+    from benchmarks.async_views import populate, run_wsgi
+    from core.wsgi import application
+
+    token, _ = populate(args.articles)
+    connections.close_all()
+    results = {}
+    for name, path in ENDPOINTS:
+        for concurrency in args.concurrency:
+            run_wsgi(application, path, token, concurrency * 10, concurrency)  # 预热
+            results[f'{name}:{concurrency}'] = run_wsgi(application, path, token, args.requests, concurrency)
+
+    from core.db.pool import pool_stats
+    print(json.dumps({'results': results, 'engine': connection.settings_dict['ENGINE'], 'pool': pool_stats()}))
+
+
+def run_mode(pooled, argv):
+    env = {**os.environ, 'BENCHMARK_DB_POOL': 'true' if pooled else 'false'}
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.db_pool', '--child', *argv],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=200, help='生成的文章数')
+    parser.add_argument('--requests', type=int, default=2000, help='每个接口每种方式的请求数')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8], help='并发线程数，可指定多个')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    argv = ['--articles', str(args.articles), '--requests', str(args.requests),
+            '--concurrency', *map(str, args.concurrency)]
+    plain, pooled = run_mode(False, argv), run_mode(True, argv)
+
+    rows = []
+    for name, _ in ENDPOINTS:
+        for concurrency in args.concurrency:
+            key = f'{name}:{concurrency}'
+            before, after = plain['results'][key], pooled['results'][key]
+            rows.append([name, concurrency, f'{before:.0f}', f'{after:.0f}', f'{after / before - 1:+.0%}'])
+    print(f"{plain['engine']} -> {pooled['engine']}，每个接口 {args.requests} 次请求（请求/秒）")
+    print_table(['接口', '并发', '每次新建连接', '连接池', '变化'], rows)
+    for name, stats in pooled['pool'].items():
+        print(f'连接池 {name}：' + '，'.join(f'{key}={value}' for key, value in stats.items()))
+
+
+if __name__ == '__main__':
+    main()
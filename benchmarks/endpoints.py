@@ -0,0 +1,281 @@
+"""逐个请求 authority、wiki、shop 路由器上的 GET 接口，记录延迟分位数、吞吐量和 SQL 查询数
+
+    python -m benchmarks.endpoints --articles 5000 --report before.json
+    python -m benchmarks.endpoints --articles 5000 --report after.json --compare before.json
+    python -m benchmarks.endpoints --compare before.json after.json   # 只比较两份报告
+
+先用 ``generate_data`` 按种子生成数据，再分别以管理员和普通成员身份（JWT 令牌）
+经完整的中间件链请求每个接口：预热后顺序请求 ``--requests`` 次统计 p50/p95/p99 和每秒请求数，
+另请求一次统计 SQL 查询数。``--cold`` 时每次请求前清空缓存，测量未命中缓存的情况。
+
+设置 ``BENCHMARK_USE_MYSQL=true`` 时使用 ``.env`` 中的 MySQL，此时不会删除已有数据，
+可以加 ``--reuse`` 跳过数据生成，直接测试库中已有的数据。
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+from benchmarks.utils import setup, print_table
+
+# 路由前缀与 urls 模块，和 core/urls.py 一致
+APPS = (
+    ('/api/auth/', 'authority.urls'),
+    ('/api/wiki/', 'wiki.urls'),
+    ('/api/shop/', 'shop.urls'),
+)
+
+# 需要查询参数的接口
+QUERY_PARAMS = {
+    'article-list': {'page_size': 20},
+    'article-search': {'search': '数据库'},
+    'article-revision-diff': {'from': 1, 'to': 1},
+    'comment-list': {'article': '{article}'},
+    'attachment-list': {'article': '{article}'},
+    # 导出一个标签下的文章，请求量与全量导出无关
+    'article-export': {'tag': '{tag}'},
+}
+
+CLIENTS = ('admin', 'member')
+
+
+def discover_endpoints():
+    """列出路由器注册的所有 GET 接口，返回 [(名称, 注册名, 前缀, URL 参数名)]"""
+    from importlib import import_module
+
+    endpoints = []
+    for prefix, module in APPS:
+        router = import_module(module).router
+        basenames = sorted((basename for _, _, basename in router.registry), key=len, reverse=True)
+        seen = set()
+        for pattern in router.urls:
+            name = pattern.name
+            actions = getattr(pattern.callback, 'actions', None) or {}
+            if name in seen or 'get' not in actions:
+                continue
+            seen.add(name)
+            kwargs = [key for key in pattern.pattern.regex.groupindex if key != 'format']
+            basename = next(basename for basename in basenames if name.startswith(basename + '-'))
+            endpoints.append((name, basename, prefix, kwargs))
+    return endpoints
+
+
+def sample_objects(member):
+    """选取详情接口使用的对象：评论最多的已发布文章及其相关对象"""
+    from django.db.models import Count
+    from authority.models import Role, Menu
+    from shop.models import Product
+    from wiki.models import Article, Attachment, Category, Comment, Tag, UploadSession
+
+    article = (Article.objects.filter(status='published', attachments__isnull=False)
+               .annotate(comment_total=Count('comments', distinct=True))
+               .order_by('-comment_total', 'pk').first()) or Article.objects.order_by('pk').first()
+    comment = Comment.objects.filter(article=article, is_active=True).order_by('pk').first()
+    attachment = Attachment.objects.filter(article=article).order_by('pk').first()
+    session = UploadSession.objects.filter(user=member, status='uploading').first() or UploadSession.objects.create(
+        user=member, article=article, name='bench.bin', filename='bench.bin', total_size=1024, chunk_size=1024,
+    )
+    return {
+        'user': member.pk,
+        'role': Role.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'menu': Menu.objects.order_by('pk').values_list('pk', flat=True).first(),
+        # 分类详情只包含顶级分类
+        'category': Category.objects.filter(parent=None).order_by('pk').values_list('pk', flat=True).first(),
+        'tag': Tag.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'article': article.pk,
+        'comment': comment.pk if comment else None,
+        'attachment': attachment.pk if attachment else None,
+        'product': Product.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True).first(),
+        'number': 1,
+        'upload_id': session.pk,
+    }
+
+
+def build_url(name, basename, prefix, kwargs, objects):
+    """按接口名和示例对象生成请求地址，缺少示例对象时返回 None"""
+    from urllib.parse import urlencode
+    from django.urls import reverse
+
+    values = {}
+    for key in kwargs:
+        value = objects.get(basename) if key == 'pk' else objects.get(key)
+        if value is None:
+            return None
+        values[key] = value
+    url = reverse(name, kwargs=values)
+    assert url.startswith(prefix), url
+    params = {key: str(value).format(**objects) for key, value in QUERY_PARAMS.get(name, {}).items()}
+    return url + ('?' + urlencode(params) if params else '')
+
+
+def make_clients(password):
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from authority.authentication import ClaimsRefreshToken
+    from authority.models import Role
+
+    User = get_user_model()
+    admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+        'bench_admin', 'bench_admin@example.com', password)
+    member = User.objects.filter(username='bench_member').first()
+    if member is None:
+        member = User.objects.create_user('bench_member', 'bench_member@example.com', password)
+        member.roles.set(Role.objects.order_by('pk')[:2])
+
+    clients = {}
+    for label, user in (('admin', admin), ('member', member)):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+        clients[label] = client
+    return clients, member
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 3)
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        # 流式响应（如文章导出）在读取内容时才查询数据库
+        b''.join(response.streaming_content)
+    return response
+
+
+def run_endpoint(client, url, requests, warmup, cold):
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def clear():
+        if cold:
+            for cache in caches.all():
+                cache.clear()
+
+    for _ in range(warmup):
+        clear()
+        fetch(client, url)
+
+    latencies = []
+    status = None
+    for _ in range(requests):
+        clear()
+        start = time.perf_counter()
+        response = fetch(client, url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        status = response.status_code
+
+    clear()
+    with CaptureQueriesContext(connection) as ctx:
+        fetch(client, url)
+
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'status': status,
+        'p50': percentile(quantiles, 50),
+        'p95': percentile(quantiles, 95),
+        'p99': percentile(quantiles, 99),
+        'mean': round(statistics.fmean(latencies), 3),
+        'rps': round(len(latencies) / (sum(latencies) / 1000), 1),
+        'queries': len(ctx.captured_queries),
+    }
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(base, current):
+    """按 (接口, 身份) 对比两份报告的 p50、p95、吞吐量和查询数"""
+    previous = {(row['endpoint'], row['client']): row for row in base['results']}
+    rows = []
+    for row in current['results']:
+        old = previous.get((row['endpoint'], row['client']))
+        if old is None:
+            continue
+
+        def change(key):
+            if not old[key]:
+                return f'{old[key]} -> {row[key]}'
+            return f'{old[key]} -> {row[key]} ({(row[key] - old[key]) / old[key]:+.0%})'
+
+        rows.append([row['endpoint'], row['client'], change('p50'), change('p95'), change('rps'),
+                     f"{old['queries']} -> {row['queries']}"])
+    print(f"基准：{base['meta']['created']}  当前：{current['meta']['created']}")
+    print_table(['接口', '身份', 'p50 ms', 'p95 ms', '请求/秒', '查询数'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=42, help='生成数据的随机数种子')
+    parser.add_argument('--articles', type=int, default=2000, help='生成的文章数')
+    parser.add_argument('--users', type=int, default=200, help='生成的用户数')
+    parser.add_argument('--requests', type=int, default=50, help='每个接口的计时请求数')
+    parser.add_argument('--warmup', type=int, default=3, help='每个接口的预热请求数')
+    parser.add_argument('--cold', action='store_true', help='每次请求前清空缓存')
+    parser.add_argument('--reuse', action='store_true', help='使用数据库中已有的数据，不重新生成')
+    parser.add_argument('--only', action='append', help='只测试名称包含该字符串的接口，可重复指定')
+    parser.add_argument('--report', help='JSON 报告的输出路径')
+    parser.add_argument('--compare', nargs='+', metavar='REPORT',
+                        help='与一份报告对比；给出两份报告时只比较报告，不运行测试')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        compare(load_report(args.compare[0]), load_report(args.compare[1]))
+        return
+
+    setup(fresh=not args.reuse)
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    password = 'password'
+    if not args.reuse:
+        call_command('generate_data', seed=args.seed, articles=args.articles, users=args.users, password=password)
+    clients, member = make_clients(password)
+    objects = sample_objects(member)
+
+    results = []
+    rows = []
+    for name, basename, prefix, kwargs in discover_endpoints():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        url = build_url(name, basename, prefix, kwargs, objects)
+        if url is None:
+            continue
+        for label in CLIENTS:
+            result = run_endpoint(clients[label], url, args.requests, args.warmup, args.cold)
+            results.append({'endpoint': name, 'client': label, 'url': url, **result})
+            rows.append([name, label, result['status'], result['p50'], result['p95'], result['p99'],
+                         result['rps'], result['queries']])
+
+    print_table(['接口', '身份', '状态', 'p50 ms', 'p95 ms', 'p99 ms', '请求/秒', '查询数'], rows)
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'seed': args.seed,
+            'articles': args.articles,
+            'users': args.users,
+            'requests': args.requests,
+            'cold': args.cold,
+            'reuse': args.reuse,
+            'python': platform.python_version(),
+            'cache': settings.CACHES['default']['BACKEND'],
+        },
+        'results': results,
+    }
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'报告已写入 {args.report}')
+    if args.compare:
+        print()
+        compare(load_report(args.compare[0]), report)
+
+
+if __name__ == '__main__':
+    main()
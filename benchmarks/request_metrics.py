@@ -0,0 +1,77 @@
+"""请求指标中间件的开销：同一接口在启用和不启用 RequestMetricsMiddleware 时的单请求耗时
+
+    python -m benchmarks.request_metrics --iterations 1000 --rounds 3
+
+通过 WSGI 处理器在进程内调用，分别测量不查库的接口（令牌声明模式下的当前用户）、
+少量查询的接口和 N+1 查询较多的接口，差值即中间件和 SQL 统计的开销。
+请求用户是管理员，启用时的耗时包含生成 Server-Timing 响应头；N+1 接口还包含每个请求写一条警告日志。
+"""
+import argparse
+
+from benchmarks.utils import setup, measure, print_table
+from benchmarks.async_views import wsgi_get
+
+MIDDLEWARE = 'core.middleware.RequestMetricsMiddleware'
+
+
+def populate():
+    from authority.authentication import ClaimsRefreshToken
+    from authority.models import User, Menu
+    from wiki.models import Category, Tag
+
+    user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+    for i in range(10):
+        Menu.objects.create(name=f'菜单{i}', path=f'/menu{i}')
+    Category.objects.create(name='分类')
+    for i in range(10):
+        Tag.objects.create(name=f'标签{i}')
+    return str(ClaimsRefreshToken.for_user(user).access_token)
+
+
+def handler(enabled):
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import override_settings
+
+    middleware = [name for name in settings.MIDDLEWARE if enabled or name != MIDDLEWARE]
+    with override_settings(MIDDLEWARE=middleware):
+        return WSGIHandler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000, help='每轮每个接口的请求次数')
+    parser.add_argument('--rounds', type=int, default=3, help='测量轮数')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection, reset_queries
+    from core.middleware import _record_query
+
+    token = populate()
+    connection.ensure_connection()
+    plain, instrumented = handler(False), handler(True)
+    assert _record_query in connection.execute_wrappers
+
+    endpoints = (
+        ('当前用户（0 次查询）', '/api/auth/users/me/'),
+        ('标签列表（2 次查询）', '/api/wiki/tags/'),
+        ('菜单列表（N+1，12 次查询）', '/api/auth/menus/'),
+    )
+    rows = []
+    for name, path in endpoints:
+        # 交替测量多轮取最小值，减少机器抖动的影响
+        results = [float('inf'), float('inf')]
+        for _ in range(args.rounds):
+            for i, app in enumerate((plain, instrumented)):
+                rate, ms = measure(lambda: wsgi_get(app, path, token), args.iterations, warmup=50)
+                reset_queries()
+                results[i] = min(results[i], ms * 1000)
+        rows.append([name, f'{results[0]:.0f}', f'{results[1]:.0f}', f'{results[1] - results[0]:+.0f}',
+                     f'{(results[1] - results[0]) / results[0]:+.1%}'])
+    print(f'每个接口 {args.rounds} 轮 x {args.iterations} 次请求，单请求耗时（微秒，取各轮最小值）')
+    print_table(['接口', '不启用', '启用', '差值', '比例'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""基准测试使用的配置：在项目配置基础上改用临时 SQLite 数据库"""
+import os
+import tempfile
+
+from core.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+BENCHMARK_DB = os.getenv('BENCHMARK_DB', os.path.join(tempfile.gettempdir(), 'qietingqiexing_bench.sqlite3'))
+
+if os.getenv('BENCHMARK_USE_MYSQL', 'false').lower() != 'true':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BENCHMARK_DB,
+        }
+    }
+
+# 使用带连接池的数据库后端（benchmarks.db_pool 对比用）
+if os.getenv('BENCHMARK_DB_POOL', 'false').lower() == 'true':
+    DATABASES['default'] = {
+        **DATABASES['default'],
+        'ENGINE': DATABASES['default']['ENGINE'].replace('django.db.backends.', 'core.db.backends.'),
+        'OPTIONS': {**DATABASES['default'].get('OPTIONS', {}), 'pool': True},
+    }
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'qietingqiexing_bench_media')
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
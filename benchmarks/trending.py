@@ -0,0 +1,113 @@
+"""热门文章：重新计算热度排行的耗时，以及读取排行与按总浏览数排序的对比
+
+    python -m benchmarks.trending --articles 1000000 --active 0.2 --buckets 5
+    BENCHMARK_USE_MYSQL=true python -m benchmarks.trending   # 使用 .env 中的 MySQL
+
+生成 ``articles`` 篇文章（不含正文），其中 ``active`` 比例的文章在最近的统计窗口内有活跃度，
+平均每篇 ``buckets`` 个时间段，浏览数服从长尾分布；另有少量超出窗口的时间段用于测量清理。
+重新计算包括一次 GROUP BY 聚合、逐行维护全站和各分类的前 K 名并整体替换排行。
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.utils import setup, measure, print_table
+
+
+def populate(args):
+    from django.utils import timezone
+    from authority.models import User
+    from wiki.category_closure import rebuild_closure
+    from wiki.models import Article, ArticleActivity, Category
+    from wiki.trending import bucket_start, bucket_seconds
+
+    rng = random.Random(42)
+    author = User.objects.create_user('author', password='x')
+    roots = max(1, args.categories // 5)
+    Category.objects.bulk_create([
+        Category(pk=pk, name=f'分类{pk}', parent_id=None if pk <= roots else rng.randint(1, roots))
+        for pk in range(1, args.categories + 1)
+    ])
+    rebuild_closure()
+
+    now = timezone.now()
+    created_at = now - timedelta(days=30)
+    statuses = ['published'] * 8 + ['draft', 'archived']
+    for start in range(1, args.articles + 1, args.batch_size):
+        stop = min(start + args.batch_size, args.articles + 1)
+        Article.objects.bulk_create([
+            Article(
+                pk=pk, title=f'文章{pk}', category_id=rng.randint(1, args.categories), author=author,
+                status=rng.choice(statuses), view_count=int(rng.paretovariate(1.2) * 20),
+                created_at=created_at, updated_at=created_at,
+            )
+            for pk in range(start, stop)
+        ])
+
+    size = bucket_seconds()
+    window = int(timedelta(days=7).total_seconds() // size)
+    latest = bucket_start(now)
+    active = rng.sample(range(1, args.articles + 1), int(args.articles * args.active))
+    rows = []
+    for article_id in active:
+        count = max(1, min(window, int(rng.expovariate(1 / args.buckets))))
+        for offset in rng.sample(range(window + 24), count):
+            rows.append(ArticleActivity(
+                article_id=article_id, bucket=latest - timedelta(seconds=offset * size),
+                views=int(rng.paretovariate(1.1)), likes=int(rng.random() < 0.1),
+            ))
+        if len(rows) >= args.batch_size:
+            ArticleActivity.objects.bulk_create(rows)
+            rows = []
+    ArticleActivity.objects.bulk_create(rows)
+    return ArticleActivity.objects.count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=1000000, help='文章数')
+    parser.add_argument('--active', type=float, default=0.2, help='统计窗口内有活跃度的文章比例')
+    parser.add_argument('--buckets', type=float, default=5, help='活跃文章平均的时间段数')
+    parser.add_argument('--categories', type=int, default=50, help='分类数')
+    parser.add_argument('--repeat', type=int, default=3, help='重新计算的次数')
+    parser.add_argument('--iterations', type=int, default=50, help='读取排行的重复次数')
+    parser.add_argument('--batch-size', type=int, default=20000, help='每批写入的行数')
+    args = parser.parse_args()
+
+    setup()
+    from django.db.models import Max
+    from wiki.models import Article
+    from wiki.trending import compute_trending, get_trending
+
+    start = time.perf_counter()
+    activity = populate(args)
+    print(f'生成 {args.articles} 篇文章、{activity} 条活跃度，耗时 {time.perf_counter() - start:.1f}s')
+
+    rows = []
+    for i in range(args.repeat):
+        stats = compute_trending()
+        rows.append([
+            i + 1, stats['articles'], stats['entries'], stats['pruned'],
+            f'{stats["compute_seconds"]:.2f}', f'{stats["total_seconds"]:.2f}',
+        ])
+    print_table(['次数', '计算热度的文章', '排行条数', '清理时间段', '聚合与排名 s', '总耗时 s'], rows)
+
+    category_id = Article.objects.aggregate(value=Max('category_id'))['value']
+    reads = [
+        ('热门排行（全站）', lambda: get_trending(None, 20)),
+        ('热门排行（分类）', lambda: get_trending(category_id, 20)),
+        ('按总浏览数排序', lambda: list(
+            Article.objects.filter(status='published').order_by('-view_count').values_list('pk', flat=True)[:20]
+        )),
+    ]
+    print()
+    print_table(['读取前 20 名', '次/秒', '平均 ms'], [
+        [name, f'{rps:.0f}', f'{ms:.3f}']
+        for name, func in reads
+        for rps, ms in [measure(func, args.iterations, warmup=3)]
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(fresh=True):
+    """初始化 Django 并迁移基准测试数据库，fresh 为 True 时先删除旧数据库"""
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+    import django
+    from django.conf import settings
+
+    if fresh and not os.getenv('BENCHMARK_USE_MYSQL', 'false').lower() == 'true':
+        db = os.getenv('BENCHMARK_DB') or __import__('benchmarks.settings', fromlist=['BENCHMARK_DB']).BENCHMARK_DB
+        if os.path.exists(db):
+            os.remove(db)
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return settings
+
+
+def measure(func, iterations, warmup=10):
+    """执行 func 若干次，返回 (每秒次数, 平均耗时毫秒)"""
+    for _ in range(warmup):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, elapsed / iterations * 1000
+
+
+def count_queries(func):
+    """返回执行 func 期间的 SQL 查询数"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    return len(ctx.captured_queries)
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    line = '  '.join('{:<%d}' % width for width in widths)
+    print(line.format(*headers))
+    print(line.format(*['-' * width for width in widths]))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,30 @@
+"""异步视图中的缓存访问
+
+Django 的缓存后端没有原生异步实现，``cache.aget`` 等方法会切换到同步线程执行。
+进程内缓存（LocMemCache）不涉及 I/O，直接调用同步方法即可省去线程切换；
+其他后端（Redis、Memcached 等）仍通过异步接口访问，避免阻塞事件循环。
+"""
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _in_process(cache):
+    return isinstance(cache, LocMemCache)
+
+
+async def aget(cache, key, default=None):
+    if _in_process(cache):
+        return cache.get(key, default)
+    return await cache.aget(key, default)
+
+
+async def aset(cache, key, value, timeout=DEFAULT_TIMEOUT):
+    if _in_process(cache):
+        return cache.set(key, value, timeout)
+    return await cache.aset(key, value, timeout)
+
+
+async def aadd(cache, key, value, timeout=DEFAULT_TIMEOUT):
+    if _in_process(cache):
+        return cache.add(key, value, timeout)
+    return await cache.aadd(key, value, timeout)
@@ -0,0 +1,16 @@
+"""带连接池的 MySQL 后端（PyMySQL），用法见 core.db.pool"""
+from django.db.backends.mysql import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+SERVER_STATUS_IN_TRANS = 1
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def check_pooled_connection(self, connection):
+        connection.ping(reconnect=False)
+
+    def pooled_in_transaction(self, connection):
+        # PyMySQL 在每个响应后更新服务端状态标志，不需要额外查询
+        status = getattr(connection, 'server_status', None)
+        return status is None or bool(status & SERVER_STATUS_IN_TRANS)
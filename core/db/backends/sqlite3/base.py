@@ -0,0 +1,18 @@
+"""带连接池的 SQLite 后端，与 MySQL 连接池后端行为一致，用于本地测试和基准测试"""
+from django.db.backends.sqlite3 import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def pool_options(self):
+        # 内存数据库每个连接是独立的库，不能在线程间复用
+        if self.is_in_memory_db():
+            return None
+        return super().pool_options()
+
+    def check_pooled_connection(self, connection):
+        connection.execute('SELECT 1').close()
+
+    def pooled_in_transaction(self, connection):
+        return connection.in_transaction
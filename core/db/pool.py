@@ -0,0 +1,275 @@
+"""进程内的数据库连接池
+
+Django 默认每个请求结束时关闭数据库连接（CONN_MAX_AGE=0），下一个请求重新建立 TCP 连接并认证。
+连接池数据库后端（``core.db.backends.mysql``、``core.db.backends.sqlite3``）在 Django 关闭连接时
+把连接放回池中，建立连接时优先从池中取出：
+
+- 池中连接总数（空闲 + 使用中）不超过 ``max_size``，取不到时最多等待 ``timeout`` 秒；
+- 取出前检查连接是否可用（MySQL 为 ping），空闲时间不超过 ``check_interval`` 秒的连接跳过检查；
+- 连接建立超过 ``max_lifetime`` 秒后不再放回池中，由下一次取用时新建；
+- 放回前回滚未结束的事务；出错后关闭、或在事务中关闭的连接直接丢弃。
+
+配置方式与 Django 的 PostgreSQL 连接池一致，在 ``OPTIONS`` 中设置 ``pool``::
+
+    'ENGINE': 'core.db.backends.mysql',
+    'OPTIONS': {'pool': {'max_size': 10, 'max_lifetime': 600, 'timeout': 10, 'check_interval': 0}},
+
+``pool`` 为 True 时使用默认值。连接池已经复用连接，CONN_MAX_AGE 应保持为 0。
+连接池按进程保存，fork 出的子进程会新建自己的连接池，不会与父进程共用连接。
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from core.metrics import registry, CallbackMetric
+
+DEFAULTS = {
+    'max_size': 10,
+    'max_lifetime': 600,
+    'timeout': 10,
+    'check_interval': 0,
+}
+
+EVENTS = ('created', 'reused', 'expired', 'discarded', 'check_failed', 'waits', 'timeouts')
+
+
+class PoolTimeout(RuntimeError):
+    """等待空闲连接超时"""
+
+
+class PooledConnection:
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    """有上限的连接池
+
+    ``check(connection)`` 检查连接可用（不可用时抛出异常），``in_transaction(connection)``
+    判断连接是否有未结束的事务。
+    """
+
+    def __init__(self, name, check, in_transaction, max_size=10, max_lifetime=600, timeout=10, check_interval=0):
+        self.name = name
+        self.check = check
+        self.in_transaction = in_transaction
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._in_use = {}
+        self._condition = threading.Condition()
+        self.counters = dict.fromkeys(EVENTS, 0)
+
+    def acquire(self, connect):
+        """取出一个连接，返回 (连接, 是否复用)；``connect()`` 用于新建连接"""
+        deadline = None
+        while True:
+            entry = stale = placeholder = None
+            with self._condition:
+                while not self._idle and len(self._in_use) >= self.max_size:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.timeout
+                        self.counters['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'数据库连接池 {self.name} 已满（{self.max_size} 个连接），'
+                            f'等待 {self.timeout} 秒后仍无空闲连接'
+                        )
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                    if time.monotonic() - entry.created_at >= self.max_lifetime:
+                        self.counters['expired'] += 1
+                        stale = entry
+                    else:
+                        slot = id(entry.connection)
+                        self._in_use[slot] = entry
+                else:
+                    # 先占用名额，在锁外建立连接
+                    placeholder = object()
+                    slot = id(placeholder)
+                    self._in_use[slot] = None
+
+            if stale is not None:
+                self._close(stale)
+                continue
+            if placeholder is not None:
+                return self._create(connect, slot), False
+            if time.monotonic() - entry.released_at >= self.check_interval:
+                try:
+                    self.check(entry.connection)
+                except Exception:
+                    self._forget(slot, 'check_failed')
+                    self._close(entry)
+                    continue
+            with self._condition:
+                self.counters['reused'] += 1
+            return entry.connection, True
+
+    def _create(self, connect, slot):
+        try:
+            connection = connect()
+        except BaseException:
+            self._forget(slot)
+            raise
+        with self._condition:
+            del self._in_use[slot]
+            self._in_use[id(connection)] = PooledConnection(connection)
+            self.counters['created'] += 1
+        return connection
+
+    def _forget(self, key, event=None):
+        """释放使用中的名额"""
+        with self._condition:
+            self._in_use.pop(key, None)
+            if event:
+                self.counters[event] += 1
+            self._condition.notify()
+
+    def release(self, connection, discard=False):
+        """归还连接，``discard`` 为 True 或连接已超过最长使用时间时关闭连接"""
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+            self._condition.notify()
+        if entry is None:
+            # 不是从本连接池取出的连接（如 fork 之前建立的），直接关闭
+            connection.close()
+            return
+
+        expired = time.monotonic() - entry.created_at >= self.max_lifetime
+        if not discard and not expired:
+            try:
+                if self.in_transaction(connection):
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            if expired or discard:
+                self.counters['expired' if expired else 'discarded'] += 1
+            else:
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+                self._condition.notify()
+                return
+        self._close(entry)
+
+    def _close(self, entry):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        """关闭全部空闲连接"""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self.counters,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """按 key 获取当前进程的连接池，不存在或 fork 后由 ``factory()`` 新建"""
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            # fork 继承来的连接与父进程共用套接字，不能关闭，直接丢弃
+            pool = _pools[key] = factory()
+        return pool
+
+
+def pool_stats():
+    """当前进程所有连接池的统计，键为连接池名称"""
+    return {pool.name: pool.stats() for pool in list(_pools.values()) if pool.pid == os.getpid()}
+
+
+registry.register(CallbackMetric(
+    'db_pool_connections', '连接池中的连接数', 'gauge', ('pool', 'state'),
+    lambda: {(name, state): stats[state] for name, stats in pool_stats().items() for state in ('idle', 'in_use')},
+))
+registry.register(CallbackMetric(
+    'db_pool_events_total', '连接池事件数：新建、复用、超过最长使用时间、丢弃、检查失败、等待、等待超时', 'counter',
+    ('pool', 'event'),
+    lambda: {(name, event): stats[event] for name, stats in pool_stats().items() for event in EVENTS},
+))
+
+
+class PooledDatabaseWrapperMixin:
+    """为 Django 数据库后端加上连接池，子类实现 ``check_pooled_connection`` 和 ``pooled_in_transaction``"""
+
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        return {**DEFAULTS, **(options if isinstance(options, dict) else {})}
+
+    @property
+    def pool(self):
+        options = self.pool_options()
+        if options is None:
+            return None
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'])
+        return get_pool(key, lambda: ConnectionPool(
+            self.alias, self.check_pooled_connection, self.pooled_in_transaction, **options,
+        ))
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        self.pool_reused = False
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection, self.pool_reused = pool.acquire(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(
+            conn_params
+        ))
+        return connection
+
+    def init_connection_state(self):
+        # 会话设置（时区、隔离级别等）在连接上保持不变，复用的连接无需重新设置
+        if not getattr(self, 'pool_reused', False):
+            super().init_connection_state()
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        # 出错后关闭的连接可能已不可用；在事务中关闭的连接仍被 Django 引用，都不放回池中
+        with self.wrap_database_errors:
+            pool.release(self.connection, discard=self.errors_occurred or self.in_atomic_block)
+
+    def check_pooled_connection(self, connection):
+        raise NotImplementedError
+
+    def pooled_in_transaction(self, connection):
+        raise NotImplementedError
@@ -0,0 +1,167 @@
+"""图片衍生图
+
+头像、商品图片上传后由后台任务生成若干尺寸的 WebP 衍生图，列表中只引用小图，不再下发原图：
+
+- 尺寸：``IMAGE_VARIANT_SIZES`` 按图片类别配置，头像裁剪为正方形，其他图片按最长边等比缩小（不放大）。
+- 文件名：``<上传目录>/variants/<尺寸>-<内容哈希>.webp``，内容不变文件名就不变，可以长期缓存；
+  相同的图片只存一份。
+- 记录：生成结果保存在模型的 JSON 字段中，形如 ``{"source": 原图路径, "files": {"48": 衍生图路径, ...}}``，
+  原图更换或尺寸配置变化后重新生成；尚未生成或原图无法解析时接口只返回原图地址。
+- 回填：``generate_image_variants`` 命令用多个进程为已有图片生成衍生图。
+"""
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {
+    'avatar': (48, 96, 256),
+    'product': (240, 480, 960),
+}
+
+
+class ImageKind:
+    """一类需要生成衍生图的图片：模型的原图字段及保存结果的 JSON 字段"""
+
+    def __init__(self, name, model, field, variants_field, square=False):
+        self.name = name
+        self.model_label = model
+        self.field = field
+        self.variants_field = variants_field
+        self.square = square
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def sizes(self):
+        sizes = getattr(settings, 'IMAGE_VARIANT_SIZES', {}).get(self.name, DEFAULT_SIZES[self.name])
+        return sorted(sizes, reverse=True)
+
+    @property
+    def directory(self):
+        upload_to = self.model._meta.get_field(self.field).upload_to
+        return posixpath.join(upload_to.rstrip('/'), 'variants')
+
+    def is_current(self, instance):
+        return self.is_current_values(getattr(instance, self.field).name, getattr(instance, self.variants_field))
+
+    def is_current_values(self, name, variants):
+        """衍生图与当前原图和尺寸配置一致（原图无法解析时不再重新生成）"""
+        variants = variants or {}
+        if not name:
+            return not variants
+        if variants.get('source') != name:
+            return False
+        files = variants.get('files', {})
+        return variants.get('failed', False) or all(str(size) in files for size in self.sizes)
+
+    def pending_ids(self, force=False):
+        """需要生成（或清除）衍生图的记录ID"""
+        rows = self.model.objects.order_by('pk').values_list('pk', self.field, self.variants_field)
+        return [
+            pk for pk, name, variants in rows.iterator(chunk_size=2000)
+            if (force and name) or not self.is_current_values(name, variants)
+        ]
+
+
+IMAGE_KINDS = {
+    kind.name: kind for kind in (
+        ImageKind('avatar', 'authority.User', 'avatar', 'avatar_variants', square=True),
+        ImageKind('product', 'shop.Product', 'image', 'image_variants'),
+    )
+}
+
+
+def _prepare(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        # 调色板、灰度等模式先转换，带透明度的保留透明通道
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def render_variants(source, sizes, square=False):
+    """把原图缩放为各尺寸的 WebP，返回 {尺寸: 文件内容}，尺寸从大到小依次由上一张缩小得到"""
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    rendered = {}
+    with Image.open(source) as image:
+        # JPEG 按最大尺寸直接以缩小的比例解码，大照片的解码耗时和内存都大幅减少
+        image.draft('RGB', (sizes[0], sizes[0]))
+        current = _prepare(image)
+        for size in sizes:
+            if square:
+                current = ImageOps.fit(current, (size, size), Image.Resampling.LANCZOS)
+            else:
+                current = current.copy()
+                current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            current.save(buffer, 'WEBP', quality=quality, method=4)
+            rendered[size] = buffer.getvalue()
+    return rendered
+
+
+def store_variant(directory, size, data):
+    """以内容哈希命名保存衍生图，已存在时直接复用"""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    name = posixpath.join(directory, f'{size}-{digest}.webp')
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def generate_variants(kind, pk, force=False):
+    """为一条记录生成衍生图并保存，返回生成的衍生图数量（无需生成时为 0）"""
+    kind = IMAGE_KINDS[kind]
+    instance = kind.model.objects.filter(pk=pk).first()
+    if instance is None or (not force and kind.is_current(instance)):
+        return 0
+
+    source = getattr(instance, kind.field)
+    variants = {}
+    if source.name:
+        files = {}
+        try:
+            with source.open('rb') as file:
+                rendered = render_variants(file, kind.sizes, kind.square)
+            files = {str(size): store_variant(kind.directory, size, data) for size, data in rendered.items()}
+        except (OSError, Image.DecompressionBombError):
+            # 原图缺失或无法解析时记为失败，不再反复重试，接口继续返回原图地址
+            logger.warning('无法为 %s %s 的图片 %s 生成衍生图', kind.model_label, pk, source.name, exc_info=True)
+            variants['failed'] = True
+        variants.update(source=source.name, files=files)
+
+    setattr(instance, kind.variants_field, variants)
+    # 通过 save 触发信号，清除用户缓存和引用头像的响应缓存；修改时间一并更新，引用头像的文章详情以此判断是否变化
+    fields = [kind.variants_field]
+    if any(field.name == 'updated_at' for field in kind.model._meta.concrete_fields):
+        fields.append('updated_at')
+    instance.save(update_fields=fields)
+    return len(variants.get('files', {}))
+
+
+def variant_urls(variants, build_url):
+    """把衍生图记录转换为 {尺寸: 地址}"""
+    files = (variants or {}).get('files', {})
+    return {size: build_url(name) for size, name in files.items()}
+
+
+class VariantURLsField(serializers.ReadOnlyField):
+    """衍生图地址：{尺寸: 地址}，请求上下文中有 request 时为绝对地址（与 ImageField 一致）"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if request is None:
+            return variant_urls(value, default_storage.url)
+        return variant_urls(value, lambda name: request.build_absolute_uri(default_storage.url(name)))
@@ -0,0 +1,157 @@
+"""进程内的请求指标
+
+按接口（DRF 视图类和动作）统计请求数、耗时分布、每个请求的 SQL 查询数分布、
+数据库耗时和重复查询数，以 Prometheus 文本格式输出。
+
+指标保存在进程内存中，多进程部署时每个进程各自计数，
+由 Prometheus 分别抓取各进程（或各实例）后按标签汇总。
+"""
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, label_values=(), amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+class Histogram:
+    """分桶计数的分布，桶上限为 ``buckets``，另有 +Inf 桶"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                # 各桶计数（不累计）、总和、总数
+                entry = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0, 0]
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        bounds = self.buckets + (float('inf'),)
+        for label_values, entry in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                le = 'le="%s"' % _format_number(float(bound))
+                yield f'{self.name}_bucket', _format_labels(self.labels, label_values, le), cumulative
+            yield f'{self.name}_sum', _format_labels(self.labels, label_values), entry[-2]
+            yield f'{self.name}_count', _format_labels(self.labels, label_values), entry[-1]
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+class CallbackMetric:
+    """取值时调用 ``callback()``，返回 {标签值元组: 数值}，用于连接池等已有统计的指标"""
+
+    def __init__(self, name, documentation, kind, labels, callback):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        for label_values, value in sorted(self.callback().items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+    def reset(self):
+        pass
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """按 Prometheus 文本格式输出全部指标"""
+        lines = []
+        with _lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                for name, labels, value in list(metric.samples()):
+                    lines.append(f'{name}{labels} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    'http_requests_total', '请求数', ('view', 'method', 'status'),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', '请求耗时（秒）', ('view',),
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'http_request_db_queries', '每个请求的 SQL 查询数', ('view',),
+    (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+))
+DB_DURATION = registry.register(Counter(
+    'http_request_db_seconds_total', 'SQL 执行总耗时（秒）', ('view',),
+))
+DUPLICATE_QUERIES = registry.register(Counter(
+    'http_request_duplicate_queries_total', '同一请求内重复执行的 SQL 次数（不含第一次）', ('view',),
+))
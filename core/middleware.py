@@ -0,0 +1,232 @@
+"""请求级的 SQL 与耗时统计
+
+每个请求记录所属接口（DRF 视图类和动作）、SQL 查询数、数据库耗时、重复执行的 SQL 和总耗时：
+
+- 汇总到 ``core.metrics`` 的计数器和直方图，由 /api/metrics/ 输出；
+- 管理员的请求在响应头 ``Server-Timing`` 中返回本次请求的统计，浏览器开发者工具可直接查看；
+- 同一条 SQL 在一个请求内执行次数达到 ``METRICS_DUPLICATE_QUERY_WARNING`` 时记录警告日志，
+  用于定位 N+1 查询。
+
+SQL 统计通过数据库连接的 execute_wrapper 完成：连接建立时挂上一次，当前请求的统计对象
+放在 ContextVar 中，sync_to_async 切换线程后仍能记到同一个请求上；不在请求中执行的 SQL
+（管理命令、后台线程）只多一次 ContextVar 读取。
+
+流式响应（NDJSON 导出、附件下载）的内容在中间件返回后才生成：生成每一块内容时重新挂上
+当前请求的统计对象，响应关闭（内容发送完毕）时再汇总，计数器和直方图包含整个传输过程。
+``Server-Timing`` 响应头在发送内容之前就已发出，只能反映到开始传输为止的统计，以 ``stream`` 项标明。
+"""
+import logging
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.functional import LazyObject, empty
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+_TABLE_RE = re.compile(r'\bFROM\s+[`"]?(\w+)', re.IGNORECASE)
+
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'db_time', 'statements')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # SQL 模板（参数以占位符表示）-> 执行次数，同一模板多次执行即为重复查询
+        self.statements = {}
+
+    def duplicates(self):
+        """返回 (重复执行次数, 执行最多的 SQL, 其执行次数)"""
+        total, top, top_count = 0, None, 0
+        for sql, count in self.statements.items():
+            if count > 1:
+                total += count - 1
+                if count > top_count:
+                    top, top_count = sql, count
+        return total, top, top_count
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - start
+        stats.queries += 1
+        stats.statements[sql] = stats.statements.get(sql, 0) + 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def view_name(request):
+    """请求对应的接口名：DRF 视图集为 ``类名.动作``，其他视图为类名或函数路径"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is None:
+        return match._func_path
+    actions = getattr(func, 'actions', None)
+    if actions:
+        method = request.method.lower()
+        action = actions.get(method) or (actions.get('get') if method == 'head' else None) or method
+        return f'{cls.__name__}.{action}'
+    return f'{cls.__name__}.{request.method.lower()}'
+
+
+def _is_staff(request):
+    # 只看已经确定的用户（DRF 认证后会回写 request.user），不为此触发会话查询
+    user = request.__dict__.get('user')
+    if user is None or isinstance(user, LazyObject) and user._wrapped is empty:
+        return False
+    return getattr(user, 'is_staff', False)
+
+
+def _table(sql):
+    match = _TABLE_RE.search(sql)
+    return match.group(1) if match else sql.split(None, 1)[0]
+
+
+class RequestMetricsMiddleware:
+    """记录每个请求的接口、SQL 查询数、数据库耗时、重复查询和总耗时"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+        self.duplicate_warning = getattr(settings, 'METRICS_DUPLICATE_QUERY_WARNING', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # 中间件加载前已经建立的连接
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        if self.server_timing and _is_staff(request):
+            response['Server-Timing'] = self.server_timing_header(response, stats)
+        if not response.streaming:
+            self.record(request, response, stats)
+            return response
+
+        # FileResponse 交给服务器的 wsgi.file_wrapper 直接发送文件，替换内容会失去这一优化；读文件也不执行 SQL
+        if getattr(response, 'file_to_stream', None) is None:
+            if response.is_async:
+                response.streaming_content = _ameasured(response.streaming_content, stats)
+            else:
+                response.streaming_content = _measured(response.streaming_content, stats)
+        close = response.close
+        recorded = False
+
+        def close_and_record():
+            nonlocal recorded
+            try:
+                close()
+            finally:
+                if not recorded:
+                    recorded = True
+                    self.record(request, response, stats)
+
+        response.close = close_and_record
+        return response
+
+    def server_timing_header(self, response, stats):
+        elapsed = time.perf_counter() - stats.start
+        duplicates, top_sql, top_count = stats.duplicates()
+        timings = [
+            'app;dur=%.1f' % (elapsed * 1000),
+            'db;dur=%.1f;desc="%d queries"' % (stats.db_time * 1000, stats.queries),
+        ]
+        if duplicates:
+            timings.append('dup;desc="%d duplicates, %dx %s"' % (duplicates, top_count, _table(top_sql)))
+        if response.streaming:
+            timings.append('stream;desc="until headers, body not measured"')
+        return ', '.join(timings)
+
+    def record(self, request, response, stats):
+        """把请求的统计汇总到计数器和直方图，重复查询达到阈值时记录警告"""
+        elapsed = time.perf_counter() - stats.start
+        view = view_name(request)
+        duplicates, top_sql, top_count = stats.duplicates()
+
+        labels = (view,)
+        metrics.REQUESTS.inc((view, request.method, str(response.status_code)))
+        metrics.REQUEST_DURATION.observe(labels, elapsed)
+        metrics.REQUEST_QUERIES.observe(labels, stats.queries)
+        if stats.queries:
+            metrics.DB_DURATION.inc(labels, stats.db_time)
+        if duplicates:
+            metrics.DUPLICATE_QUERIES.inc(labels, duplicates)
+
+        if self.duplicate_warning and top_count >= self.duplicate_warning:
+            logger.warning(
+                '%s %s (%s) 执行了 %d 次相同的 SQL：%s',
+                request.method, request.path, view, top_count, top_sql[:500],
+            )
+
+
+def _measured(content, stats):
+    """逐块生成流式响应的内容，生成期间执行的 SQL 记到 ``stats`` 上"""
+    iterator = iter(content)
+    while True:
+        # 每一块单独设置和恢复：服务器可能在不同的线程或上下文中取下一块
+        token = _current.set(stats)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current.reset(token)
+        yield chunk
+
+
+async def _ameasured(content, stats):
+    iterator = aiter(content)
+    while True:
+        token = _current.set(stats)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _current.reset(token)
+        yield chunk
@@ -34,10 +34,12 @@ INSTALLED_APPS = [
     'authority',  # 用户认证与授权
     'wiki',       # 知识库应用
     'shop',       # 商城应用（占位）
+    'jobs',       # 基于数据库的后台任务队列
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',  # 请求耗时与SQL统计
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS中间件
     'django.middleware.common.CommonMiddleware',
@@ -68,9 +70,11 @@ TEMPLATES = [
 WSGI_APPLICATION = 'core.wsgi.application'
 
 # 数据库配置
+# DB_POOL=true 时使用带连接池的 MySQL 后端，请求结束后连接放回池中复用，不再每个请求重新建立连接
+DB_POOL = os.getenv('DB_POOL', 'false').lower() == 'true'
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'core.db.backends.mysql' if DB_POOL else 'django.db.backends.mysql',
         'NAME': os.getenv('DB_NAME', 'qietingqiexing'),
         'USER': os.getenv('DB_USER', 'root'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'password'),
@@ -78,10 +82,20 @@ DATABASES = {
         'PORT': os.getenv('DB_PORT', '3306'),
         'OPTIONS': {
             'charset': 'utf8mb4',
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         }
     }
 }
+if DB_POOL:
+    # 连接池：每个进程最多的连接数、连接最长使用时间（秒）、等待空闲连接的超时（秒）、
+    # 空闲多久后取用前需要 ping 检查（秒，0 表示每次都检查）
+    # 只有连接池后端认识该选项，Django 自带的 MySQL 后端会把它原样传给 pymysql.connect
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'max_lifetime': 600,
+        'timeout': 10,
+        'check_interval': 0,
+    }
 
 # 自定义用户模型
 AUTH_USER_MODEL = 'authority.User'
@@ -105,7 +119,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework配置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authority.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -128,8 +142,14 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'authority.authentication.ClaimsTokenRefreshSerializer',
 }
 
+# 只读请求直接使用令牌中的身份声明，不查询用户表
+AUTHORITY_STATELESS_JWT = os.getenv('AUTHORITY_STATELESS_JWT', 'true').lower() == 'true'
+# 需要完整用户模型时，进程内缓存用户的时间（秒）
+AUTHORITY_USER_CACHE_TTL = 30
+
 # CORS配置
 CORS_ALLOW_ALL_ORIGINS = True  # 开发环境下允许所有来源
 CORS_ALLOW_CREDENTIALS = True
@@ -169,6 +189,85 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 # 媒体文件配置
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 图片衍生图：各类图片生成的 WebP 尺寸（像素，头像裁剪为正方形，商品图片按最长边等比缩小）和压缩质量
+IMAGE_VARIANT_SIZES = {
+    'avatar': [48, 96, 256],
+    'product': [240, 480, 960],
+}
+IMAGE_VARIANT_QUALITY = 80
+
+# 缓存配置，默认使用进程内缓存
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'qietingqiexing'),
+    },
+    # 始终位于进程内的缓存，用于短时间缓存用户等数据
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'qietingqiexing-local',
+    },
+}
 
 # 默认主键类型
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 用户菜单树缓存时间（秒），菜单或角色变更时会主动失效
+AUTHORITY_MENU_CACHE_TIMEOUT = 3600
+# 用户角色与权限缓存时间（秒），角色变更时会主动失效
+AUTHORITY_ROLE_CACHE_TIMEOUT = 600
+
+# 知识库配置
+# 浏览/点赞/下载计数批量写库的间隔（秒），为0时每次直接写库
+WIKI_COUNTER_FLUSH_INTERVAL = int(os.getenv('WIKI_COUNTER_FLUSH_INTERVAL', 5))
+# 分类树缓存时间（秒），分类变更时会主动清除
+WIKI_CATEGORY_TREE_TIMEOUT = 300
+# 文章、分类、标签读接口的响应缓存时间（秒），相关数据变更时会主动失效
+WIKI_RESPONSE_CACHE_TIMEOUT = 60
+# 文章正文达到该字节数才压缩存储，压缩级别 1-9
+WIKI_BODY_COMPRESS_MIN_SIZE = 256
+WIKI_BODY_COMPRESS_LEVEL = 6
+# 修订历史每隔多少个版本保存一次完整快照，其余版本只保存相对上一版本的差异
+WIKI_REVISION_SNAPSHOT_INTERVAL = 20
+# 评论每页顶级评论数，文章详情中内嵌第一页
+WIKI_COMMENT_PAGE_SIZE = 20
+# 回复最大嵌套层数（顶级评论为第1层），超出的回复提升到该层显示，None表示不限制
+WIKI_COMMENT_MAX_DEPTH = None
+# 全文检索最多返回的结果数
+WIKI_SEARCH_MAX_RESULTS = 1000
+# 检索计算 idf 用的文章总数缓存时间（秒）
+WIKI_SEARCH_TOTAL_TIMEOUT = 300
+# 标签云默认返回的标签数和最多可请求的标签数
+WIKI_TAG_CLOUD_SIZE = 50
+WIKI_TAG_CLOUD_MAX_SIZE = 200
+# 热门文章：活跃度时间段长度（秒）、热度半衰期（小时）、统计窗口（天）、浏览和点赞的权重、每个排行保留的文章数
+WIKI_TRENDING_BUCKET_SECONDS = 3600
+WIKI_TRENDING_HALF_LIFE_HOURS = 24
+WIKI_TRENDING_WINDOW_DAYS = 7
+WIKI_TRENDING_VIEW_WEIGHT = 1
+WIKI_TRENDING_LIKE_WEIGHT = 5
+WIKI_TRENDING_TOP_K = 100
+# 相关文章：每篇文章保存的数量、标签相似度所占的权重（其余为正文 tf-idf 相似度）
+WIKI_RELATED_SIZE = 10
+WIKI_RELATED_TAG_WEIGHT = 0.3
+# 附件下载交给前置代理传输：''（由Django流式发送）、'nginx'（X-Accel-Redirect）、'sendfile'（X-Sendfile）
+WIKI_DOWNLOAD_ACCEL = os.getenv('WIKI_DOWNLOAD_ACCEL', '')
+# nginx 中映射到 MEDIA_ROOT 的 internal location
+WIKI_DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+# 附件分块上传：默认分块大小、单个分块上限、文件大小上限（字节）
+WIKI_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+WIKI_UPLOAD_MAX_CHUNK_SIZE = 32 * 1024 * 1024
+WIKI_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+# 后台任务：工作线程数、队列为空时的轮询间隔（秒）、首次重试的等待秒数（之后按2倍递增）、
+# 执行超过多少秒视为工作进程已退出并重新排队；为True时提交任务即在当前线程执行（无需启动 run_jobs）
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 4))
+JOBS_POLL_INTERVAL = 1.0
+JOBS_RETRY_DELAY = 30
+JOBS_LOCK_TIMEOUT = 600
+JOBS_ALWAYS_EAGER = os.getenv('JOBS_ALWAYS_EAGER', 'false').lower() == 'true'
+
+# 请求指标：管理员请求的响应头中返回 Server-Timing
+METRICS_SERVER_TIMING = True
+# 同一条 SQL 在一个请求内执行达到该次数时记录警告日志（N+1 查询），0 表示不记录
+METRICS_DUPLICATE_QUERY_WARNING = 10
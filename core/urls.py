@@ -3,11 +3,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('authority.urls')),  # 用户认证相关路由
     path('api/wiki/', include('wiki.urls')),      # 知识库相关路由
     path('api/shop/', include('shop.urls')),      # 商城相关路由（占位）
+    path('api/async/auth/', include('authority.async_urls')),  # 用户信息、菜单的异步只读接口
+    path('api/async/wiki/', include('wiki.async_urls')),       # 知识库热点读接口的异步实现
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),  # Prometheus 指标（仅管理员）
 ]
 
 # 开发环境下提供媒体文件访问
@@ -0,0 +1,13 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from authority.views import IsAdminUser
+from .metrics import registry, CONTENT_TYPE
+
+
+class MetricsView(APIView):
+    """以 Prometheus 文本格式输出当前进程的请求指标，仅管理员可访问"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
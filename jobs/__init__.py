@@ -0,0 +1 @@
+# jobs应用 - 基于数据库的后台任务队列
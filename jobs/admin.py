@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'run_at', 'attempts', 'max_attempts', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at')
+    actions = ['retry']
+
+    @admin.action(description=_('重新执行选中的失败任务'))
+    def retry(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='pending', attempts=0, run_at=timezone.now(), locked_by='', locked_at=None,
+        )
+        self.message_user(request, _('已重新排队 %d 个任务') % count)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = '后台任务'
+
+    def ready(self):
+        # 导入各应用的 tasks 模块，注册其中定义的任务
+        autodiscover_modules('tasks')
@@ -0,0 +1,40 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import registry, requeue_stale, work
+
+
+class Command(BaseCommand):
+    help = '启动后台任务的工作线程池，从数据库领取并执行任务（收到 SIGINT/SIGTERM 后执行完当前任务再退出）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='工作线程数，默认 JOBS_WORKERS')
+        parser.add_argument('--batch-size', type=int, default=1, help='每次领取的任务数')
+        parser.add_argument('--poll-interval', type=float, help='队列为空时的等待秒数，默认 JOBS_POLL_INTERVAL')
+        parser.add_argument('--once', action='store_true', help='执行完当前可执行的任务后退出')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or getattr(settings, 'JOBS_WORKERS', 4)
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        requeue_stale()
+        self.stdout.write(f'已注册任务：{", ".join(sorted(registry)) or "无"}；启动 {workers} 个工作线程')
+        done = []
+
+        def run():
+            done.append(work(stop, once=options['once'], batch_size=options['batch_size'],
+                             poll_interval=options['poll_interval']))
+
+        threads = [threading.Thread(target=run, name=f'jobs-worker-{i}') for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        # 主线程等待信号，join 带超时以便及时响应 Ctrl-C
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+        self.stdout.write(self.style.SUCCESS(f'工作线程已退出，共执行 {sum(done)} 个任务'))
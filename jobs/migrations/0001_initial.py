@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='任务名')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='参数')),
+                ('status', models.CharField(choices=[('pending', '等待执行'), ('running', '执行中'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('priority', models.SmallIntegerField(default=0, help_text='数值大的先执行', verbose_name='优先级')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='执行时间')),
+                ('dedup_key', models.CharField(blank=True, help_text='相同去重键的任务在等待执行期间只保留一个', max_length=200, null=True, unique=True, verbose_name='去重键')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='已执行次数')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='最多执行次数')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='执行者')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='开始执行时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近一次错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'indexes': [models.Index(fields=['status', '-priority', 'run_at'], name='jobs_job_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """后台任务
+
+    执行成功的任务直接删除，表中只保留等待执行、正在执行和最终失败的任务。
+    """
+    STATUS_CHOICES = (
+        ('pending', _('等待执行')),
+        ('running', _('执行中')),
+        ('failed', _('失败')),
+    )
+
+    name = models.CharField(_('任务名'), max_length=100)
+    payload = models.JSONField(_('参数'), default=dict, blank=True)
+    status = models.CharField(_('状态'), max_length=10, choices=STATUS_CHOICES, default='pending')
+    priority = models.SmallIntegerField(_('优先级'), default=0, help_text=_('数值大的先执行'))
+    run_at = models.DateTimeField(_('执行时间'), default=timezone.now)
+    dedup_key = models.CharField(_('去重键'), max_length=200, unique=True, null=True, blank=True,
+                                 help_text=_('相同去重键的任务在等待执行期间只保留一个'))
+    attempts = models.PositiveSmallIntegerField(_('已执行次数'), default=0)
+    max_attempts = models.PositiveSmallIntegerField(_('最多执行次数'), default=3)
+    locked_by = models.CharField(_('执行者'), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_('开始执行时间'), null=True, blank=True)
+    last_error = models.TextField(_('最近一次错误'), blank=True)
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('后台任务')
+        verbose_name_plural = _('后台任务')
+        indexes = [
+            # 领取任务：WHERE status = 'pending' AND run_at <= now ORDER BY priority DESC, run_at
+            models.Index(fields=['status', '-priority', 'run_at'], name='jobs_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}#{self.pk} ({self.status})'
@@ -0,0 +1,215 @@
+"""基于数据库的后台任务队列
+
+不依赖外部消息队列，任务保存在 ``Job`` 表中。各应用在 ``tasks.py`` 中用 ``@task`` 定义任务，
+视图或信号中调用 ``enqueue`` 插入一行后立即返回，由 ``run_jobs`` 命令启动的工作线程执行::
+
+    @task('authority.record_login')
+    def record_login(user_id, ip):
+        ...
+
+    record_login.enqueue({'user_id': user.pk, 'ip': ip})
+
+- 领取：``SELECT ... FOR UPDATE SKIP LOCKED`` 选出可执行的任务（优先级高、执行时间早的先执行），
+  多个工作线程、多台机器互不阻塞；不支持 SKIP LOCKED 的数据库（SQLite）用一条带子查询和状态条件的
+  UPDATE 完成选取和抢占，只执行抢占成功的任务。领取时执行次数加一，并清空去重键。
+- 重试：任务抛出异常后按指数退避重新排队，达到最多执行次数后标记为失败，保留错误信息。
+- 去重：指定去重键的任务在等待执行期间只保留一个，重复提交时沿用已有任务（执行时间取较早者）；
+  任务开始执行后可以再次提交。
+- 超时：执行中的任务超过 ``JOBS_LOCK_TIMEOUT`` 秒未结束（工作进程被杀死）时重新排队，
+  工作线程空闲时检查，每个超时周期最多一次。任务可能被执行不止一次，任务函数应当可以重复执行。
+
+设置 ``JOBS_ALWAYS_EAGER = True`` 时 ``enqueue`` 在当前事务提交后直接在当前线程执行任务，
+用于没有启动工作进程的开发环境。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+FAILED = 'failed'
+
+registry = {}
+
+
+class Task:
+    """已注册的任务，调用时直接执行，``enqueue`` 放入队列"""
+
+    def __init__(self, func, name, priority=0, max_attempts=3):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, payload=None, **options):
+        return enqueue(self.name, payload, **options)
+
+
+def task(name, priority=0, max_attempts=3):
+    """注册任务，任务函数以 payload 中的键值作为关键字参数调用，payload 需能序列化为 JSON"""
+    def decorator(func):
+        if name in registry:
+            raise ValueError(f'任务 {name} 重复注册')
+        registry[name] = Task(func, name, priority, max_attempts)
+        return registry[name]
+    return decorator
+
+
+def enqueue(name, payload=None, priority=None, run_at=None, delay=None, dedup_key=None, max_attempts=None):
+    """提交任务，返回 Job（去重时为已有的任务；立即执行模式下返回 None）"""
+    if name not in registry:
+        raise ValueError(f'任务 {name} 未注册')
+    spec = registry[name]
+    payload = payload or {}
+    if getattr(settings, 'JOBS_ALWAYS_EAGER', False):
+        # 与队列模式一致，在当前事务提交后执行（此时任务才对工作进程可见）
+        transaction.on_commit(lambda: spec.func(**payload))
+        return None
+
+    run_at = run_at or timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    job = Job(
+        name=name, payload=payload, run_at=run_at, dedup_key=dedup_key,
+        priority=spec.priority if priority is None else priority,
+        max_attempts=max_attempts or spec.max_attempts,
+    )
+    if dedup_key is None:
+        job.save()
+        return job
+
+    # 已有任务可能恰好在两步之间被领取（去重键被清空），此时再插入一次
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                job.save(force_insert=True)
+            return job
+        except IntegrityError:
+            job.pk = None
+        Job.objects.filter(dedup_key=dedup_key, run_at__gt=run_at).update(run_at=run_at)
+        existing = Job.objects.filter(dedup_key=dedup_key).first()
+        if existing is not None:
+            return existing
+    raise IntegrityError(f'无法提交去重键为 {dedup_key} 的任务')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim(worker, limit=1):
+    """领取最多 ``limit`` 个可执行的任务"""
+    now = timezone.now()
+    queryset = Job.objects.filter(status=PENDING, run_at__lte=now).order_by('-priority', 'run_at', 'pk')
+    claimed = {
+        'status': RUNNING, 'locked_by': worker, 'locked_at': now,
+        'attempts': F('attempts') + 1, 'dedup_key': None,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(queryset.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            if not ids:
+                return []
+            Job.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        # 没有行锁时用一条 UPDATE 完成选取和抢占：先读后写的事务在 SQLite 中升级写锁时会报 database is locked；
+        # 仍为等待状态才能领取，其他线程抢先领走的任务不会被重复领取
+        ids = queryset.values('pk')[:limit]
+        if not Job.objects.filter(pk__in=Subquery(ids), status=PENDING).update(**claimed):
+            return []
+    return list(Job.objects.filter(status=RUNNING, locked_by=worker, locked_at=now).order_by(
+        '-priority', 'run_at', 'pk',
+    ))
+
+
+def retry_delay(attempts):
+    """第 ``attempts`` 次执行失败后的等待秒数"""
+    return getattr(settings, 'JOBS_RETRY_DELAY', 30) * 2 ** (attempts - 1)
+
+
+def run_job(job):
+    """执行已领取的任务，返回是否成功"""
+    spec = registry.get(job.name)
+    try:
+        if spec is None:
+            raise LookupError(f'任务 {job.name} 未注册')
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('任务 %s 第 %d 次执行失败', job, job.attempts, exc_info=True)
+        fields = {'locked_by': '', 'locked_at': None, 'last_error': error}
+        if spec is not None and job.attempts < job.max_attempts:
+            fields.update(status=PENDING, run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+        else:
+            fields.update(status=FAILED)
+        Job.objects.filter(pk=job.pk).update(**fields)
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def lock_timeout():
+    return getattr(settings, 'JOBS_LOCK_TIMEOUT', 600)
+
+
+def requeue_stale(now=None):
+    """超时未结束的任务重新排队，已达到最多执行次数的标记为失败，返回处理的任务数"""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=RUNNING, locked_at__lt=now - timedelta(seconds=lock_timeout()))
+    reset = {'locked_by': '', 'locked_at': None, 'last_error': '执行超时'}
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status=FAILED, **reset)
+    return failed + stale.update(status=PENDING, run_at=now, **reset)
+
+
+def work(stop, once=False, batch_size=1, poll_interval=None):
+    """工作线程主循环：领取并执行任务，队列为空时等待 ``poll_interval`` 秒，返回执行的任务数"""
+    poll_interval = getattr(settings, 'JOBS_POLL_INTERVAL', 1.0) if poll_interval is None else poll_interval
+    worker = worker_name()
+    done = 0
+    # 超时检查每个超时周期最多执行一次，不必在每次空轮询时扫描
+    next_requeue = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                jobs = claim(worker, batch_size)
+                if not jobs and not once and time.monotonic() >= next_requeue:
+                    requeue_stale()
+                    next_requeue = time.monotonic() + lock_timeout()
+            except DatabaseError:
+                # 数据库暂时不可用（断线、锁等待超时）时等待后重试，不退出工作线程
+                logger.exception('领取任务失败')
+                stop.wait(poll_interval)
+                continue
+            if not jobs:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for job in jobs:
+                try:
+                    run_job(job)
+                except DatabaseError:
+                    # 结果没有写回，任务保持执行中状态，超时后重新排队
+                    logger.exception('保存任务 %s 的执行结果失败', job)
+                done += 1
+    finally:
+        connection.close()
+    return done
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
-    verbose_name = '商城'
\ No newline at end of file
+    verbose_name = '商城'
+
+    def ready(self):
+        from . import signals  # noqa: F401
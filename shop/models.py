@@ -9,6 +9,7 @@ class Product(models.Model):
     description = models.TextField(_('商品描述'), blank=True)
     price = models.DecimalField(_('价格'), max_digits=10, decimal_places=2)
     image = models.ImageField(_('商品图片'), upload_to='shop/products/', blank=True, null=True)
+    image_variants = models.JSONField(_('图片衍生图'), default=dict, blank=True, editable=False)
     is_active = models.BooleanField(_('是否上架'), default=True)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
     updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
@@ -1,10 +1,13 @@
 from rest_framework import serializers
+from core.images import VariantURLsField
 from .models import Product
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """商品序列化器（占位）"""
+    image_urls = VariantURLsField(source='image_variants')
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'is_active', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'image', 'image_urls', 'is_active', 'created_at']
         read_only_fields = ['created_at']
\ No newline at end of file
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.images import IMAGE_KINDS
+from .models import Product
+from .tasks import product_image_variants
+
+
+@receiver(post_save, sender=Product)
+def product_image_changed(sender, instance, **kwargs):
+    """上传或更换商品图片后提交生成衍生图的任务"""
+    if not IMAGE_KINDS['product'].is_current(instance):
+        product_image_variants.enqueue(
+            {'product_id': instance.pk}, dedup_key=f'shop.product_image_variants:{instance.pk}',
+        )
@@ -0,0 +1,8 @@
+from core.images import generate_variants
+from jobs.queue import task
+
+
+@task('shop.product_image_variants')
+def product_image_variants(product_id):
+    """生成商品图片的各尺寸衍生图"""
+    generate_variants('product', product_id)
@@ -1,13 +1,16 @@
+from django import forms
 from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
 from .models import Category, Tag, Article, Comment, Attachment
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'parent', 'description', 'sort_order', 'is_active')
+    list_display = ('name', 'parent', 'description', 'sort_order', 'is_active', 'published_count')
     list_filter = ('is_active', 'parent')
     search_fields = ('name', 'description')
     list_editable = ('sort_order', 'is_active')
+    readonly_fields = ('published_count',)
 
 
 @admin.register(Tag)
@@ -16,16 +19,39 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+class ArticleAdminForm(forms.ModelForm):
+    """文章表单，正文单独存储，需要手动读写"""
+    content = forms.CharField(label=_('内容'), widget=forms.Textarea)
+
+    class Meta:
+        model = Article
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('content', self.instance.content)
+
+    def save(self, commit=True):
+        self.instance.content = self.cleaned_data['content']
+        return super().save(commit)
+
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
+    form = ArticleAdminForm
     list_display = ('title', 'category', 'author', 'status', 'is_pinned', 'view_count', 'created_at')
     list_filter = ('status', 'is_pinned', 'category', 'tags')
-    search_fields = ('title', 'content', 'summary')
+    search_fields = ('title', 'summary')
     list_editable = ('status', 'is_pinned')
     filter_horizontal = ('tags',)
     date_hierarchy = 'created_at'
     readonly_fields = ('view_count', 'like_count')
 
+    def save_model(self, request, obj, form, change):
+        obj.revision_editor = request.user
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class WikiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wiki'
-    verbose_name = '知识库'
\ No newline at end of file
+    verbose_name = '知识库'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import trending  # noqa: F401  注册计数缓冲的监听函数
\ No newline at end of file
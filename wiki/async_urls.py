@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('articles/', async_views.article_list, name='async-article-list'),
+    path('articles/<int:pk>/', async_views.article_detail, name='async-article-detail'),
+    path('categories/all/', async_views.category_tree, name='async-category-all'),
+    path('tags/', async_views.tag_list, name='async-tag-list'),
+]
@@ -0,0 +1,92 @@
+"""知识库热点只读接口的异步实现
+
+挂载在 /api/async/wiki/ 下，返回的数据与对应的同步接口逐字节一致。
+认证、权限、条件请求的校验值和响应缓存都以异步方式处理；缓存未命中时，
+分页和序列化复用同步视图集的实现，作为一个整体在同步线程中执行一次，
+而不是每个查询切换一次线程。
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+
+from authority.async_api import async_api_view, drf_request
+from .caching import (
+    SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS, aconditional_response, aresponse_versions,
+    annotate_article_stamps, article_stamp
+)
+from .category_tree import aget_category_tree, get_active_categories
+from .counters import counter_buffer
+from .listing import filter_articles
+from .models import Article
+from .views import ArticleViewSet, TagViewSet
+
+
+def _viewset(viewset_class, request, action):
+    """构造同步视图集实例，用于复用其筛选、分页和序列化逻辑"""
+    return viewset_class(request=request, args=(), kwargs={}, action=action, format_kwarg=None)
+
+
+@async_api_view()
+async def article_list(request):
+    """获取文章列表"""
+    view = _viewset(ArticleViewSet, drf_request(request), 'list')
+    stamps = [await aresponse_versions(SCOPE_ARTICLES)]
+
+    @sync_to_async
+    def build():
+        queryset = filter_articles(request.GET)
+        if request.GET.get('search'):
+            # 检索需要多次查询倒排索引，只在缓存未命中时执行
+            queryset = view.filter_queryset(queryset)
+        return view._list_response(queryset, view.request).data
+
+    return await aconditional_response(request, SCOPE_ARTICLES, stamps, build)
+
+
+@async_api_view()
+async def article_detail(request, pk):
+    """获取文章详情，并增加浏览次数"""
+    queryset = annotate_article_stamps(filter_articles(request.GET).select_related('body', 'related_set'))
+    try:
+        instance = await queryset.aget(pk=pk)
+    except Article.DoesNotExist:
+        # 与 get_object() 的 404 响应保持一致
+        raise Http404(f'No {Article._meta.object_name} matches the given query.')
+    await counter_buffer.aincr_instance(instance, 'view_count')
+    stamps = [await aresponse_versions(SCOPE_CATEGORIES), article_stamp(instance)]
+    view = _viewset(ArticleViewSet, drf_request(request), 'retrieve')
+
+    @sync_to_async
+    def build():
+        return view.get_serializer(instance).data
+
+    return await aconditional_response(
+        request, SCOPE_ARTICLES, stamps, build, vary_on_role=True,
+        refresh=lambda data: ArticleViewSet.refresh_counters(instance, data),
+    )
+
+
+@async_api_view()
+async def category_tree(request):
+    """获取所有分类（包括子分类）"""
+    async def build():
+        return get_active_categories(await aget_category_tree())
+
+    return await aconditional_response(
+        request, SCOPE_CATEGORIES, [await aresponse_versions(SCOPE_CATEGORIES)], build,
+    )
+
+
+@async_api_view()
+async def tag_list(request):
+    """获取标签列表"""
+    view = _viewset(TagViewSet, drf_request(request), 'list')
+
+    @sync_to_async
+    def build():
+        queryset = view.filter_queryset(view.get_queryset())
+        page = view.paginate_queryset(queryset)
+        if page is not None:
+            return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+        return view.get_serializer(queryset, many=True).data
+
+    return await aconditional_response(request, SCOPE_TAGS, [await aresponse_versions(SCOPE_TAGS)], build)
@@ -0,0 +1,32 @@
+"""文章正文压缩存储
+
+正文不放在 wiki_article 表中，而是压缩后存入 ArticleBody（一对一），
+列表、后台变更列表和只改状态的操作都不会读取正文。
+短正文或压缩后不变小的正文按原样（UTF-8）存储。
+"""
+import zlib
+
+from django.conf import settings
+
+CODEC_RAW = 'raw'
+CODEC_ZLIB = 'zlib'
+
+
+def encode_body(text):
+    """编码正文，返回 (编码方式, 字节数据, 原始字节数)"""
+    raw = (text or '').encode('utf-8')
+    if len(raw) >= getattr(settings, 'WIKI_BODY_COMPRESS_MIN_SIZE', 256):
+        compressed = zlib.compress(raw, getattr(settings, 'WIKI_BODY_COMPRESS_LEVEL', 6))
+        if len(compressed) < len(raw):
+            return CODEC_ZLIB, compressed, len(raw)
+    return CODEC_RAW, raw, len(raw)
+
+
+def decode_body(codec, data):
+    """解码正文"""
+    data = bytes(data)
+    if codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    elif codec != CODEC_RAW:
+        raise ValueError(f'未知的正文编码: {codec}')
+    return data.decode('utf-8')
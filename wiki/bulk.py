@@ -0,0 +1,58 @@
+"""批量写入文章的工具
+
+生成模拟数据和导入文章时不逐篇 ``save()``（每篇都会触发检索索引、修订版本等信号），
+而是预先分配主键，构造文章及其正文、基线版本、检索词项后按批 ``bulk_create``。
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.db.models import Max
+
+from .models import ArticleBody, ArticleRevision, SearchTerm
+from .revisions import encode_revision
+from .search import build_terms
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """暂时关闭 auto_now / auto_now_add，使批量写入可以指定时间"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def next_pk(model):
+    """下一个可用主键；预先分配主键后，关联行无需等待插入返回的 ID（MySQL 批量插入不返回 ID）
+
+    读取最大主键与插入之间如有其他写入，预分配的主键会冲突（``IntegrityError``），
+    调用方需在停止写入时使用，或在冲突后重新分配重试。
+    """
+    return (model.objects.aggregate(value=Max('pk'))['value'] or 0) + 1
+
+
+def article_rows(article, text, index=True):
+    """构造新文章的正文、基线修订版本和检索词项（不保存），返回 (正文, 版本, 词项列表)"""
+    body = ArticleBody.from_text(article, text)
+    body.updated_at = article.updated_at
+    revision = ArticleRevision(
+        article_id=article.pk, number=1, editor_id=article.author_id, title=article.title,
+        summary=article.summary, created_at=article.created_at, **encode_revision('', text, 0),
+    )
+    terms = []
+    if index:
+        # 新文章没有旧词项，直接批量写入，不逐篇调用 index_article
+        indexed = SimpleNamespace(title=article.title, summary=article.summary, content=text)
+        terms = [
+            SearchTerm(term=term, article_id=article.pk, weight=weight)
+            for term, weight in build_terms(indexed).items()
+        ]
+    return body, revision, terms
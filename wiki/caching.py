@@ -0,0 +1,187 @@
+"""条件请求与响应缓存
+
+知识库只读接口的 ETag 由两部分组成：
+
+- 列表类响应的版本号（``ResponseVersion``）：文章、标签、分类、作者资料变更后加一，读取只需一次主键查询。
+  版本号在写入事务提交后才更新，不会让并发的写操作在同一行上排队；
+- 文章详情使用文章自身的校验值：文章、作者、标签、评论（含评论人）、附件的修改时间和数量，
+  相关文章的计算时间，与文章一次查询取出，其他文章的变化不会使其失效。
+
+浏览、点赞等缓冲计数不计入校验值，由 ``PendingCounterMixin`` 和 ``refresh`` 在输出时叠加，
+否则每次计数写库都会使全部缓存失效。
+请求带 If-None-Match / If-Modified-Since 且内容未变化时直接返回 304，不做序列化。
+版本号保存在数据库中，多进程部署时也不会命中过期内容；服务端响应缓存以 URL 和校验值为键，
+版本号变化后旧的缓存不再被使用，等待过期。
+"""
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from authority.async_api import render
+from authority.roles import get_role_access, aget_role_access
+from core.async_cache import aget, aset
+from .models import Article, Comment, Attachment, RelatedArticleSet, ResponseVersion
+
+SCOPE_ARTICLES = 'articles'
+SCOPE_CATEGORIES = 'categories'
+SCOPE_TAGS = 'tags'
+
+RESPONSE_CACHE_KEY = 'wiki:response:{}:{}'
+
+
+def _versions(rows, scopes):
+    versions = dict(rows)
+    return tuple(versions.get(scope, 0) for scope in scopes)
+
+
+def response_versions(*scopes):
+    """读取各类响应的版本号，一次主键查询"""
+    return _versions(ResponseVersion.objects.filter(scope__in=scopes).values_list('scope', 'version'), scopes)
+
+
+async def aresponse_versions(*scopes):
+    rows = [row async for row in ResponseVersion.objects.filter(scope__in=scopes).values_list('scope', 'version')]
+    return _versions(rows, scopes)
+
+
+def _bump_versions(scopes):
+    updated = ResponseVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+    if updated < len(scopes):
+        # 迁移时已创建各类别的行，这里只为新增的类别补建
+        ResponseVersion.objects.bulk_create(
+            [ResponseVersion(scope=scope, version=1) for scope in scopes], ignore_conflicts=True,
+        )
+
+
+def invalidate_responses(*scopes):
+    """版本号加一，使这些类别的校验值改变，客户端缓存和服务端已缓存的响应随之失效
+
+    在当前事务提交后执行：版本号行被所有写操作共用，在事务中更新会让并发的写事务排队等待行锁。
+    不在 atomic 块中时（自动提交或手动管理事务）立即执行。
+    """
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(scopes))
+    else:
+        _bump_versions(scopes)
+
+
+def annotate_article_stamps(queryset):
+    """给文章附加作者、标签、评论、附件的修改时间和数量及相关文章的计算时间，与文章本身一次查询取出"""
+    def related(model, **aggregate):
+        rows = model.objects.filter(article=OuterRef('pk')).order_by().values('article')
+        return Subquery(rows.annotate(**aggregate).values(*aggregate))
+
+    return queryset.annotate(
+        author_updated=F('author__updated_at'),
+        tags_updated=related(Article.tags.through, value=Max('tag__updated_at')),
+        comment_total=related(Comment, value=Count('pk')),
+        comment_latest=related(Comment, value=Max('updated_at')),
+        comment_users=related(Comment, value=Max('user__updated_at')),
+        attachment_total=related(Attachment, value=Count('pk')),
+        attachment_latest=related(Attachment, value=Max('updated_at')),
+        related_computed=Subquery(RelatedArticleSet.objects.filter(article=OuterRef('pk')).values('computed_at')),
+    )
+
+
+def article_stamp(article):
+    """文章详情的校验值，文章需经过 annotate_article_stamps；不含缓冲计数"""
+    return (
+        article.pk, article.updated_at, article.author_updated, article.tags_updated,
+        article.comment_total, article.comment_latest, article.comment_users,
+        article.attachment_total, article.attachment_latest,
+        article.related_computed,
+    )
+
+
+def _role_variant(user, access):
+    if user.is_superuser:
+        return 'superuser'
+    return ','.join(str(role_id) for role_id in sorted(access.role_ids))
+
+
+def role_variant(request):
+    """输出因角色而异时，用角色集合区分缓存"""
+    if request.user.is_superuser:
+        return _role_variant(request.user, None)
+    return _role_variant(request.user, get_role_access(request))
+
+
+async def arole_variant(request):
+    if request.user.is_superuser:
+        return _role_variant(request.user, None)
+    return _role_variant(request.user, await aget_role_access(request))
+
+
+def _latest(stamps):
+    times = []
+    for stamp in stamps:
+        values = stamp if isinstance(stamp, (tuple, list)) else [stamp]
+        times.extend(value for value in values if isinstance(value, datetime))
+    return max(times).timestamp() if times else None
+
+
+def _validators(stamps, variant):
+    """返回 (ETag, Last-Modified 时间戳)"""
+    etag = '"%s"' % hashlib.md5(repr((stamps, variant)).encode()).hexdigest()
+    return etag, _latest(stamps)
+
+
+def _response_key(request, scope, etag):
+    digest = hashlib.md5((request.build_absolute_uri() + etag).encode()).hexdigest()
+    return RESPONSE_CACHE_KEY.format(scope, digest)
+
+
+def _cache_timeout(timeout):
+    if timeout is None:
+        return getattr(settings, 'WIKI_RESPONSE_CACHE_TIMEOUT', 60)
+    return timeout
+
+
+def _finish(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # 接口需要登录，只允许客户端私有缓存，且每次使用前都要重新验证
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional_response(request, scope, stamps, build, vary_on_role=False, timeout=None, refresh=None):
+    """按校验值返回 304、缓存的响应或新生成的响应
+
+    ``stamps`` 是可 repr 的校验值列表，需包含 ``response_versions`` 取得的相关类别版本号，
+    ``build`` 在缓存未命中时调用，返回响应数据；
+    ``refresh`` 用于在返回前更新缓存数据中会变化的部分（如计数）。
+    """
+    etag, last_modified = _validators(stamps, role_variant(request) if vary_on_role else '')
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        key = _response_key(request, scope, etag)
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, _cache_timeout(timeout))
+        response = Response(refresh(data) if refresh else data)
+    return _finish(response, etag, last_modified)
+
+
+async def aconditional_response(request, scope, stamps, build, vary_on_role=False, timeout=None, refresh=None):
+    """conditional_response 的异步版本，``build`` 为协程函数，返回已渲染的响应"""
+    etag, last_modified = _validators(stamps, await arole_variant(request) if vary_on_role else '')
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        key = _response_key(request, scope, etag)
+        data = await aget(cache, key)
+        if data is None:
+            data = await build()
+            await aset(cache, key, data, _cache_timeout(timeout))
+        response = render(refresh(data) if refresh else data)
+    return _finish(response, etag, last_modified)
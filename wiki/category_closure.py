@@ -0,0 +1,124 @@
+"""分类闭包表与子树文章数
+
+``CategoryClosure`` 为每个分类保存它与自身及全部祖先的关系，查询某分类子树下的文章只需一次 JOIN::
+
+    Article.objects.filter(in_subtree(category_id))
+
+闭包表在分类保存时由信号维护：新建分类时插入它与父分类全部祖先的关系；修改父分类时，
+删除子树与原祖先之间的关系，再插入子树与新祖先之间的关系；删除分类时关系随外键级联删除。
+
+``Category.published_count`` 为分类子树中已发布文章的数量。文章发布、取消发布、更换分类或删除时，
+所属分类及其全部祖先的计数一条 UPDATE 增减；移动分类时，子树的计数从原祖先移到新祖先。
+批量写入不触发信号，之后用 ``rebuild_category_closure`` 命令重建闭包表和计数。
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Subquery
+
+from .caching import SCOPE_CATEGORIES, invalidate_responses
+from .models import Article, Category, CategoryClosure
+
+PUBLISHED = 'published'
+
+
+def in_subtree(category_id, field='category_id'):
+    """文章所属分类在指定分类的子树中：``field IN (SELECT descendant_id ... WHERE ancestor_id = ?)``"""
+    descendants = CategoryClosure.objects.filter(ancestor_id=category_id).values('descendant_id')
+    return Q(**{f'{field}__in': Subquery(descendants)})
+
+
+def _shift(queryset, delta):
+    if delta < 0:
+        # 计数已经偏低时不减到负数，等待重建修复
+        queryset = queryset.filter(published_count__gte=-delta)
+    queryset.update(published_count=F('published_count') + delta)
+    invalidate_responses(SCOPE_CATEGORIES)
+
+
+def adjust_category_counts(category_id, delta):
+    """分类及其全部祖先的已发布文章数增减 ``delta``"""
+    if category_id is None or not delta:
+        return
+    ancestors = CategoryClosure.objects.filter(descendant_id=category_id).values('ancestor_id')
+    _shift(Category.objects.filter(pk__in=Subquery(ancestors)), delta)
+
+
+def insert_category(category):
+    """新建分类：插入自身关系及与父分类全部祖先的关系"""
+    links = [CategoryClosure(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+    if category.parent_id:
+        links.extend(
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+            for ancestor_id, depth in CategoryClosure.objects.filter(
+                descendant_id=category.parent_id,
+            ).values_list('ancestor_id', 'depth')
+        )
+    CategoryClosure.objects.bulk_create(links)
+
+
+def move_category(category):
+    """分类的父分类已修改：把整个子树从原祖先下移到新父分类下"""
+    with transaction.atomic():
+        subtree = list(CategoryClosure.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        old_ancestors = list(
+            CategoryClosure.objects.filter(descendant_id=category.pk).exclude(ancestor_id=category.pk)
+            .values_list('ancestor_id', flat=True)
+        )
+        new_ancestors = list(
+            CategoryClosure.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        ) if category.parent_id else []
+        if sorted(old_ancestors) == sorted(ancestor_id for ancestor_id, _ in new_ancestors):
+            return
+
+        if old_ancestors:
+            CategoryClosure.objects.filter(descendant_id__in=subtree_ids, ancestor_id__in=old_ancestors).delete()
+        CategoryClosure.objects.bulk_create([
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+            for ancestor_id, ancestor_depth in new_ancestors
+            for descendant_id, depth in subtree
+        ], batch_size=1000)
+
+        total = Category.objects.filter(pk=category.pk).values_list('published_count', flat=True).first()
+        if total:
+            _shift(Category.objects.filter(pk__in=old_ancestors), -total)
+            _shift(Category.objects.filter(pk__in=[ancestor_id for ancestor_id, _ in new_ancestors]), total)
+
+
+def rebuild_closure():
+    """按父分类关系重建整个闭包表，返回关系行数"""
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    links = []
+    for pk in parents:
+        node, depth, seen = pk, 0, set()
+        # seen 防止数据中的环导致死循环
+        while node is not None and node not in seen:
+            seen.add(node)
+            links.append(CategoryClosure(ancestor_id=node, descendant_id=pk, depth=depth))
+            node, depth = parents.get(node), depth + 1
+    with transaction.atomic():
+        CategoryClosure.objects.all().delete()
+        CategoryClosure.objects.bulk_create(links, batch_size=2000)
+    return len(links)
+
+
+def recount_categories():
+    """按文章重新统计每个分类子树的已发布文章数，返回计数有变化的分类数"""
+    direct = Counter(dict(
+        Article.objects.filter(status=PUBLISHED).order_by().values('category_id')
+        .annotate(total=Count('pk')).values_list('category_id', 'total')
+    ))
+    totals = Counter()
+    for ancestor_id, descendant_id in CategoryClosure.objects.values_list('ancestor_id', 'descendant_id'):
+        totals[ancestor_id] += direct[descendant_id]
+
+    changed = [
+        Category(pk=pk, published_count=totals[pk])
+        for pk, count in Category.objects.values_list('pk', 'published_count')
+        if totals[pk] != count
+    ]
+    Category.objects.bulk_update(changed, ['published_count'], batch_size=500)
+    invalidate_responses(SCOPE_CATEGORIES)
+    return len(changed)
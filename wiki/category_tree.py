@@ -0,0 +1,70 @@
+"""分类树缓存
+
+一次查询加载全部分类并在内存中组装成树，序列化结果存入缓存。
+缓存键中带有分类的响应版本号（``ResponseVersion``），分类变更和已发布文章数更新时版本号加一，
+各工作进程同时失效，不会在进程内缓存中读到过期的分类树。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core.async_cache import aget, aset
+from .caching import SCOPE_CATEGORIES, aresponse_versions, response_versions
+from .models import Category
+
+CATEGORY_TREE_CACHE_KEY = 'wiki:category_tree:{}'
+
+# 与 CategorySerializer 输出的字段保持一致
+CATEGORY_NODE_FIELDS = ('id', 'name', 'description', 'icon', 'sort_order', 'is_active', 'published_count')
+
+
+def build_category_tree():
+    """一次查询构建分类树
+
+    返回 ``{'nodes': {id: node}, 'roots': [node, ...]}``，其中 node 为序列化后的字典，
+    ``children`` 按 (sort_order, id) 排序。
+    """
+    rows = Category.objects.order_by('sort_order', 'id').values(*CATEGORY_NODE_FIELDS, 'parent_id')
+    nodes = {}
+    parents = {}
+    for row in rows:
+        parents[row['id']] = row.pop('parent_id')
+        row['children'] = []
+        nodes[row['id']] = row
+
+    roots = []
+    for node_id, node in nodes.items():
+        parent = nodes.get(parents[node_id])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+    return {'nodes': nodes, 'roots': roots}
+
+
+def get_category_tree():
+    """获取分类树，优先读取缓存"""
+    key = CATEGORY_TREE_CACHE_KEY.format(*response_versions(SCOPE_CATEGORIES))
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(key, tree, getattr(settings, 'WIKI_CATEGORY_TREE_TIMEOUT', 300))
+    return tree
+
+
+async def aget_category_tree():
+    """get_category_tree 的异步版本，缓存未命中时才访问数据库"""
+    key = CATEGORY_TREE_CACHE_KEY.format(*await aresponse_versions(SCOPE_CATEGORIES))
+    tree = await aget(cache, key)
+    if tree is None:
+        tree = await sync_to_async(build_category_tree)()
+        await aset(cache, key, tree, getattr(settings, 'WIKI_CATEGORY_TREE_TIMEOUT', 300))
+    return tree
+
+
+def get_active_categories(tree=None):
+    """按 sort_order 返回所有激活分类的节点（每个节点带完整子树）"""
+    tree = tree or get_category_tree()
+    nodes = [node for node in tree['nodes'].values() if node['is_active']]
+    nodes.sort(key=lambda node: (node['sort_order'], node['id']))
+    return nodes
@@ -0,0 +1,55 @@
+"""评论树加载
+
+一次查询取出文章的全部有效评论（连同评论用户），在内存中组装回复树，
+替代逐条评论查询回复和用户的做法。
+"""
+from django.conf import settings
+
+from .models import Comment
+
+
+def load_comment_thread(article_id, max_depth=None):
+    """加载文章的评论树
+
+    返回按创建时间倒序排列的顶级评论列表，每条评论的回复挂在 ``thread_replies`` 属性上。
+    父评论已失效的回复不会出现在树中。顶级评论为第1层，超过 ``max_depth`` 层的回复
+    会被提升到第 ``max_depth`` 层显示；``max_depth`` 默认取 ``WIKI_COMMENT_MAX_DEPTH``
+    配置，为 None 时不限制。
+    """
+    if max_depth is None:
+        max_depth = getattr(settings, 'WIKI_COMMENT_MAX_DEPTH', None)
+
+    comments = list(
+        Comment.objects.filter(article_id=article_id, is_active=True)
+        .select_related('user')
+        .order_by('-created_at', '-id')
+    )
+    children = {}
+    top_level = []
+    for comment in comments:
+        comment.thread_replies = []
+        if comment.parent_id is None:
+            top_level.append(comment)
+        else:
+            children.setdefault(comment.parent_id, []).append(comment)
+
+    # 从顶级评论开始逐层挂载回复，holder 为回复实际挂载到的评论
+    stack = [(comment, 1, None) for comment in top_level]
+    while stack:
+        comment, depth, parent_holder = stack.pop()
+        if not max_depth or depth < max_depth:
+            holder, reply_depth = comment, depth + 1
+        else:
+            holder, reply_depth = parent_holder, depth
+        if holder is None:
+            continue
+        for reply in children.get(comment.pk, ()):
+            holder.thread_replies.append(reply)
+            stack.append((reply, reply_depth, holder))
+
+    if max_depth:
+        # 被提升的回复来自不同分支，重新按时间倒序排列
+        for comment in comments:
+            if len(comment.thread_replies) > 1:
+                comment.thread_replies.sort(key=lambda c: (c.created_at, c.pk), reverse=True)
+    return top_level
@@ -0,0 +1,167 @@
+"""计数器写缓冲
+
+浏览、点赞、下载等计数不在请求路径上直接写库，而是先累加到进程内缓冲区，
+由后台线程按固定间隔合并成批量 UPDATE 写回数据库。
+读取计数时返回“数据库值 + 尚未落库的增量”，保证接口返回的数字是准确的。
+增量写库后通知已注册的监听函数（如按时间段记录文章热度）。
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """进程内计数缓冲区
+
+    缓冲区以 (模型, 主键, 字段) 为键累计增量。flush 时按 (模型, 字段, 增量)
+    分组，每组只执行一条 ``UPDATE ... SET field = field + n WHERE id IN (...)``。
+    """
+
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        # 正在写库的增量，写库完成前仍计入读取结果，避免计数短暂回退
+        self._flushing = {}
+        self._thread = None
+        self._stopped = threading.Event()
+        self._listeners = []
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, 'WIKI_COUNTER_FLUSH_INTERVAL', 5)
+
+    def add_listener(self, listener):
+        """注册监听函数，每次增量写库后以 {(模型, 主键, 字段): 增量} 调用"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _notify(self, deltas):
+        # 计数已经写库，监听函数出错只记录日志，不能把增量放回缓冲区重复写入
+        for listener in self._listeners:
+            try:
+                listener(deltas)
+            except Exception:
+                logger.exception('计数器监听函数 %r 执行失败', listener)
+
+    def incr(self, model, pk, field, amount=1):
+        """累加计数，间隔为0时直接写库"""
+        if self.interval <= 0:
+            model.objects.filter(pk=pk).update(**{field: F(field) + amount})
+            self._notify({(model, pk, field): amount})
+            return
+        with self._lock:
+            self._pending[(model, pk, field)] += amount
+        self._ensure_thread()
+
+    async def aincr(self, model, pk, field, amount=1):
+        """incr 的异步版本，只有直接写库时才需要等待数据库"""
+        if self.interval <= 0:
+            await model.objects.filter(pk=pk).aupdate(**{field: F(field) + amount})
+            if self._listeners:
+                await sync_to_async(self._notify)({(model, pk, field): amount})
+            return
+        self.incr(model, pk, field, amount)
+
+    def incr_instance(self, instance, field, amount=1):
+        """累加模型实例的计数；直接写库时同时修改实例上的值，与 apply 叠加增量的结果一致"""
+        self.incr(instance._meta.concrete_model, instance.pk, field, amount)
+        if self.interval <= 0:
+            setattr(instance, field, getattr(instance, field) + amount)
+
+    async def aincr_instance(self, instance, field, amount=1):
+        """incr_instance 的异步版本"""
+        await self.aincr(instance._meta.concrete_model, instance.pk, field, amount)
+        if self.interval <= 0:
+            setattr(instance, field, getattr(instance, field) + amount)
+
+    def pending(self, model, pk, field):
+        """获取尚未落库的增量"""
+        key = (model, pk, field)
+        with self._lock:
+            return self._pending.get(key, 0) + self._flushing.get(key, 0)
+
+    def apply(self, instances, *fields):
+        """把未落库的增量叠加到模型实例上（仅修改内存中的值）"""
+        if hasattr(instances, '_meta'):
+            instances = [instances]
+        with self._lock:
+            if not self._pending and not self._flushing:
+                return
+            for instance in instances:
+                model = instance._meta.concrete_model
+                for field in fields:
+                    key = (model, instance.pk, field)
+                    delta = self._pending.get(key, 0) + self._flushing.get(key, 0)
+                    if delta:
+                        setattr(instance, field, getattr(instance, field) + delta)
+
+    def flush(self):
+        """把缓冲区中的增量批量写回数据库，返回写入的行数"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing = dict(self._pending)
+                self._pending.clear()
+
+            groups = defaultdict(list)
+            for (model, pk, field), amount in self._flushing.items():
+                if amount:
+                    groups[(model, field, amount)].append(pk)
+
+            written = 0
+            try:
+                # 各组 UPDATE 在同一事务中执行，失败时全部回滚，放回缓冲区的增量不会重复写入
+                with transaction.atomic():
+                    for (model, field, amount), pks in groups.items():
+                        written += model.objects.filter(pk__in=pks).update(**{field: F(field) + amount})
+            except Exception:
+                # 写库失败时把增量放回缓冲区，等待下次重试
+                logger.exception('计数器写回数据库失败')
+                with self._lock:
+                    for key, amount in self._flushing.items():
+                        self._pending[key] += amount
+                    self._flushing = {}
+                return 0
+            with self._lock:
+                flushed, self._flushing = self._flushing, {}
+            self._notify(flushed)
+            return written
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='wiki-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        """停止后台线程并写回剩余增量"""
+        self._stopped.set()
+        self.flush()
+
+
+counter_buffer = CounterBuffer()
+atexit.register(counter_buffer.flush)
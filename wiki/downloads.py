@@ -0,0 +1,133 @@
+"""附件下载
+
+- 以固定大小的块流式读取文件，不把整个文件读入内存；
+- 支持 ETag / Last-Modified 条件请求（304）和单个字节范围的 Range 请求（206/416），
+  以及 If-Range；
+- ``WIKI_DOWNLOAD_ACCEL`` 配置为 ``nginx`` 时返回 X-Accel-Redirect，
+  配置为 ``sendfile`` 时返回 X-Sendfile，由前置代理完成文件传输，Python 进程只负责鉴权。
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _iter_range(path, start, length, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range(header, size):
+    """解析 Range 请求头
+
+    返回 ``(start, end)``（包含 end）；请求头无效或包含多个范围时返回 None（按完整文件响应）；
+    范围无法满足时返回 ``False``。
+    """
+    match = _RANGE_RE.match(header.strip().replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N 表示最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and int(last_modified) <= if_range_date
+
+
+def file_etag(stat):
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def serve_file(request, field_file, filename=None):
+    """下载文件字段对应的文件
+
+    返回 ``(response, is_new_download)``，后者表示这是一次新的下载
+    （非 304，且不是断点续传的后续片段），用于决定是否累加下载次数。
+    """
+    if not field_file:
+        raise Http404('附件文件不存在')
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (NotImplementedError, ValueError, OSError):
+        raise Http404('附件文件不存在')
+
+    filename = filename or os.path.basename(field_file.name)
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified, False
+
+    accel = getattr(settings, 'WIKI_DOWNLOAD_ACCEL', '')
+    if accel:
+        response = HttpResponse(content_type='application/octet-stream')
+        if accel == 'nginx':
+            prefix = getattr(settings, 'WIKI_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+        else:
+            response['X-Sendfile'] = path
+        is_new = True
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and _if_range_passes(request, etag, last_modified):
+            byte_range = parse_range(range_header, stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response, False
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+            is_new = True
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(path, start, length), status=206, content_type='application/octet-stream'
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            is_new = start == 0
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response, is_new
@@ -0,0 +1,27 @@
+from django.db.models import Case, When, IntegerField
+from rest_framework.filters import BaseFilterBackend
+
+from .search import search_articles
+
+
+class ArticleSearchFilter(BaseFilterBackend):
+    """基于倒排索引的文章检索，结果按相关度排序"""
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        ranked = search_articles(query, queryset)
+        if not ranked:
+            return queryset.none()
+        ids = [article_id for article_id, _ in ranked]
+        ordering = Case(
+            *[When(pk=article_id, then=position) for position, article_id in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ids).order_by(ordering)
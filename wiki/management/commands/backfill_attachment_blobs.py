@@ -0,0 +1,68 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from wiki.models import Attachment, FileBlob
+from wiki.uploads import hash_file
+
+
+class Command(BaseCommand):
+    help = '为去重存储上线前的附件计算内容哈希并建立 FileBlob 引用，内容相同的附件改为共用一份文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批处理的附件数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stats = {'blobs': 0, 'shared': 0, 'missing': 0, 'skipped': 0}
+        last_pk = 0
+        while True:
+            # 按主键分批，已处理或缺少文件的附件不会重复读取
+            batch = list(
+                Attachment.objects.filter(content_hash='', pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'file')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                if not name or not default_storage.exists(name):
+                    stats['missing'] += 1
+                    continue
+                with default_storage.open(name, 'rb') as f:
+                    sha256, size = hash_file(f)
+                stats[self.link(pk, name, sha256, size)] += 1
+            self.stdout.write(f'  已处理到附件 {last_pk}', ending='\r')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'新建 {stats["blobs"]} 个文件记录，{stats["shared"]} 个附件改为引用已有文件'
+        ))
+        if stats['missing']:
+            self.stdout.write(self.style.WARNING(f'{stats["missing"]} 个附件的文件不存在，未处理'))
+
+    def link(self, pk, name, sha256, size):
+        """把附件登记到内容哈希对应的 FileBlob，返回 'blobs'（新建）、'shared'（引用已有文件）
+        或 'skipped'（计算哈希期间附件已被删除或修改）"""
+        with transaction.atomic():
+            if not Attachment.objects.select_for_update().filter(pk=pk, file=name, content_hash='').exists():
+                return 'skipped'
+            blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+            if blob is None:
+                # 原文件直接作为去重文件，不移动
+                FileBlob.objects.create(sha256=sha256, file=name, size=size, ref_count=1)
+                result = 'blobs'
+            else:
+                FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                result = 'shared'
+            target = name if blob is None else blob.file.name
+            Attachment.objects.filter(pk=pk).update(
+                file=target, content_hash=sha256, file_size=size, updated_at=timezone.now(),
+            )
+            # 重复的文件不再被引用时删除
+            if target != name and not (
+                Attachment.objects.filter(file=name).exists() or FileBlob.objects.filter(file=name).exists()
+            ):
+                transaction.on_commit(lambda: default_storage.delete(name))
+        return result
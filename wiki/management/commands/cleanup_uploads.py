@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wiki.models import UploadSession
+from wiki.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = '清理长时间未更新的分块上传会话及其临时文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='超过多少小时未更新的会话会被清理')
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(hours=options['hours'])
+        count = 0
+        for session in UploadSession.objects.filter(updated_at__lt=deadline).iterator():
+            discard_upload(session)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'已清理 {count} 个上传会话'))
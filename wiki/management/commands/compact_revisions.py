@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wiki.models import ArticleRevision
+from wiki.revisions import compact_revisions
+
+
+class Command(BaseCommand):
+    help = '压缩文章修订历史：旧版本每天只保留最后一个，并按当前快照间隔重新编码差异链'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='早于多少天的版本按天合并')
+        parser.add_argument('--article', type=int, action='append', help='只处理指定文章，可重复指定')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        articles = ArticleRevision.objects.order_by('article_id').values_list('article_id', flat=True).distinct()
+        if options['article']:
+            articles = articles.filter(article_id__in=options['article'])
+
+        # 每篇文章、每天最后一个版本的版本号
+        old_rows = ArticleRevision.objects.filter(created_at__lt=cutoff, article_id__in=articles)
+        day_last = {}
+        for article_id, number, created_at in old_rows.order_by('number').values_list(
+            'article_id', 'number', 'created_at'
+        ).iterator():
+            day_last[(article_id, timezone.localdate(created_at))] = number
+        last_of_day = {(article_id, number) for (article_id, _), number in day_last.items()}
+
+        def keep(revision):
+            if revision.created_at >= cutoff:
+                return True
+            return (revision.article_id, revision.number) in last_of_day
+
+        total_dropped = total_before = total_after = 0
+        for article_id in list(articles):
+            dropped, before, after = compact_revisions(article_id, keep)
+            total_dropped += dropped
+            total_before += before
+            total_after += after
+
+        self.stdout.write(self.style.SUCCESS(
+            f'删除 {total_dropped} 个旧版本，修订存储从 {total_before} 字节减少到 {total_after} 字节'
+        ))
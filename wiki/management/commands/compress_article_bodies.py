@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from wiki.models import Article, ArticleBody
+
+
+class Command(BaseCommand):
+    help = '补齐缺失的文章正文记录，按当前设置重新压缩正文，并输出存储统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的正文数')
+        parser.add_argument('--recompress', action='store_true', help='按当前压缩设置重新编码全部正文')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        missing = Article.objects.filter(body__isnull=True).values_list('pk', flat=True)
+        created = ArticleBody.objects.bulk_create(
+            [ArticleBody.from_text(Article(pk=pk), '') for pk in missing.iterator()],
+            batch_size=batch_size,
+        )
+
+        changed = 0
+        if options['recompress']:
+            batch = []
+            for body in ArticleBody.objects.order_by('pk').iterator(chunk_size=batch_size):
+                encoded = ArticleBody.from_text(Article(pk=body.article_id), body.text)
+                if encoded.codec == body.codec and bytes(encoded.data) == bytes(body.data):
+                    continue
+                batch.append(encoded)
+                if len(batch) >= batch_size:
+                    ArticleBody.objects.bulk_update(batch, ['codec', 'data', 'raw_size', 'stored_size'])
+                    changed += len(batch)
+                    batch = []
+            ArticleBody.objects.bulk_update(batch, ['codec', 'data', 'raw_size', 'stored_size'])
+            changed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'补齐 {len(created)} 条正文记录，重新压缩 {changed} 条'))
+        for row in ArticleBody.objects.values('codec').annotate(
+            total=Count('pk'), raw=Sum('raw_size'), stored=Sum('stored_size')
+        ).order_by('codec'):
+            ratio = row['stored'] / row['raw'] if row['raw'] else 1
+            self.stdout.write(
+                f"{row['codec']:<6} {row['total']:>8} 篇  原始 {row['raw']:>12} 字节  "
+                f"存储 {row['stored']:>12} 字节  压缩比 {ratio:.1%}"
+            )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from wiki.related import compute_related
+
+
+class Command(BaseCommand):
+    help = '按标签和正文 tf-idf 相似度计算每篇已发布文章的相关文章，默认只计算有变化的文章（由 cron 定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='重新计算全部文章')
+        parser.add_argument('--size', type=int, help='每篇文章保存的相关文章数，默认 WIKI_RELATED_SIZE')
+        parser.add_argument('--interval', type=int, default=0, help='大于0时常驻运行，每隔该秒数计算一次')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            stats = compute_related(full=full, size=options['size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'共 {stats["articles"]} 篇已发布文章，重新计算 {stats["computed"]} 篇，'
+                f'移除 {stats["removed"]} 篇已下线文章的结果；读取 {stats["load_seconds"]:.2f}s，'
+                f'计算 {stats["compute_seconds"]:.2f}s，共 {stats["total_seconds"]:.2f}s'
+            ))
+            if options['interval'] <= 0:
+                return
+            # 常驻运行时只在第一次全部计算
+            full = False
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from wiki.counters import counter_buffer
+from wiki.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = '按最近时间段的浏览和点赞计算随时间衰减的热度，保存全站和各分类的热门文章排行（由 cron 定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help='每个排行保留的文章数，默认 WIKI_TRENDING_TOP_K')
+        parser.add_argument('--interval', type=int, default=0, help='大于0时常驻运行，每隔该秒数计算一次')
+
+    def handle(self, *args, **options):
+        while True:
+            # 先写回本进程缓冲中的计数，使其计入活跃度
+            counter_buffer.flush()
+            stats = compute_trending(top_k=options['top_k'])
+            self.stdout.write(self.style.SUCCESS(
+                f'已计算 {stats["articles"]} 篇文章的热度，写入 {stats["entries"]} 条排行，'
+                f'清理 {stats["pruned"]} 条过期活跃度；计算 {stats["compute_seconds"]:.2f}s，'
+                f'共 {stats["total_seconds"]:.2f}s'
+            ))
+            if options['interval'] <= 0:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
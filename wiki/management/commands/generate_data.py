@@ -0,0 +1,355 @@
+import hashlib
+import math
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from authority.menus import invalidate_menus
+from authority.models import Role, Menu
+from authority.roles import invalidate_all_role_access
+from shop.models import Product
+from wiki.caching import SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS, invalidate_responses
+from wiki.bulk import article_rows, explicit_timestamps, next_pk
+from wiki.category_closure import rebuild_closure, recount_categories
+from wiki.models import (
+    Article, ArticleBody, ArticleRevision, Attachment, Category, Comment, FileBlob, SearchTerm, Tag,
+)
+from wiki.tag_counts import recount_tags
+from wiki.uploads import acquire_blob
+
+User = get_user_model()
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰'
+
+# 按主题分组的词汇，每篇文章集中使用一两个主题，使词频分布接近真实文档
+TOPICS = {
+    '后端': ['数据库', '索引', '事务', '缓存', '连接池', '查询优化', '分库分表', '主从复制', 'mysql', 'redis',
+           'django', 'orm', '接口', '序列化', '中间件', '并发', '锁', '队列'],
+    '前端': ['组件', '路由', '状态管理', '打包', '渲染', '响应式', '样式', '虚拟节点', 'vue', 'react',
+           'webpack', 'typescript', '表单', '动画', '浏览器', '兼容性'],
+    '运维': ['部署', '容器', '镜像', '监控', '告警', '日志', '负载均衡', '灰度发布', 'docker', 'kubernetes',
+           'nginx', '备份', '扩容', '证书', '流水线', '回滚'],
+    '算法': ['排序', '哈希', '二叉树', '动态规划', '图', '最短路径', '复杂度', '堆', '递归', '贪心',
+           '字符串匹配', '位运算', '滑动窗口', '并查集'],
+    '产品': ['需求', '用户体验', '原型', '迭代', '埋点', '转化率', '留存', '调研', '评审', '路线图',
+           '指标', '增长', '反馈', '版本规划'],
+    '安全': ['认证', '授权', '令牌', '加密', '签名', '漏洞', '注入', '跨站', '审计', '权限',
+           'jwt', 'https', '密钥', '防火墙'],
+}
+CONNECTIVES = ['通过', '基于', '对于', '结合', '优化', '实现', '分析', '设计', '使用', '比较', '总结', '改进']
+FILLERS = ['的', '和', '以及', '在', '中', '时', '后', '需要', '可以', '能够', '进一步', '同时']
+EXTENSIONS = ['.pdf', '.png', '.zip', '.docx', '.txt', '.xlsx']
+
+STATUS_WEIGHTS = (('published', 80), ('draft', 15), ('archived', 5))
+
+
+def zipf_weights(count, exponent=1.0):
+    """前面的元素被选中的概率更高，模拟少数作者、热门标签占多数的分布"""
+    return list(accumulate(1 / (i + 1) ** exponent for i in range(count)))
+
+
+class TextGenerator:
+    """按主题生成标题、摘要、正文和评论"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.topics = list(TOPICS)
+
+    def pick_topics(self):
+        first = self.rng.choice(self.topics)
+        if self.rng.random() < 0.4:
+            return [first, self.rng.choice(self.topics)]
+        return [first]
+
+    def words(self, topics, count):
+        vocabulary = [word for topic in topics for word in TOPICS[topic]]
+        return self.rng.choices(vocabulary, k=count)
+
+    def sentence(self, topics):
+        rng = self.rng
+        parts = []
+        for word in self.words(topics, rng.randint(3, 7)):
+            parts.append(rng.choice(CONNECTIVES) if rng.random() < 0.3 else '')
+            parts.append(word)
+            parts.append(rng.choice(FILLERS))
+        return ''.join(parts) + rng.choice('。。。，；！？')
+
+    def paragraph(self, topics):
+        return ''.join(self.sentence(topics) for _ in range(self.rng.randint(2, 6)))
+
+    def title(self, topics):
+        head, tail = self.words(topics, 2)
+        return f'{self.rng.choice(CONNECTIVES)}{head}的{tail}实践'
+
+    def article(self, topics, paragraphs):
+        lines = []
+        for i in range(paragraphs):
+            if i % 4 == 0:
+                lines.append(f'## {self.rng.choice(CONNECTIVES)}{self.words(topics, 1)[0]}')
+                lines.append('')
+            lines.append(self.paragraph(topics))
+            lines.append('')
+        return '\n'.join(lines).rstrip()
+
+
+class Command(BaseCommand):
+    help = '批量生成用于性能测试的模拟数据（用户、角色、菜单、分类、标签、文章、评论、附件、商品），相同种子生成相同内容'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+        parser.add_argument('--users', type=int, default=200, help='用户数')
+        parser.add_argument('--roles', type=int, default=8, help='角色数')
+        parser.add_argument('--menus', type=int, default=30, help='菜单数')
+        parser.add_argument('--categories', type=int, default=60, help='分类数')
+        parser.add_argument('--category-depth', type=int, default=3, help='分类最大层级')
+        parser.add_argument('--tags', type=int, default=300, help='标签数')
+        parser.add_argument('--articles', type=int, default=10000, help='文章数')
+        parser.add_argument('--paragraphs', type=int, default=8, help='每篇文章的平均段落数')
+        parser.add_argument('--comments', type=float, default=5, help='每篇文章的平均评论数')
+        parser.add_argument('--reply-ratio', type=float, default=0.4, help='评论中回复所占比例')
+        parser.add_argument('--attachments', type=float, default=0.3, help='每篇文章的平均附件数')
+        parser.add_argument('--products', type=int, default=500, help='商品数')
+        parser.add_argument('--days', type=int, default=365, help='数据的时间跨度（天）')
+        parser.add_argument('--password', default='password', help='生成用户的密码')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的文章数')
+        parser.add_argument('--skip-search-index', action='store_true', help='不建立全文检索索引')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.text = TextGenerator(self.rng)
+        self.options = options
+        # 时间以当天零点为基准，同一天内重复生成的数据完全相同
+        self.now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.span = timedelta(days=options['days'])
+
+        with explicit_timestamps(Article, ArticleBody, Comment, Attachment):
+            roles = self.step('角色', self.create_roles)
+            self.step('菜单', lambda: self.create_menus(roles))
+            users = self.step('用户', lambda: self.create_users(roles))
+            categories = self.step('分类', self.create_categories)
+            tags = self.step('标签', self.create_tags)
+            blobs = self.step('附件文件', self.create_blobs)
+            self.step('文章', lambda: self.create_articles(users, categories, tags, blobs))
+            self.step('商品', self.create_products)
+
+        rebuild_closure()
+        recount_categories()
+        recount_tags()
+        invalidate_menus()
+        invalidate_all_role_access()
+        invalidate_responses(SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS)
+
+    def step(self, name, func):
+        start = time.perf_counter()
+        result = func()
+        count = len(result) if isinstance(result, (list, dict)) else result
+        self.stdout.write(f'{name:<8} {count:>9}  {time.perf_counter() - start:7.2f}s')
+        return result
+
+    def moment(self, after=None):
+        """数据时间范围内的随机时刻，after 不为空时取其之后的时刻"""
+        start = after or self.now - self.span
+        seconds = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.random() * seconds)
+
+    def create_roles(self):
+        start = next_pk(Role)
+        roles = Role.objects.bulk_create([
+            Role(pk=pk, name=f'角色{pk}', description=f'模拟数据角色{pk}')
+            for pk in range(start, start + self.options['roles'])
+        ])
+        return [role.pk for role in roles]
+
+    def create_menus(self, role_ids):
+        count = self.options['menus']
+        start = next_pk(Menu)
+        top_level = max(1, count // 5)
+        menus = []
+        for i, pk in enumerate(range(start, start + count)):
+            parent_id = None if i < top_level else start + self.rng.randrange(top_level)
+            menus.append(Menu(
+                pk=pk, name=f'菜单{pk}', parent_id=parent_id, path=f'/menu{pk}',
+                component=f'views/Menu{pk}', icon='menu', sort_order=i,
+            ))
+        Menu.objects.bulk_create(menus)
+        # 每个角色可访问一部分菜单
+        links = [
+            Menu.roles.through(menu_id=menu.pk, role_id=role_id)
+            for role_id in role_ids for menu in menus if self.rng.random() < 0.5
+        ]
+        Menu.roles.through.objects.bulk_create(links)
+        return menus
+
+    def create_users(self, role_ids):
+        start = next_pk(User)
+        password = make_password(self.options['password'])
+        users = []
+        for pk in range(start, start + self.options['users']):
+            users.append(User(
+                pk=pk, username=f'user{pk}', password=password, email=f'user{pk}@example.com',
+                nickname=self.rng.choice(SURNAMES) + ''.join(self.rng.choices(GIVEN_NAMES, k=self.rng.randint(1, 2))),
+                is_staff=self.rng.random() < 0.05,
+            ))
+        User.objects.bulk_create(users, batch_size=self.options['batch_size'])
+        if role_ids:
+            User.roles.through.objects.bulk_create([
+                User.roles.through(user_id=user.pk, role_id=role_id)
+                for user in users for role_id in self.rng.sample(role_ids, min(len(role_ids), self.rng.randint(1, 2)))
+            ], batch_size=self.options['batch_size'])
+        return [user.pk for user in users]
+
+    def create_categories(self):
+        count, max_depth = self.options['categories'], self.options['category_depth']
+        start = next_pk(Category)
+        roots = max(1, count // 6)
+        depth = {}
+        categories = []
+        for i, pk in enumerate(range(start, start + count)):
+            parents = [key for key, value in depth.items() if value < max_depth]
+            parent_id = None if i < roots or not parents else self.rng.choice(parents)
+            depth[pk] = depth[parent_id] + 1 if parent_id else 1
+            topic = self.rng.choice(self.text.topics)
+            categories.append(Category(
+                pk=pk, name=f'{topic}{pk}', description=f'{topic}相关文章', parent_id=parent_id,
+                icon='folder', sort_order=i,
+            ))
+        Category.objects.bulk_create(categories)
+        return [category.pk for category in categories]
+
+    def create_tags(self):
+        vocabulary = [word for words in TOPICS.values() for word in words]
+        existing = set(Tag.objects.values_list('name', flat=True))
+        start = next_pk(Tag)
+        tags = []
+        for i, pk in enumerate(range(start, start + self.options['tags'])):
+            name = vocabulary[i % len(vocabulary)]
+            if i >= len(vocabulary) or name in existing:
+                name = f'{name}-{pk}'
+            tags.append(Tag(pk=pk, name=name))
+        Tag.objects.bulk_create(tags)
+        return [tag.pk for tag in tags]
+
+    def create_blobs(self):
+        """生成一组附件文件，附件按内容去重后引用这些文件"""
+        if not self.options['attachments']:
+            return []
+        blobs = []
+        for i in range(16):
+            size = int(1024 * 2 ** self.rng.uniform(0, 8))
+            content = self.rng.randbytes(size)
+            sha256 = hashlib.sha256(content).hexdigest()
+            blob = acquire_blob(sha256, size, f'file{i}{EXTENSIONS[i % len(EXTENSIONS)]}', ContentFile(content))
+            blobs.append(blob)
+        return blobs
+
+    def create_articles(self, user_ids, category_ids, tag_ids, blobs):
+        options = self.options
+        author_weights = zipf_weights(len(user_ids))
+        tag_weights = zipf_weights(len(tag_ids))
+        statuses, status_weights = zip(*STATUS_WEIGHTS)
+        start = next_pk(Article)
+        comment_pk = next_pk(Comment)
+        attachment_pk = next_pk(Attachment)
+        blob_refs = dict.fromkeys((blob.pk for blob in blobs), 0)
+        self.articles = range(start, start + options['articles'])
+
+        for batch_start in range(start, self.articles.stop, options['batch_size']):
+            batch_end = min(batch_start + options['batch_size'], self.articles.stop)
+            articles, bodies, revisions, article_tags, comments, attachments, terms = [], [], [], [], [], [], []
+            for pk in range(batch_start, batch_end):
+                topics = self.text.pick_topics()
+                created_at = self.moment()
+                updated_at = self.moment(created_at)
+                status = self.rng.choices(statuses, status_weights)[0]
+                text = self.text.article(topics, max(1, int(self.rng.gauss(options['paragraphs'], 3))))
+                article = Article(
+                    pk=pk, title=self.text.title(topics), summary=self.text.sentence(topics),
+                    category_id=self.rng.choice(category_ids),
+                    author_id=self.rng.choices(user_ids, cum_weights=author_weights)[0],
+                    status=status, is_pinned=self.rng.random() < 0.01,
+                    view_count=int(self.rng.paretovariate(1.2) * 20), like_count=int(self.rng.paretovariate(1.5) * 2),
+                    created_at=created_at, updated_at=updated_at,
+                    published_at=created_at if status != 'draft' else None,
+                )
+                articles.append(article)
+                body, revision, article_terms = article_rows(article, text, not options['skip_search_index'])
+                bodies.append(body)
+                revisions.append(revision)
+                terms.extend(article_terms)
+                chosen = {self.rng.choices(tag_ids, cum_weights=tag_weights)[0] for _ in range(self.rng.randint(1, 5))}
+                article_tags.extend(Article.tags.through(article_id=pk, tag_id=tag_id) for tag_id in chosen)
+
+                thread = []
+                for _ in range(self.poisson(options['comments'])):
+                    parent = self.rng.choice(thread) if thread and self.rng.random() < options['reply_ratio'] else None
+                    comment_at = self.moment(parent.created_at if parent else created_at)
+                    comment = Comment(
+                        pk=comment_pk, article_id=pk, user_id=self.rng.choice(user_ids),
+                        parent_id=parent.pk if parent else None, content=self.text.sentence(topics),
+                        is_active=self.rng.random() < 0.97, created_at=comment_at, updated_at=comment_at,
+                    )
+                    thread.append(comment)
+                    comment_pk += 1
+                comments.extend(thread)
+
+                for _ in range(self.poisson(options['attachments']) if blobs else 0):
+                    blob = self.rng.choice(blobs)
+                    blob_refs[blob.pk] += 1
+                    attached_at = self.moment(created_at)
+                    extension = blob.file.name[blob.file.name.rfind('.'):]
+                    attachments.append(Attachment(
+                        pk=attachment_pk, article_id=pk, name=f'{self.text.words(topics, 1)[0]}{extension}',
+                        file=blob.file.name, file_size=blob.size, content_hash=blob.sha256,
+                        download_count=int(self.rng.paretovariate(1.5)) - 1,
+                        created_at=attached_at, updated_at=attached_at,
+                    ))
+                    attachment_pk += 1
+
+            with transaction.atomic():
+                Article.objects.bulk_create(articles)
+                ArticleBody.objects.bulk_create(bodies)
+                ArticleRevision.objects.bulk_create(revisions)
+                Article.tags.through.objects.bulk_create(article_tags)
+                Comment.objects.bulk_create(comments)
+                Attachment.objects.bulk_create(attachments)
+                SearchTerm.objects.bulk_create(terms, batch_size=5000)
+            self.stdout.write(f'  {batch_end - start}/{options["articles"]}', ending='\r')
+
+        # create_blobs 时每个文件已计入一次引用
+        for blob_pk, refs in blob_refs.items():
+            FileBlob.objects.filter(pk=blob_pk).update(ref_count=F('ref_count') + refs - 1)
+        return len(self.articles)
+
+    def create_products(self):
+        start = next_pk(Product)
+        products = []
+        for pk in range(start, start + self.options['products']):
+            topics = self.text.pick_topics()
+            products.append(Product(
+                pk=pk, name=f'{self.text.words(topics, 1)[0]}套件{pk}', description=self.text.paragraph(topics),
+                price=Decimal(int(math.exp(self.rng.uniform(2, 9)) * 100)) / 100,
+                is_active=self.rng.random() < 0.9,
+            ))
+        Product.objects.bulk_create(products, batch_size=self.options['batch_size'])
+        return len(products)
+
+    def poisson(self, mean):
+        """泊松分布的随机数（Knuth 算法，均值较小时足够快）"""
+        if mean <= 0:
+            return 0
+        limit, count, product = math.exp(-mean), 0, self.rng.random()
+        while product > limit:
+            count += 1
+            product *= self.rng.random()
+        return count
@@ -0,0 +1,75 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from wiki.caching import SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS, invalidate_responses
+from wiki.category_closure import recount_categories
+from wiki.tag_counts import recount_tags
+from wiki.transfer import ArticleImporter, TransferError
+
+
+class Command(BaseCommand):
+    help = (
+        '批量导入 export_articles 导出的 NDJSON，标签和分类按名称匹配，缺少的自动创建。'
+        '主键预先分配，请在停止写入（维护模式）时运行，否则可能与并发插入冲突'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='NDJSON 文件，- 表示标准输入')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写入的文章数')
+        parser.add_argument('--default-author', help='找不到作者或评论人时使用的用户名，不指定时遇到未知用户报错')
+        parser.add_argument('--skip-search-index', action='store_true', help='不建立全文检索索引')
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['default_author']:
+            try:
+                default_author = get_user_model().objects.get(username=options['default_author']).pk
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'用户 {options["default_author"]} 不存在')
+
+        importer = ArticleImporter(
+            batch_size=options['batch_size'], default_author=default_author,
+            index=not options['skip_search_index'],
+        )
+        start = time.perf_counter()
+
+        def progress(stats):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'  {stats["articles"]} 篇文章  {stats["articles"] / elapsed:.0f} 篇/秒  {stats["rows"] / elapsed:.0f} 行/秒',
+                ending='\r',
+            )
+
+        source = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8')
+        try:
+            stats = importer.load(source, progress)
+        except TransferError as exc:
+            raise CommandError(f'{exc}（此前的批次已写入 {importer.stats["articles"]} 篇文章）')
+        except IntegrityError as exc:
+            raise CommandError(
+                f'写入冲突：{exc}。导入期间有其他写入占用了预分配的主键，请停止写入后重试'
+                f'（此前的批次已写入 {importer.stats["articles"]} 篇文章）'
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            # 批量写入不触发信号，重新统计标签和分类的文章数
+            recount_tags()
+            recount_categories()
+            invalidate_responses(SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'已导入 {stats["articles"]} 篇文章、{stats["comments"]} 条评论、{stats["attachments"]} 个附件，'
+            f'新建 {stats["categories"]} 个分类、{stats["tags"]} 个标签；共写入 {stats["rows"]} 行，'
+            f'耗时 {elapsed:.2f}s（{stats["articles"] / max(elapsed, 1e-9):.0f} 篇/秒，'
+            f'{stats["rows"] / max(elapsed, 1e-9):.0f} 行/秒）'
+        ))
+        if stats['unknown_users']:
+            self.stdout.write(self.style.WARNING(f'{stats["unknown_users"]} 处作者或评论人不存在，已改用 {options["default_author"]}'))
+        if stats['missing_files']:
+            self.stdout.write(self.style.WARNING(f'{stats["missing_files"]} 个附件的文件不在本库中，需另行复制文件'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from wiki.category_closure import rebuild_closure, recount_categories
+
+
+class Command(BaseCommand):
+    help = '按父分类关系重建分类闭包表，并重新统计每个分类子树的已发布文章数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counts-only', action='store_true', help='只重新统计文章数，不重建闭包表')
+
+    def handle(self, *args, **options):
+        if not options['counts_only']:
+            links = rebuild_closure()
+            self.stdout.write(f'闭包表已重建，共 {links} 行')
+        changed = recount_categories()
+        self.stdout.write(self.style.SUCCESS(f'已重新统计分类文章数，其中 {changed} 个分类计数有误已修正'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from wiki.models import Article
+from wiki.search import index_article
+
+
+class Command(BaseCommand):
+    help = '重建文章全文检索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批加载的文章数')
+        parser.add_argument('--article', type=int, action='append', help='只重建指定文章，可重复指定')
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.order_by('pk').select_related('body').only('pk', 'title', 'summary', 'body')
+        if options['article']:
+            queryset = queryset.filter(pk__in=options['article'])
+
+        articles = terms = 0
+        for article in queryset.iterator(chunk_size=options['batch_size']):
+            terms += index_article(article)
+            articles += 1
+        self.stdout.write(self.style.SUCCESS(f'已重建 {articles} 篇文章的索引，共 {terms} 个词项'))
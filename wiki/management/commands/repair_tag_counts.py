@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from wiki.models import Tag
+from wiki.tag_counts import recount_tags
+
+
+class Command(BaseCommand):
+    help = '按文章标签关联重新统计每个标签的已发布文章数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tag', type=int, action='append', help='只统计指定标签，可重复指定')
+
+    def handle(self, *args, **options):
+        before = dict(Tag.objects.values_list('pk', 'article_count'))
+        updated = recount_tags(options['tag'])
+        changed = sum(
+            1 for pk, count in Tag.objects.values_list('pk', 'article_count') if before.get(pk) != count
+        )
+        self.stdout.write(self.style.SUCCESS(f'已重新统计 {updated} 个标签，其中 {changed} 个计数有误已修正'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32, verbose_name='词项')),
+                ('weight', models.FloatField(verbose_name='权重')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='wiki.article', verbose_name='文章')),
+            ],
+            options={
+                'verbose_name': '检索词项',
+                'verbose_name_plural': '检索词项',
+                'unique_together': {('term', 'article')},
+            },
+        ),
+    ]
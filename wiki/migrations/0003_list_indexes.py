@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0002_search_term'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['status', '-is_pinned', '-created_at', 'id'], name='wiki_article_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', 'status', '-is_pinned', '-created_at', 'id'], name='wiki_article_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='wiki_comment_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'is_active', '-created_at', '-id'], name='wiki_comment_article_idx'),
+        ),
+    ]
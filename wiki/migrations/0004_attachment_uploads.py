@@ -0,0 +1,64 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:43
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0003_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(upload_to='wiki/attachments/', verbose_name='文件')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='文件大小')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='引用次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '附件文件',
+                'verbose_name_plural': '附件文件',
+            },
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='内容哈希'),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='文件大小'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='附件名称')),
+                ('filename', models.CharField(max_length=255, verbose_name='文件名')),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='文件大小')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='分块大小')),
+                ('received_size', models.PositiveBigIntegerField(default=0, verbose_name='已接收大小')),
+                ('chunk_hashes', models.JSONField(blank=True, default=list, verbose_name='分块哈希')),
+                ('status', models.CharField(choices=[('uploading', '上传中'), ('completed', '已完成')], default='uploading', max_length=20, verbose_name='状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='wiki.article', verbose_name='文章')),
+                ('attachment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wiki.attachment', verbose_name='附件')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '上传会话',
+                'verbose_name_plural': '上传会话',
+            },
+        ),
+    ]
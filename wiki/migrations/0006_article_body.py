@@ -0,0 +1,93 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:49
+
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# 正文编码与 wiki.bodies 在编写本迁移时的实现一致，复制到这里，以后修改应用代码不影响迁移
+CODEC_RAW = 'raw'
+CODEC_ZLIB = 'zlib'
+COMPRESS_MIN_SIZE = 256
+COMPRESS_LEVEL = 6
+
+
+def encode_body(text):
+    raw = (text or '').encode('utf-8')
+    if len(raw) >= COMPRESS_MIN_SIZE:
+        compressed = zlib.compress(raw, COMPRESS_LEVEL)
+        if len(compressed) < len(raw):
+            return CODEC_ZLIB, compressed, len(raw)
+    return CODEC_RAW, raw, len(raw)
+
+
+def decode_body(codec, data):
+    data = bytes(data)
+    if codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    elif codec != CODEC_RAW:
+        raise ValueError(f'未知的正文编码: {codec}')
+    return data.decode('utf-8')
+
+
+def move_content_to_body(apps, schema_editor):
+    """把正文从文章表迁移到压缩存储"""
+    Article = apps.get_model('wiki', 'Article')
+    ArticleBody = apps.get_model('wiki', 'ArticleBody')
+    db = schema_editor.connection.alias
+    batch = []
+    rows = Article.objects.using(db).order_by('pk').values_list('pk', 'content')
+    for pk, content in rows.iterator(chunk_size=BATCH_SIZE):
+        codec, data, raw_size = encode_body(content)
+        batch.append(ArticleBody(article_id=pk, codec=codec, data=data, raw_size=raw_size, stored_size=len(data)))
+        if len(batch) >= BATCH_SIZE:
+            ArticleBody.objects.using(db).bulk_create(batch)
+            batch = []
+    ArticleBody.objects.using(db).bulk_create(batch)
+
+
+def move_body_to_content(apps, schema_editor):
+    """回滚时把正文写回文章表"""
+    Article = apps.get_model('wiki', 'Article')
+    ArticleBody = apps.get_model('wiki', 'ArticleBody')
+    db = schema_editor.connection.alias
+    for body in ArticleBody.objects.using(db).order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        Article.objects.using(db).filter(pk=body.article_id).update(content=decode_body(body.codec, body.data))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0005_updated_at_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleBody',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='wiki.article', verbose_name='文章')),
+                ('codec', models.CharField(choices=[('raw', '未压缩'), ('zlib', 'zlib')], default='raw', max_length=10, verbose_name='编码方式')),
+                ('data', models.BinaryField(verbose_name='正文数据')),
+                ('raw_size', models.PositiveIntegerField(default=0, verbose_name='原始大小')),
+                ('stored_size', models.PositiveIntegerField(default=0, verbose_name='存储大小')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '文章正文',
+                'verbose_name_plural': '文章正文',
+            },
+        ),
+        migrations.RunPython(move_content_to_body, move_body_to_content),
+        # 带上默认值，回滚时才能重新加回非空列
+        migrations.AlterField(
+            model_name='article',
+            name='content',
+            field=models.TextField(default='', verbose_name='内容'),
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='content',
+        ),
+    ]
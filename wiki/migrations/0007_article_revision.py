@@ -0,0 +1,40 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0006_article_body'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='版本号')),
+                ('title', models.CharField(max_length=200, verbose_name='标题')),
+                ('summary', models.TextField(blank=True, verbose_name='摘要')),
+                ('is_snapshot', models.BooleanField(default=False, verbose_name='是否完整快照')),
+                ('codec', models.CharField(choices=[('raw', '未压缩'), ('zlib', 'zlib')], default='raw', max_length=10, verbose_name='编码方式')),
+                ('data', models.BinaryField(verbose_name='正文数据')),
+                ('raw_size', models.PositiveIntegerField(default=0, verbose_name='正文大小')),
+                ('stored_size', models.PositiveIntegerField(default=0, verbose_name='存储大小')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='wiki.article', verbose_name='文章')),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='article_revisions', to=settings.AUTH_USER_MODEL, verbose_name='修改人')),
+            ],
+            options={
+                'verbose_name': '文章修订',
+                'verbose_name_plural': '文章修订',
+                'ordering': ['article', '-number'],
+                'unique_together': {('article', 'number')},
+            },
+        ),
+    ]
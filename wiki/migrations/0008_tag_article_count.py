@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_published_articles(apps, schema_editor):
+    """统计已有标签的已发布文章数"""
+    Tag = apps.get_model('wiki', 'Tag')
+    Article = apps.get_model('wiki', 'Article')
+    db = schema_editor.connection.alias
+    published = (
+        Article.tags.through.objects.using(db).filter(tag_id=OuterRef('pk'), article__status='published')
+        .order_by().values('tag_id').annotate(total=Count('article_id')).values('total')
+    )
+    Tag.objects.using(db).update(article_count=Coalesce(Subquery(published, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0007_article_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='article_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='已发布文章数'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-article_count', 'name'], name='wiki_tag_cloud_idx'),
+        ),
+        migrations.RunPython(count_published_articles, migrations.RunPython.noop),
+    ]
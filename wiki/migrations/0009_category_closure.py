@@ -0,0 +1,63 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:24
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_closure(apps, schema_editor):
+    """为已有分类建立闭包表并统计子树的已发布文章数"""
+    Category = apps.get_model('wiki', 'Category')
+    CategoryClosure = apps.get_model('wiki', 'CategoryClosure')
+    Article = apps.get_model('wiki', 'Article')
+    db = schema_editor.connection.alias
+
+    parents = dict(Category.objects.using(db).values_list('pk', 'parent_id'))
+    direct = Counter(dict(
+        Article.objects.using(db).filter(status='published').order_by().values('category_id')
+        .annotate(total=Count('pk')).values_list('category_id', 'total')
+    ))
+    links, totals = [], Counter()
+    for pk in parents:
+        node, depth, seen = pk, 0, set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            links.append(CategoryClosure(ancestor_id=node, descendant_id=pk, depth=depth))
+            totals[node] += direct[pk]
+            node, depth = parents.get(node), depth + 1
+    CategoryClosure.objects.using(db).bulk_create(links, batch_size=2000)
+    for pk, total in totals.items():
+        if total:
+            Category.objects.using(db).filter(pk=pk).update(published_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0008_tag_article_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='已发布文章数'),
+        ),
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='层级差')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='wiki.category', verbose_name='祖先分类')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='wiki.category', verbose_name='后代分类')),
+            ],
+            options={
+                'verbose_name': '分类闭包',
+                'verbose_name_plural': '分类闭包',
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0009_category_closure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='时间段')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='浏览次数')),
+                ('likes', models.PositiveIntegerField(default=0, verbose_name='点赞次数')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='wiki.article', verbose_name='文章')),
+            ],
+            options={
+                'verbose_name': '文章活跃度',
+                'verbose_name_plural': '文章活跃度',
+                'indexes': [models.Index(fields=['bucket'], name='wiki_activity_bucket_idx')],
+                'unique_together': {('article', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(verbose_name='排名')),
+                ('score', models.FloatField(verbose_name='热度')),
+                ('computed_at', models.DateTimeField(verbose_name='计算时间')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wiki.article', verbose_name='文章')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wiki.category', verbose_name='分类')),
+            ],
+            options={
+                'verbose_name': '热门文章',
+                'verbose_name_plural': '热门文章',
+                'indexes': [models.Index(fields=['category', 'rank'], name='wiki_trending_rank_idx')],
+            },
+        ),
+    ]
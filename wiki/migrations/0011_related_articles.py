@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0010_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedArticleSet',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='related_set', serialize=False, to='wiki.article', verbose_name='文章')),
+                ('related', models.JSONField(blank=True, default=list, verbose_name='相关文章')),
+                ('signature', models.CharField(help_text='计算时文章修改时间和标签的摘要，变化后重新计算', max_length=40, verbose_name='内容签名')),
+                ('computed_at', models.DateTimeField(verbose_name='计算时间')),
+            ],
+            options={
+                'verbose_name': '相关文章',
+                'verbose_name_plural': '相关文章',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+SCOPES = ('articles', 'categories', 'tags')
+
+
+def create_versions(apps, schema_editor):
+    ResponseVersion = apps.get_model('wiki', 'ResponseVersion')
+    ResponseVersion.objects.bulk_create([ResponseVersion(scope=scope) for scope in SCOPES], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0011_related_articles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseVersion',
+            fields=[
+                ('scope', models.CharField(max_length=20, primary_key=True, serialize=False, verbose_name='类别')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+            ],
+            options={
+                'verbose_name': '响应版本',
+                'verbose_name_plural': '响应版本',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
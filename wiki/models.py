@@ -1,7 +1,13 @@
-from django.db import models
+import uuid
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
+from .bodies import CODEC_RAW, CODEC_ZLIB, encode_body, decode_body
+
 
 class Category(models.Model):
     """知识库分类"""
@@ -11,6 +17,7 @@ class Category(models.Model):
     icon = models.CharField(_('图标'), max_length=50, blank=True)
     sort_order = models.IntegerField(_('排序'), default=0)
     is_active = models.BooleanField(_('是否激活'), default=True)
+    published_count = models.PositiveIntegerField(_('已发布文章数'), default=0)  # 包含全部子分类
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
     updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
 
@@ -19,22 +26,85 @@ class Category(models.Model):
         verbose_name_plural = _('分类')
         ordering = ['sort_order']
 
+    # 加载时的父分类，用于判断保存时是否移动了分类
+    _loaded_parent_id = None
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    def moves_into_own_subtree(self):
+        """父分类是否为自身或自己的子分类"""
+        return bool(self.pk and self.parent_id) and CategoryClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id,
+        ).exists()
+
+    def clean(self):
+        if self.moves_into_own_subtree():
+            raise ValidationError({'parent': _('不能移动到自身或其子分类下')})
+
+    def save(self, *args, **kwargs):
+        """保存分类，与闭包表的维护（post_save 信号）在同一事务中完成
+
+        published_count 由信号维护，更新分类时不写回内存中可能已过期的值。
+        """
+        if not self._state.adding:
+            if self.parent_id != self._loaded_parent_id and self.moves_into_own_subtree():
+                raise ValueError(f'分类 {self.pk} 不能移动到自身或其子分类下')
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'published_count'
+                ]
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class CategoryClosure(models.Model):
+    """分类的闭包表：每个分类与其自身及全部祖先各有一行，depth 为层级差（自身为 0）"""
+    ancestor = models.ForeignKey(Category, verbose_name=_('祖先分类'), on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, verbose_name=_('后代分类'), on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField(_('层级差'))
+
+    class Meta:
+        verbose_name = _('分类闭包')
+        verbose_name_plural = _('分类闭包')
+        # (ancestor, descendant) 唯一索引用于查子树，descendant 外键索引用于查祖先
+        unique_together = ('ancestor', 'descendant')
+
 
 class Tag(models.Model):
     """知识库标签"""
     name = models.CharField(_('标签名称'), max_length=50, unique=True)
+    article_count = models.PositiveIntegerField(_('已发布文章数'), default=0)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
 
     class Meta:
         verbose_name = _('标签')
         verbose_name_plural = _('标签')
+        indexes = [
+            # 标签云按文章数取前 N 个，直接按索引顺序读取
+            models.Index(fields=['-article_count', 'name'], name='wiki_tag_cloud_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """保存标签，article_count 由信号维护，更新标签时不写回内存中可能已过期的值"""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'article_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Article(models.Model):
     """知识库文章"""
@@ -45,7 +115,6 @@ class Article(models.Model):
     )
     
     title = models.CharField(_('标题'), max_length=200)
-    content = models.TextField(_('内容'))
     summary = models.TextField(_('摘要'), blank=True)
     category = models.ForeignKey(Category, verbose_name=_('分类'), on_delete=models.CASCADE, related_name='articles')
     tags = models.ManyToManyField(Tag, verbose_name=_('标签'), blank=True, related_name='articles')
@@ -62,10 +131,113 @@ class Article(models.Model):
         verbose_name = _('文章')
         verbose_name_plural = _('文章')
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            # 与文章列表的排序一致，供游标分页使用
+            models.Index(fields=['status', '-is_pinned', '-created_at', 'id'], name='wiki_article_list_idx'),
+            models.Index(fields=['author', 'status', '-is_pinned', '-created_at', 'id'], name='wiki_article_author_idx'),
+        ]
+
+    # 正文存放在 ArticleBody 中，首次访问 content 时加载
+    _content = None
+    _content_changed = False
+    _original_content = None
+    _loaded_text = None
+    # 加载时的状态和分类，用于判断保存时是否发布、取消发布或移动分类
+    _loaded_status = None
+    _loaded_category_id = None
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_text = instance._text_snapshot()
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    @property
+    def content(self):
+        """文章正文，首次访问时从 ArticleBody 加载并解压"""
+        if self._content is None:
+            try:
+                body = self.body
+            except ObjectDoesNotExist:
+                self._content = ''
+            else:
+                self._content = body.text
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        if not self._state.adding:
+            if value == self.content:
+                return
+            # 保留修改前的正文，供修订历史补记基线版本
+            if not self._content_changed:
+                self._original_content = self._content
+        self._content = value
+        self._content_changed = True
+
+    def _text_snapshot(self):
+        # 只比较已加载的字段，未加载的字段不会被修改
+        return (self.__dict__.get('title'), self.__dict__.get('summary'))
+
+    def text_changed(self):
+        """标题、摘要或正文自加载后是否有改动"""
+        return self._content_changed or self._loaded_text != self._text_snapshot()
+
+    def save(self, *args, **kwargs):
+        """保存文章，正文有改动时一并写入 ArticleBody"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            update_fields = [name for name in update_fields if name != 'content']
+            kwargs['update_fields'] = update_fields + ['updated_at']
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if self._content_changed:
+                body = ArticleBody.from_text(self, self._content)
+                body.save(using=kwargs.get('using'))
+                self.body = body
+        self._content_changed = False
+        self._original_content = None
+        self._loaded_text = self._text_snapshot()
+        self._loaded_status = self.__dict__.get('status')
+        self._loaded_category_id = self.__dict__.get('category_id')
+
+
+class ArticleBody(models.Model):
+    """文章正文，压缩后单独存储"""
+    CODEC_CHOICES = (
+        (CODEC_RAW, _('未压缩')),
+        (CODEC_ZLIB, _('zlib')),
+    )
+
+    article = models.OneToOneField(Article, verbose_name=_('文章'), on_delete=models.CASCADE, primary_key=True, related_name='body')
+    codec = models.CharField(_('编码方式'), max_length=10, choices=CODEC_CHOICES, default=CODEC_RAW)
+    data = models.BinaryField(_('正文数据'))
+    raw_size = models.PositiveIntegerField(_('原始大小'), default=0)
+    stored_size = models.PositiveIntegerField(_('存储大小'), default=0)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('文章正文')
+        verbose_name_plural = _('文章正文')
+
+    def __str__(self):
+        return f'{self.article_id}: {self.raw_size} -> {self.stored_size}'
+
+    @classmethod
+    def from_text(cls, article, text):
+        """按当前压缩设置构造正文（不保存），用于批量写入"""
+        codec, data, raw_size = encode_body(text)
+        return cls(article=article, codec=codec, data=data, raw_size=raw_size, stored_size=len(data))
+
+    @property
+    def text(self):
+        return decode_body(self.codec, self.data)
+
 
 class Comment(models.Model):
     """文章评论"""
@@ -75,11 +247,16 @@ class Comment(models.Model):
     content = models.TextField(_('评论内容'))
     is_active = models.BooleanField(_('是否激活'), default=True)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
 
     class Meta:
         verbose_name = _('评论')
         verbose_name_plural = _('评论')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', '-created_at', '-id'], name='wiki_comment_list_idx'),
+            models.Index(fields=['article', 'is_active', '-created_at', '-id'], name='wiki_comment_article_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username}: {self.content[:20]}'
@@ -90,7 +267,8 @@ class Attachment(models.Model):
     article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='attachments')
     name = models.CharField(_('附件名称'), max_length=100)
     file = models.FileField(_('附件文件'), upload_to='wiki/attachments/')
-    file_size = models.PositiveIntegerField(_('文件大小'), default=0)  # 单位：字节
+    file_size = models.PositiveBigIntegerField(_('文件大小'), default=0)  # 单位：字节
+    content_hash = models.CharField(_('内容哈希'), max_length=64, blank=True, db_index=True)  # SHA-256
     download_count = models.PositiveIntegerField(_('下载次数'), default=0)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
     updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
@@ -100,4 +278,156 @@ class Attachment(models.Model):
         verbose_name_plural = _('附件')
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class FileBlob(models.Model):
+    """按内容哈希去重存储的附件文件，ref_count 为引用该文件的附件数"""
+    sha256 = models.CharField(_('SHA-256'), max_length=64, unique=True)
+    file = models.FileField(_('文件'), upload_to='wiki/attachments/')
+    size = models.PositiveBigIntegerField(_('文件大小'), default=0)
+    ref_count = models.PositiveIntegerField(_('引用次数'), default=0)
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('附件文件')
+        verbose_name_plural = _('附件文件')
+
+    def __str__(self):
+        return self.sha256
+
+
+class UploadSession(models.Model):
+    """附件分块上传会话"""
+    STATUS_CHOICES = (
+        ('uploading', _('上传中')),
+        ('completed', _('已完成')),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('用户'), on_delete=models.CASCADE, related_name='upload_sessions')
+    article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='upload_sessions')
+    name = models.CharField(_('附件名称'), max_length=100)
+    filename = models.CharField(_('文件名'), max_length=255)
+    total_size = models.PositiveBigIntegerField(_('文件大小'))
+    chunk_size = models.PositiveIntegerField(_('分块大小'))
+    received_size = models.PositiveBigIntegerField(_('已接收大小'), default=0)
+    chunk_hashes = models.JSONField(_('分块哈希'), default=list, blank=True)
+    status = models.CharField(_('状态'), max_length=20, choices=STATUS_CHOICES, default='uploading')
+    attachment = models.ForeignKey(Attachment, verbose_name=_('附件'), on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('上传会话')
+        verbose_name_plural = _('上传会话')
+
+    def __str__(self):
+        return self.filename
+
+
+class SearchTerm(models.Model):
+    """文章全文检索倒排索引，每行记录一个词项在一篇文章中的加权词频"""
+    term = models.CharField(_('词项'), max_length=32)
+    article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.FloatField(_('权重'))
+
+    class Meta:
+        verbose_name = _('检索词项')
+        verbose_name_plural = _('检索词项')
+        unique_together = ('term', 'article')
+
+
+class ArticleRevision(models.Model):
+    """文章修订历史
+
+    每次修改记录一个版本，正文保存为相对上一版本的行级差异，
+    每隔若干版本保存一次完整快照，重建任意版本最多只需应用有限个差异。
+    """
+    article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField(_('版本号'))
+    editor = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('修改人'), on_delete=models.SET_NULL, null=True, blank=True, related_name='article_revisions')
+    title = models.CharField(_('标题'), max_length=200)
+    summary = models.TextField(_('摘要'), blank=True)
+    is_snapshot = models.BooleanField(_('是否完整快照'), default=False)
+    codec = models.CharField(_('编码方式'), max_length=10, choices=ArticleBody.CODEC_CHOICES, default=CODEC_RAW)
+    data = models.BinaryField(_('正文数据'))
+    raw_size = models.PositiveIntegerField(_('正文大小'), default=0)
+    stored_size = models.PositiveIntegerField(_('存储大小'), default=0)
+    created_at = models.DateTimeField(_('创建时间'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('文章修订')
+        verbose_name_plural = _('文章修订')
+        unique_together = ('article', 'number')
+        ordering = ['article', '-number']
+
+    def __str__(self):
+        return f'{self.article_id} v{self.number}'
+
+
+class ArticleActivity(models.Model):
+    """文章在每个时间段内的浏览数和点赞数，用于计算随时间衰减的热度"""
+    article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='activity')
+    bucket = models.DateTimeField(_('时间段'))  # 时间段的开始时间
+    views = models.PositiveIntegerField(_('浏览次数'), default=0)
+    likes = models.PositiveIntegerField(_('点赞次数'), default=0)
+
+    class Meta:
+        verbose_name = _('文章活跃度')
+        verbose_name_plural = _('文章活跃度')
+        unique_together = ('article', 'bucket')
+        indexes = [
+            # 计算热度时按时间范围读取，清理过期时间段
+            models.Index(fields=['bucket'], name='wiki_activity_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id}@{self.bucket:%Y-%m-%d %H:%M}: {self.views}/{self.likes}'
+
+
+class TrendingArticle(models.Model):
+    """预先计算的热门文章排行，category 为空时为全站排行，分类排行包含子分类的文章"""
+    category = models.ForeignKey(Category, verbose_name=_('分类'), on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    rank = models.PositiveIntegerField(_('排名'))
+    article = models.ForeignKey(Article, verbose_name=_('文章'), on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(_('热度'))
+    computed_at = models.DateTimeField(_('计算时间'))
+
+    class Meta:
+        verbose_name = _('热门文章')
+        verbose_name_plural = _('热门文章')
+        indexes = [
+            models.Index(fields=['category', 'rank'], name='wiki_trending_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.category_id or "*"}#{self.rank}: {self.article_id}'
+
+
+class RelatedArticleSet(models.Model):
+    """预先计算的相关文章，related 为按相似度从高到低排列的 [{"id", "title", "score"}, ...]"""
+    article = models.OneToOneField(Article, verbose_name=_('文章'), on_delete=models.CASCADE, primary_key=True, related_name='related_set')
+    related = models.JSONField(_('相关文章'), default=list, blank=True)
+    signature = models.CharField(_('内容签名'), max_length=40, help_text=_('计算时文章修改时间和标签的摘要，变化后重新计算'))
+    computed_at = models.DateTimeField(_('计算时间'))
+
+    class Meta:
+        verbose_name = _('相关文章')
+        verbose_name_plural = _('相关文章')
+
+    def __str__(self):
+        return f'{self.article_id}: {len(self.related)}'
+
+
+class ResponseVersion(models.Model):
+    """读接口响应的版本号，相关数据变更时由信号加一，计入条件请求的校验值"""
+    scope = models.CharField(_('类别'), max_length=20, primary_key=True)
+    version = models.PositiveBigIntegerField(_('版本号'), default=0)
+
+    class Meta:
+        verbose_name = _('响应版本')
+        verbose_name_plural = _('响应版本')
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
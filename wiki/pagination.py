@@ -0,0 +1,232 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """游标（keyset）分页
+
+    按 ``ordering`` 中的字段组合定位下一页，使用 ``WHERE (a, b, id) < (...)`` 形式的条件
+    代替 OFFSET，翻页耗时与页码无关。游标为上一页首/尾行排序字段值的 base64 编码，
+    对客户端不透明。默认不执行 COUNT，请求参数带 ``count=true`` 时才返回总数。
+    ``ordering`` 最后一个字段必须唯一（通常为 id），以保证排序稳定。
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = '无效的游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = len(queryset) if isinstance(queryset, list) else queryset.count()
+
+        model = queryset.model if hasattr(queryset, 'model') else view.get_queryset().model
+        cursor = self.decode_cursor(request, model)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._invert(field) for field in self.ordering] if reverse else list(self.ordering)
+
+        if isinstance(queryset, list):
+            rows = self._paginate_list(queryset, cursor, ordering)
+        else:
+            queryset = queryset.order_by(*ordering)
+            if cursor:
+                queryset = queryset.filter(self._keyset_filter(cursor['values'], ordering))
+            rows = list(queryset[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def _link(self, row, reverse):
+        values = [self._value(row, field) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            if len(payload['v']) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(self._name(field)).to_python(value)
+                for field, value in zip(self.ordering, payload['v'])
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'reverse': bool(payload.get('r'))}
+
+    @staticmethod
+    def _name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _value(self, row, field):
+        name = self._name(field)
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def _keyset_filter(self, values, ordering):
+        """构造 (a, b, c) 在排序方向上位于游标之后的条件"""
+        condition = Q()
+        for i, field in enumerate(ordering):
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            clause = Q(**{self._name(field) + lookup: values[i]})
+            for prev_field, prev_value in zip(ordering[:i], values[:i]):
+                clause &= Q(**{self._name(prev_field): prev_value})
+            condition |= clause
+        return condition
+
+    def _paginate_list(self, rows, cursor, ordering):
+        """对已在内存中的列表做同样的游标分页，列表需已按 ordering 排好序"""
+        if cursor:
+            reverse = cursor['reverse']
+            rows = [row for row in rows if self._is_after(row, cursor['values'], ordering)]
+            if reverse:
+                rows.reverse()
+        return rows[:self.page_size + 1]
+
+    def _is_after(self, row, values, ordering):
+        for field, value in zip(ordering, values):
+            current = self._value(row, field)
+            if current == value:
+                continue
+            return current < value if field.startswith('-') else current > value
+        return False
+
+
+class HybridPagination(PageNumberPagination):
+    """页码分页与游标分页二选一
+
+    默认保持页码分页（前端现有用法）；请求带 ``cursor`` 参数或 ``pagination=cursor``
+    时切换为游标分页。相关度排序的检索请求（带 ``search`` 参数）只支持页码分页。
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        params = request.query_params
+        if params.get('search'):
+            return False
+        return params.get('pagination') == 'cursor' or self.keyset_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            self.keyset.ordering = self.ordering
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
+
+
+class ArticlePagination(HybridPagination):
+    """文章分页，游标按 (置顶, 创建时间, id) 定位"""
+    ordering = ('-is_pinned', '-created_at', 'id')
+
+
+class CommentPagination(HybridPagination):
+    """评论分页，顶级评论按页返回"""
+    page_size = getattr(settings, 'WIKI_COMMENT_PAGE_SIZE', 20)
+    ordering = ('-created_at', '-id')
+
+
+class RevisionPagination(HybridPagination):
+    """文章修订分页，按版本号倒序"""
+    ordering = ('-number',)
@@ -0,0 +1,231 @@
+"""相关文章
+
+``compute_related_articles`` 命令为每篇已发布文章预先计算最相似的 N 篇文章，保存到 ``RelatedArticleSet``，
+详情接口随文章一起取出，请求时不做任何计算。相似度由两部分加权：
+
+    相似度 = (1 - 标签权重) × 正文 tf-idf 余弦相似度 + 标签权重 × 标签 idf 余弦相似度
+
+- 正文向量：直接使用检索索引 ``SearchTerm`` 中标题、摘要、正文的加权词频，乘以 idf 后
+  每篇文章只保留得分最高的 ``MAX_TERMS`` 个词项并归一化；只出现在一篇文章中或过于常见的词项不参与。
+- 标签向量：标签按 idf 加权后归一化，共同的冷门标签比共同的热门标签贡献更大。
+- 计算：向量以稀疏字典表示，按词项、标签建立倒排表，每个倒排表只保留权重最高的 ``MAX_POSTINGS`` 篇文章。
+  沿倒排表累加得到候选文章的近似得分，取前若干名再按完整向量精确计算相似度后排序。
+
+增量计算：每篇文章保存计算时的签名（修改时间和标签），只重新计算签名变化的文章、
+相关列表中包含已变化或已下线文章的文章，以及新结果可能进入其前 N 名的相邻文章。
+idf 随文章增加缓慢漂移，可定期用 ``--full`` 全部重新计算。
+"""
+import hashlib
+import heapq
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Article, RelatedArticleSet, SearchTerm
+
+PUBLISHED = 'published'
+
+# 每篇文章保留的词项数
+MAX_TERMS = 64
+# 出现在超过该比例文章中的词项视为常用词
+MAX_DOCUMENT_RATIO = 0.2
+# 每个词项、标签的倒排表保留的文章数
+MAX_POSTINGS = 200
+# 精确计算相似度的候选数量为结果数量的倍数
+CANDIDATE_FACTOR = 5
+
+
+def related_size():
+    return getattr(settings, 'WIKI_RELATED_SIZE', 10)
+
+
+def tag_weight():
+    return getattr(settings, 'WIKI_RELATED_TAG_WEIGHT', 0.3)
+
+
+def article_signature(updated_at, tag_ids):
+    """文章修改时间和标签的摘要，保存文章或增删标签后改变"""
+    source = '%s|%s' % (updated_at.isoformat(), ','.join(map(str, sorted(tag_ids))))
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {key: weight / norm for key, weight in vector.items()} if norm else {}
+
+
+def _dot(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(key, 0.0) for key, weight in a.items())
+
+
+class RelatedIndex:
+    """全部已发布文章的正文向量、标签向量及倒排表"""
+
+    def __init__(self, titles, tags, term_rows, document_frequency):
+        self.titles = titles
+        total = len(titles)
+        max_documents = max(2, total * MAX_DOCUMENT_RATIO)
+
+        self.text = {}
+        for article_id, terms in term_rows:
+            weights = {
+                term: weight * math.log(total / document_frequency[term])
+                for term, weight in terms.items()
+                if 1 < document_frequency.get(term, 0) <= max_documents
+            }
+            if len(weights) > MAX_TERMS:
+                weights = dict(heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1]))
+            self.text[article_id] = _normalize(weights)
+
+        tag_frequency = defaultdict(int)
+        for tag_ids in tags.values():
+            for tag_id in tag_ids:
+                tag_frequency[tag_id] += 1
+        self.tags = {
+            article_id: _normalize({
+                tag_id: math.log(total / tag_frequency[tag_id])
+                for tag_id in tag_ids if tag_frequency[tag_id] > 1
+            })
+            for article_id, tag_ids in tags.items()
+        }
+
+        self.text_postings = self._postings(self.text)
+        self.tag_postings = self._postings(self.tags)
+
+    @staticmethod
+    def _postings(vectors):
+        postings = defaultdict(list)
+        for article_id, vector in vectors.items():
+            for key, weight in vector.items():
+                postings[key].append((weight, article_id))
+        return {
+            key: heapq.nlargest(MAX_POSTINGS, entries) if len(entries) > MAX_POSTINGS else entries
+            for key, entries in postings.items()
+        }
+
+    def similarity(self, a, b):
+        empty = {}
+        text = _dot(self.text.get(a, empty), self.text.get(b, empty))
+        tags = _dot(self.tags.get(a, empty), self.tags.get(b, empty))
+        return (1 - tag_weight()) * text + tag_weight() * tags
+
+    def neighbours(self, article_id, size):
+        """与文章最相似的 ``size`` 篇文章，返回 [(相似度, 文章ID), ...]"""
+        scores = defaultdict(float)
+        for vectors, postings, factor in (
+            (self.text, self.text_postings, 1 - tag_weight()),
+            (self.tags, self.tag_postings, tag_weight()),
+        ):
+            for key, weight in vectors.get(article_id, {}).items():
+                for other_weight, other_id in postings.get(key, ()):
+                    scores[other_id] += factor * weight * other_weight
+        scores.pop(article_id, None)
+
+        candidates = heapq.nlargest(size * CANDIDATE_FACTOR, scores, key=scores.__getitem__)
+        ranked = ((self.similarity(article_id, other_id), other_id) for other_id in candidates)
+        # 相似度相同时 ID 大（较新）的文章在前
+        return [(score, other_id) for score, other_id in heapq.nlargest(size, ranked) if score > 0]
+
+    def entries(self, article_id, size):
+        return [
+            {'id': other_id, 'title': self.titles[other_id], 'score': round(score, 4)}
+            for score, other_id in self.neighbours(article_id, size)
+        ]
+
+
+def load_index(chunk_size=5000):
+    """读取已发布文章的标题、标签和检索词项，返回 (RelatedIndex, {文章ID: 签名})"""
+    titles, updated = {}, {}
+    for pk, title, updated_at in Article.objects.filter(status=PUBLISHED).values_list('pk', 'title', 'updated_at'):
+        titles[pk] = title
+        updated[pk] = updated_at
+
+    tags = {pk: [] for pk in titles}
+    links = Article.tags.through.objects.filter(article__status=PUBLISHED).values_list('article_id', 'tag_id')
+    for article_id, tag_id in links.iterator(chunk_size=chunk_size):
+        tags[article_id].append(tag_id)
+    signatures = {pk: article_signature(updated[pk], tags[pk]) for pk in titles}
+
+    terms = SearchTerm.objects.filter(article__status=PUBLISHED)
+    document_frequency = dict(
+        terms.order_by().values('term').annotate(total=Count('pk')).values_list('term', 'total')
+    )
+
+    def term_rows():
+        # 按文章顺序读取，每篇文章读完即转换为向量，只保留前 MAX_TERMS 个词项
+        current, weights = None, {}
+        rows = terms.order_by('article_id').values_list('article_id', 'term', 'weight')
+        for article_id, term, weight in rows.iterator(chunk_size=chunk_size):
+            if article_id != current:
+                if current is not None:
+                    yield current, weights
+                current, weights = article_id, {}
+            weights[term] = weight
+        if current is not None:
+            yield current, weights
+
+    return RelatedIndex(titles, tags, term_rows(), document_frequency), signatures
+
+
+def compute_related(full=False, size=None, batch_size=500):
+    """计算并保存相关文章，``full`` 为假时只计算有变化的文章，返回统计信息"""
+    started = time.perf_counter()
+    size = size or related_size()
+    index, signatures = load_index()
+    loaded = time.perf_counter()
+
+    saved = {
+        article_id: (signature, related)
+        for article_id, signature, related in RelatedArticleSet.objects.values_list('article_id', 'signature', 'related')
+    }
+    offline = [article_id for article_id in saved if article_id not in signatures]
+    if full:
+        targets = set(signatures)
+    else:
+        changed = {pk for pk, signature in signatures.items() if saved.get(pk, (None,))[0] != signature}
+        targets = changed | {
+            pk for pk, (_, related) in saved.items()
+            if pk in signatures and any(item['id'] in changed or item['id'] not in signatures for item in related)
+        }
+
+    results = {pk: index.entries(pk, size) for pk in targets}
+    if not full:
+        # 相似度是对称的：变化的文章进入了某篇文章的结果，也可能进入那篇文章的前 N 名
+        for pk in list(targets):
+            for item in results[pk]:
+                other_id = item['id']
+                if other_id in results:
+                    continue
+                related = saved.get(other_id, (None, []))[1]
+                if len(related) < size or item['score'] > related[-1]['score']:
+                    results[other_id] = index.entries(other_id, size)
+    computed = time.perf_counter()
+
+    now = timezone.now()
+    pks = sorted(results)
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        with transaction.atomic():
+            RelatedArticleSet.objects.filter(article_id__in=batch).delete()
+            RelatedArticleSet.objects.bulk_create([
+                RelatedArticleSet(article_id=pk, related=results[pk], signature=signatures[pk], computed_at=now)
+                for pk in batch
+            ])
+    for start in range(0, len(offline), batch_size):
+        RelatedArticleSet.objects.filter(article_id__in=offline[start:start + batch_size]).delete()
+
+    return {
+        'articles': len(signatures),
+        'computed': len(results),
+        'removed': len(offline),
+        'load_seconds': loaded - started,
+        'compute_seconds': computed - loaded,
+        'total_seconds': time.perf_counter() - started,
+    }
@@ -0,0 +1,196 @@
+"""文章修订历史（差异存储）
+
+每次保存文章时记录一个版本：
+
+- 正文与上一版本做行级比较，只保存差异操作序列：``[起, 止]`` 表示复制上一版本的若干行，
+  字符串表示新插入的文本；操作序列序列化为 JSON 后按正文的压缩设置编码；
+- 每条差异链最多 ``WIKI_REVISION_SNAPSHOT_INTERVAL`` 个版本，之后保存一次完整快照，
+  差异比完整正文还大时也直接保存快照；
+- 重建某个版本时，一次查询取出最近的快照到该版本之间的记录，依次应用差异。
+
+版本号在文章内递增，压缩旧历史后允许出现间隔，差异总是相对于前一条现存记录。
+"""
+import difflib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Subquery
+
+from .bodies import encode_body, decode_body
+from .models import ArticleRevision
+
+
+def snapshot_interval():
+    return max(1, getattr(settings, 'WIKI_REVISION_SNAPSHOT_INTERVAL', 20))
+
+
+def _lines(text):
+    return (text or '').splitlines(keepends=True)
+
+
+def compute_delta(old, new):
+    """计算从 old 到 new 的行级差异操作序列"""
+    old_lines, new_lines = _lines(old), _lines(new)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(old, ops):
+    """把差异操作序列应用到 old 上"""
+    old_lines = _lines(old)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def encode_revision(previous, text, chain_length):
+    """编码一个版本的正文，返回需要写入 ArticleRevision 的字段
+
+    ``chain_length`` 为上一版本所在差异链的长度（含快照），为0表示没有上一版本。
+    """
+    codec, data, raw_size = encode_body(text)
+    snapshot = {'is_snapshot': True, 'codec': codec, 'data': data, 'raw_size': raw_size, 'stored_size': len(data)}
+    if chain_length == 0 or chain_length >= snapshot_interval():
+        return snapshot
+
+    payload = json.dumps(compute_delta(previous, text), ensure_ascii=False, separators=(',', ':'))
+    codec, data, _ = encode_body(payload)
+    if len(data) >= snapshot['stored_size']:
+        return snapshot
+    return {'is_snapshot': False, 'codec': codec, 'data': data, 'raw_size': raw_size, 'stored_size': len(data)}
+
+
+def decode_revision(revision, previous):
+    """解码一个版本的正文，previous 为前一条记录的正文"""
+    payload = decode_body(revision.codec, revision.data)
+    if revision.is_snapshot:
+        return payload
+    return apply_delta(previous, json.loads(payload))
+
+
+def load_chain(article_id, number=None):
+    """一次查询取出最近的快照到指定版本（默认最新版本）之间的记录，按版本号升序"""
+    revisions = ArticleRevision.objects.filter(article_id=article_id)
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    snapshot = revisions.filter(is_snapshot=True).order_by().values('article_id').annotate(
+        latest=Max('number')
+    ).values('latest')
+    return list(revisions.filter(number__gte=Subquery(snapshot)).order_by('number'))
+
+
+def rebuild_chain(chain):
+    """依次应用差异，返回链中最后一个版本的正文"""
+    text = ''
+    for revision in chain:
+        text = decode_revision(revision, text)
+    return text
+
+
+def get_revision(article_id, number):
+    """获取指定版本，正文重建后放在 ``content`` 属性上，版本不存在时抛出 DoesNotExist"""
+    chain = load_chain(article_id, number)
+    if not chain or chain[-1].number != number:
+        raise ArticleRevision.DoesNotExist
+    revision = chain[-1]
+    revision.content = rebuild_chain(chain)
+    return revision
+
+
+def _diff_lines(text):
+    """差异输出用的行：每行以换行结尾，末行没有换行时与 diff 命令一样附加说明行"""
+    lines = [line if line.endswith('\n') else line + '\n' for line in _lines(text)]
+    if text and not text.endswith(('\n', '\r')):
+        lines[-1] += '\\ No newline at end of file\n'
+    return lines
+
+
+def diff_revisions(old, new, context=3):
+    """生成两个版本之间的统一格式差异"""
+    lines = difflib.unified_diff(
+        _diff_lines(old.content), _diff_lines(new.content),
+        fromfile=f'v{old.number}', tofile=f'v{new.number}', n=context,
+    )
+    return ''.join(lines)
+
+
+def record_revision(article, created=False, editor=None):
+    """记录文章的当前版本
+
+    需在文章保存的事务中调用（文章行已加锁，并发保存会按顺序记录版本）。
+    已有文章第一次产生修订时，先把修改前的内容补记为基线版本。
+    """
+    with transaction.atomic():
+        chain = [] if created else load_chain(article.pk)
+        if chain:
+            previous = rebuild_chain(chain)
+            number = chain[-1].number
+        else:
+            previous, number = '', 0
+            if not created:
+                previous = article._original_content if article._original_content is not None else article.content
+                loaded_title, loaded_summary = article._loaded_text or (None, None)
+                number = 1
+                chain = [ArticleRevision.objects.create(
+                    article=article, number=number, editor_id=article.author_id,
+                    title=loaded_title if loaded_title is not None else article.title,
+                    summary=loaded_summary if loaded_summary is not None else article.summary,
+                    created_at=article.created_at,
+                    **encode_revision('', previous, 0),
+                )]
+
+        editor_id = getattr(editor, 'pk', editor) or article.author_id
+        return ArticleRevision.objects.create(
+            article=article, number=number + 1, editor_id=editor_id,
+            title=article.title, summary=article.summary,
+            **encode_revision(previous, article.content, len(chain)),
+        )
+
+
+def compact_revisions(article_id, keep):
+    """重写一篇文章的修订历史
+
+    ``keep(revision)`` 返回 False 的版本会被删除，保留的版本按当前快照间隔重新编码，
+    返回 (删除数, 重写前存储字节数, 重写后存储字节数)。
+    """
+    with transaction.atomic():
+        revisions = list(
+            ArticleRevision.objects.select_for_update().filter(article_id=article_id).order_by('number')
+        )
+        before = sum(revision.stored_size for revision in revisions)
+
+        text = ''
+        kept, dropped = [], []
+        for revision in revisions:
+            text = decode_revision(revision, text)
+            if revision is revisions[-1] or keep(revision):
+                kept.append((revision, text))
+            else:
+                dropped.append(revision.pk)
+
+        changed = []
+        previous, chain_length = '', 0
+        for revision, content in kept:
+            fields = encode_revision(previous, content, chain_length)
+            chain_length = 1 if fields['is_snapshot'] else chain_length + 1
+            previous = content
+            if fields['is_snapshot'] != revision.is_snapshot or bytes(fields['data']) != bytes(revision.data):
+                for name, value in fields.items():
+                    setattr(revision, name, value)
+                changed.append(revision)
+
+        ArticleRevision.objects.filter(pk__in=dropped).delete()
+        ArticleRevision.objects.bulk_update(changed, ['is_snapshot', 'codec', 'data', 'raw_size', 'stored_size'])
+        after = sum(revision.stored_size for revision, _ in kept)
+    return len(dropped), before, after
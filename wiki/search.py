@@ -0,0 +1,237 @@
+"""文章全文检索
+
+维护文章的倒排索引（SearchTerm），替代对 TextField 的 ``LIKE '%q%'`` 全表扫描。
+
+- 分词：中日韩文字按相邻两字切分（bigram），每段文字的最后一个字额外保留为单字词项，
+  英文和数字按整词切分并转为小写。
+- 权重：标题、摘要、正文分别加权，词频取对数平滑。
+- 查询：英文和数字按词的前缀匹配（``djan`` 可以查到 ``django``），中日韩文字按 bigram 匹配，
+  所有词项都必须命中，按 tf-idf 得分排序。与原先的子串匹配相比，英文单词中间的片段（如 ``ango``）不再命中。
+- 维护：文章保存时重建该文章的词项；发布、归档只修改状态，状态筛选在查询时完成，
+  无需改动索引；删除文章时词项随外键级联删除。
+"""
+import math
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.html import escape
+
+from .models import Article, SearchTerm
+
+FIELD_WEIGHTS = {
+    'title': 5.0,
+    'summary': 2.0,
+    'content': 1.0,
+}
+
+MAX_TERM_LENGTH = 32
+
+# 候选文章不超过该数量时用 IN 列表查询后续词项，否则按检索范围的子查询取出后在内存中求交
+MAX_CANDIDATES_IN_LIST = 500
+
+TOTAL_CACHE_KEY = 'wiki:search:total'
+
+_CJK = (
+    '\u3040-\u30ff'  # 日文假名
+    '\u3400-\u4dbf'  # CJK扩展A
+    '\u4e00-\u9fff'  # CJK统一汉字
+    '\uac00-\ud7af'  # 韩文
+    '\uf900-\ufaff'  # CJK兼容汉字
+)
+_TOKEN_RE = re.compile(r'[%s]+|[0-9a-z]+' % _CJK)
+_CJK_RE = re.compile(r'[%s]' % _CJK)
+
+
+def _is_cjk(char):
+    return bool(_CJK_RE.match(char))
+
+
+def iter_segments(text):
+    """把文本切分成连续的中日韩文字段或英文数字词"""
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def tokenize(text):
+    """分词，返回词项迭代器（可能重复）"""
+    for segment in iter_segments(text):
+        if not _is_cjk(segment[0]):
+            yield segment[:MAX_TERM_LENGTH]
+            continue
+        for i in range(len(segment) - 1):
+            yield segment[i:i + 2]
+        # 保留末字，保证任意单字都能通过前缀匹配查到
+        yield segment[-1]
+
+
+def build_terms(article):
+    """计算文章各词项的加权词频"""
+    terms = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        counts = {}
+        for term in tokenize(getattr(article, field)):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            terms[term] = terms.get(term, 0.0) + field_weight * (1 + math.log(count))
+    return terms
+
+
+def index_article(article):
+    """重建单篇文章的索引"""
+    terms = build_terms(article)
+    with transaction.atomic():
+        SearchTerm.objects.filter(article_id=article.pk).delete()
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(term=term, article_id=article.pk, weight=weight) for term, weight in terms.items()],
+            batch_size=1000,
+        )
+    return len(terms)
+
+
+def parse_query(query):
+    """解析查询串，返回去重后的词项列表
+
+    英文数字词和单个中日韩文字作为前缀词项（以 ``*`` 结尾），分别匹配以其开头的词和 bigram。
+    """
+    terms = []
+    for segment in iter_segments(query):
+        if not _is_cjk(segment[0]) or len(segment) == 1:
+            term = segment[:MAX_TERM_LENGTH] + '*'
+            if term not in terms:
+                terms.append(term)
+            continue
+        for term in tokenize(segment):
+            # 末字单字项只用于单字查询，多字查询时 bigram 已覆盖
+            if len(term) == 1 and _is_cjk(term) and len(segment) > 1:
+                continue
+            if term not in terms:
+                terms.append(term)
+    return terms
+
+
+def _term_filter(term):
+    if term.endswith('*'):
+        return {'term__startswith': term[:-1]}
+    return {'term': term}
+
+
+def total_articles():
+    """文章总数，用于计算 idf，允许短时间内不准确，缓存后不必每次检索都 COUNT"""
+    total = cache.get(TOTAL_CACHE_KEY)
+    if total is None:
+        total = Article.objects.count()
+        cache.set(TOTAL_CACHE_KEY, total, getattr(settings, 'WIKI_SEARCH_TOTAL_TIMEOUT', 300))
+    return total or 1
+
+
+def document_frequencies(terms):
+    """一次聚合查询统计各词项命中的文章数"""
+    conditions = [Q(**_term_filter(term)) for term in terms]
+    either = Q()
+    for condition in conditions:
+        either |= condition
+    counts = SearchTerm.objects.filter(either).aggregate(**{
+        f't{i}': Count('article_id', filter=condition, distinct=True) for i, condition in enumerate(conditions)
+    })
+    return {term: counts[f't{i}'] for i, term in enumerate(terms)}
+
+
+def search_articles(query, queryset=None, limit=None):
+    """检索文章，返回按得分从高到低排列的 ``[(article_id, score), ...]``
+
+    ``queryset`` 用于限定检索范围（状态、分类、标签、作者等筛选），
+    所有词项都必须命中。词项按文档频率从低到高依次求交，候选集只会越来越小；
+    候选较少时以 IN 列表限定后续词项，较多时仍以检索范围的子查询限定，避免生成过长的 SQL。
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+    if queryset is None:
+        queryset = Article.objects.all()
+    if limit is None:
+        limit = getattr(settings, 'WIKI_SEARCH_MAX_RESULTS', 1000)
+
+    total = total_articles()
+    doc_freq = document_frequencies(terms)
+    if not all(doc_freq.values()):
+        return []
+
+    scope = queryset.order_by().values('pk')
+    scores = None
+    for term in sorted(terms, key=doc_freq.get):
+        idf = math.log(1 + total / doc_freq[term])
+        postings = SearchTerm.objects.filter(**_term_filter(term))
+        if scores is not None and len(scores) <= MAX_CANDIDATES_IN_LIST:
+            postings = postings.filter(article_id__in=list(scores))
+        else:
+            postings = postings.filter(article__in=scope)
+        matched = {}
+        for article_id, weight in postings.values_list('article_id', 'weight'):
+            # 前缀词项可能在同一篇文章中命中多个词项，取最大权重
+            matched[article_id] = max(matched.get(article_id, 0.0), weight * idf)
+        if scores is None:
+            scores = matched
+        else:
+            scores = {article_id: scores[article_id] + score for article_id, score in matched.items()
+                      if article_id in scores}
+        if not scores:
+            return []
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+    return ranked[:limit]
+
+
+def _highlight_pattern(query):
+    words = set()
+    for segment in iter_segments(query):
+        words.add(segment)
+        if _is_cjk(segment[0]) and len(segment) > 2:
+            words.update(segment[i:i + 2] for i in range(len(segment) - 1))
+    if not words:
+        return None
+    alternatives = sorted(words, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(word) for word in alternatives), re.IGNORECASE)
+
+
+def highlight(text, query, length=None, tag='em'):
+    """生成高亮摘要
+
+    截取第一个命中位置附近 ``length`` 个字符（为 None 时返回全文），
+    命中部分用 ``<tag>`` 包裹，其余内容做 HTML 转义。
+    """
+    text = text or ''
+    pattern = _highlight_pattern(query)
+    if pattern is None:
+        return escape(text[:length] if length else text)
+
+    if length and len(text) > length:
+        match = pattern.search(text)
+        start = max(0, match.start() - length // 4) if match else 0
+        end = min(len(text), start + length)
+        start = max(0, end - length)
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if end < len(text) else ''
+        text = text[start:end]
+    else:
+        prefix = suffix = ''
+
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[last:match.start()]))
+        parts.append('<%s>%s</%s>' % (tag, escape(match.group()), tag))
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return prefix + ''.join(parts) + suffix
+
+
+def snippet(query, texts, length=160):
+    """从多个文本中选出第一个包含命中词的文本生成高亮摘要"""
+    texts = [text for text in texts if text]
+    if not texts:
+        return ''
+    pattern = _highlight_pattern(query)
+    chosen = next((text for text in texts if pattern and pattern.search(text)), texts[0])
+    return highlight(chosen, query, length=length)
@@ -1,15 +1,38 @@
 from rest_framework import serializers
-from .models import Category, Tag, Article, Comment, Attachment
+from rest_framework.exceptions import PermissionDenied
+from django.conf import settings
+from .models import Category, Tag, Article, Comment, Attachment, UploadSession, ArticleRevision, RelatedArticleSet
+from .counters import counter_buffer
+from .category_tree import get_category_tree
+from .comments import load_comment_thread
+from .pagination import CommentPagination
+from .uploads import store_uploaded_file, release_blob
 from django.contrib.auth import get_user_model
+from core.images import VariantURLsField
 
 User = get_user_model()
 
 
+class PendingCounterMixin:
+    """在输出中叠加计数缓冲区里尚未落库的增量"""
+    counter_fields = ()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        model = instance._meta.concrete_model
+        for field in self.counter_fields:
+            if field in data:
+                data[field] += counter_buffer.pending(model, instance.pk, field)
+        return data
+
+
 class UserBriefSerializer(serializers.ModelSerializer):
-    """用户简要信息序列化器"""
+    """用户简要信息序列化器，列表中使用 avatar_urls 中的小图"""
+    avatar_urls = VariantURLsField(source='avatar_variants')
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'nickname', 'avatar']
+        fields = ['id', 'username', 'nickname', 'avatar', 'avatar_urls']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -19,27 +42,105 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
+class TagCountSerializer(serializers.ModelSerializer):
+    """带已发布文章数的标签序列化器，用于标签接口（文章中嵌套的标签不含文章数）"""
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'article_count']
+        read_only_fields = ['article_count']
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """分类序列化器"""
     children = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'icon', 'sort_order', 'is_active', 'children']
+        fields = ['id', 'name', 'description', 'icon', 'sort_order', 'is_active', 'published_count', 'children']
+        read_only_fields = ['published_count']
 
     def get_children(self, obj):
-        """获取子分类"""
-        children = Category.objects.filter(parent=obj).order_by('sort_order')
-        serializer = CategorySerializer(children, many=True)
-        return serializer.data
+        """获取子分类，从缓存的分类树中读取，不再逐层查询"""
+        context = self.context
+        if 'category_tree' not in context:
+            context['category_tree'] = get_category_tree()
+        node = context['category_tree']['nodes'].get(obj.pk)
+        return node['children'] if node else []
+
+
+def check_article_editable(user, article):
+    """只有文章作者和管理员可以为文章上传附件"""
+    if not (user.is_staff or article.author_id == user.pk):
+        raise PermissionDenied('只有文章作者可以上传附件')
 
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class ArticleEditableMixin:
+    """写入的 article 必须是当前用户可以编辑的文章"""
+
+    def validate_article(self, value):
+        check_article_editable(self.context['request'].user, value)
+        return value
+
+
+class AttachmentSerializer(ArticleEditableMixin, PendingCounterMixin, serializers.ModelSerializer):
     """附件序列化器"""
+    counter_fields = ('download_count',)
+
     class Meta:
         model = Attachment
-        fields = ['id', 'name', 'file', 'file_size', 'download_count', 'created_at']
-        read_only_fields = ['file_size', 'download_count']
+        fields = ['id', 'article', 'name', 'file', 'file_size', 'content_hash', 'download_count', 'created_at']
+        read_only_fields = ['file_size', 'content_hash', 'download_count']
+
+    def _store_file(self, validated_data):
+        """按内容哈希保存上传的文件，相同内容只存一份"""
+        uploaded_file = validated_data.get('file')
+        if uploaded_file is None:
+            return
+        blob, size = store_uploaded_file(uploaded_file)
+        validated_data['file'] = blob.file.name
+        validated_data['file_size'] = size
+        validated_data['content_hash'] = blob.sha256
+
+    def create(self, validated_data):
+        self._store_file(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        old_hash = instance.content_hash if 'file' in validated_data else None
+        self._store_file(validated_data)
+        instance = super().update(instance, validated_data)
+        release_blob(old_hash)
+        return instance
+
+
+class UploadSessionSerializer(ArticleEditableMixin, serializers.ModelSerializer):
+    """分块上传会话序列化器"""
+    next_offset = serializers.IntegerField(source='received_size', read_only=True)
+    attachment = AttachmentSerializer(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'article', 'name', 'filename', 'total_size', 'chunk_size', 'received_size',
+                  'next_offset', 'chunk_hashes', 'status', 'attachment', 'created_at']
+        read_only_fields = ['received_size', 'chunk_hashes', 'status']
+        extra_kwargs = {'chunk_size': {'required': False}}
+
+    def validate_total_size(self, value):
+        max_size = getattr(settings, 'WIKI_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(f'文件大小必须在 1 到 {max_size} 字节之间')
+        return value
+
+    def validate_chunk_size(self, value):
+        max_chunk = getattr(settings, 'WIKI_UPLOAD_MAX_CHUNK_SIZE', 32 * 1024 ** 2)
+        if value <= 0 or value > max_chunk:
+            raise serializers.ValidationError(f'分块大小必须在 1 到 {max_chunk} 字节之间')
+        return value
+
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        validated_data.setdefault('chunk_size', getattr(settings, 'WIKI_UPLOAD_CHUNK_SIZE', 5 * 1024 ** 2))
+        return super().create(validated_data)
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -53,8 +154,10 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'is_active']
 
     def get_replies(self, obj):
-        """获取回复"""
-        replies = Comment.objects.filter(parent=obj, is_active=True)
+        """获取回复，优先使用评论树加载器预先组装好的回复"""
+        replies = getattr(obj, 'thread_replies', None)
+        if replies is None:
+            replies = Comment.objects.filter(parent=obj, is_active=True).select_related('user')
         serializer = CommentSerializer(replies, many=True)
         return serializer.data
 
@@ -64,8 +167,9 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ArticleListSerializer(serializers.ModelSerializer):
+class ArticleListSerializer(PendingCounterMixin, serializers.ModelSerializer):
     """文章列表序列化器"""
+    counter_fields = ('view_count', 'like_count')
     category_name = serializers.CharField(source='category.name', read_only=True)
     author = UserBriefSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -78,8 +182,11 @@ class ArticleListSerializer(serializers.ModelSerializer):
         read_only_fields = ['view_count', 'like_count']
 
 
-class ArticleDetailSerializer(serializers.ModelSerializer):
+class ArticleDetailSerializer(PendingCounterMixin, serializers.ModelSerializer):
     """文章详情序列化器"""
+    counter_fields = ('view_count', 'like_count')
+    # 正文单独压缩存储，不是模型字段，需要显式声明
+    content = serializers.CharField()
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.filter(is_active=True),
@@ -97,22 +204,40 @@ class ArticleDetailSerializer(serializers.ModelSerializer):
     )
     attachments = AttachmentSerializer(many=True, read_only=True)
     comments = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
+    related = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
         fields = ['id', 'title', 'content', 'summary', 'category', 'category_id', 
                   'author', 'tags', 'tag_ids', 'status', 'is_pinned', 'view_count', 
                   'like_count', 'created_at', 'updated_at', 'published_at', 
-                  'attachments', 'comments']
+                  'attachments', 'comments', 'comment_count', 'related']
         read_only_fields = ['author', 'view_count', 'like_count', 'created_at', 'updated_at', 'published_at']
 
+    def _comment_thread(self, obj):
+        """一次查询加载整棵评论树，同一篇文章只加载一次"""
+        if getattr(obj, '_comment_thread', None) is None:
+            obj._comment_thread = load_comment_thread(obj.pk)
+        return obj._comment_thread
+
     def get_comments(self, obj):
-        """获取评论"""
-        # 只获取顶级评论，回复通过CommentSerializer的get_replies方法获取
-        comments = Comment.objects.filter(article=obj, parent=None, is_active=True)
+        """获取第一页顶级评论，后续页通过 /comments/?article=<id>&page=<n> 获取"""
+        comments = self._comment_thread(obj)[:CommentPagination.page_size]
         serializer = CommentSerializer(comments, many=True)
         return serializer.data
 
+    def get_comment_count(self, obj):
+        """顶级评论总数"""
+        return len(self._comment_thread(obj))
+
+    def get_related(self, obj):
+        """预先计算的相关文章，详情接口随文章一起取出；尚未计算时为空列表"""
+        try:
+            return obj.related_set.related
+        except RelatedArticleSet.DoesNotExist:
+            return []
+
     def create(self, validated_data):
         """创建文章"""
         tags_data = validated_data.pop('tags', [])
@@ -124,7 +249,28 @@ class ArticleDetailSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """更新文章"""
         tags_data = validated_data.pop('tags', None)
+        instance.revision_editor = self.context['request'].user
         article = super().update(instance, validated_data)
         if tags_data is not None:
             article.tags.set(tags_data)
-        return article
\ No newline at end of file
+        return article
+
+
+class ArticleRevisionSerializer(serializers.ModelSerializer):
+    """文章修订序列化器（不含正文）"""
+    editor = UserBriefSerializer(read_only=True)
+
+    class Meta:
+        model = ArticleRevision
+        fields = ['id', 'article', 'number', 'editor', 'title', 'summary', 'is_snapshot',
+                  'raw_size', 'stored_size', 'created_at']
+        read_only_fields = fields
+
+
+class ArticleRevisionDetailSerializer(ArticleRevisionSerializer):
+    """文章修订详情序列化器，正文由 get_revision 重建"""
+    content = serializers.CharField(read_only=True)
+
+    class Meta(ArticleRevisionSerializer.Meta):
+        fields = ArticleRevisionSerializer.Meta.fields + ['content']
+        read_only_fields = fields
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Tag, Article, Attachment
+from .caching import SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS, invalidate_responses
+from .category_closure import adjust_category_counts, insert_category, move_category
+from .revisions import record_revision
+from .tasks import reindex_article
+from .tag_counts import PUBLISHED, adjust_tag_counts, article_tag_ids, published_article_ids
+from .uploads import release_blob
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    """分类变更后清除分类树缓存"""
+    invalidate_responses(SCOPE_CATEGORIES, SCOPE_ARTICLES)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_changed(sender, **kwargs):
+    """标签变更后清除标签列表和文章的响应缓存"""
+    invalidate_responses(SCOPE_TAGS, SCOPE_ARTICLES)
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_content_changed(sender, **kwargs):
+    """文章及其标签变更后使文章列表的校验值失效（评论、附件不在列表中，详情按文章自身的校验值判断）"""
+    invalidate_responses(SCOPE_ARTICLES)
+
+
+@receiver(post_save, sender=get_user_model())
+def author_changed(sender, update_fields=None, **kwargs):
+    """作者昵称或头像变更后使文章列表的校验值失效（登录时只更新登录信息，不失效）"""
+    if update_fields is None or {'username', 'nickname', 'avatar', 'avatar_variants'}.intersection(update_fields):
+        invalidate_responses(SCOPE_ARTICLES)
+
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, created, **kwargs):
+    """文章标题、摘要或正文变更后提交重建检索索引的任务并记录修订版本，只改状态、计数等字段时不处理"""
+    if created or instance.text_changed():
+        # 连续多次保存只保留一个等待执行的索引任务
+        reindex_article.enqueue({'article_id': instance.pk}, dedup_key=f'wiki.index_article:{instance.pk}')
+        record_revision(instance, created, getattr(instance, 'revision_editor', None))
+
+
+@receiver(post_delete, sender=Attachment)
+def attachment_deleted(sender, instance, **kwargs):
+    """附件删除后释放对去重文件的引用"""
+    release_blob(instance.content_hash)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """文章增删标签后更新文章的修改时间，已发布文章还要更新标签计数（文章和标签两侧的增删都会触发）"""
+    through = Article.tags.through
+    if action in ('pre_remove', 'pre_clear'):
+        # 删除前记下实际存在的关联，remove() 可能传入未关联的ID
+        links = through.objects.filter(**{'tag_id' if reverse else 'article_id': instance.pk})
+        if pk_set is not None:
+            links = links.filter(**{'article_id__in' if reverse else 'tag_id__in': pk_set})
+        instance._removed_tag_links = list(links.values_list('article_id', 'tag_id'))
+        return
+    if action == 'post_add':
+        links = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        delta = 1
+    elif action in ('post_remove', 'post_clear'):
+        links = instance.__dict__.pop('_removed_tag_links', [])
+        delta = -1
+    else:
+        return
+    # 关联表的变化不修改文章行，更新修改时间使文章详情的校验值改变
+    article_ids = {article_id for article_id, _ in links}
+    if article_ids:
+        now = timezone.now()
+        Article.objects.filter(pk__in=article_ids).update(updated_at=now)
+        if not reverse:
+            instance.updated_at = now
+    published = set(published_article_ids(article_ids))
+    adjust_tag_counts([tag_id for article_id, tag_id in links if article_id in published], delta)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    """新建或移动分类后维护闭包表"""
+    if created:
+        insert_category(instance)
+    elif 'parent_id' in instance.__dict__ and instance.parent_id != instance._loaded_parent_id:
+        move_category(instance)
+    instance._loaded_parent_id = instance.__dict__.get('parent_id')
+
+
+@receiver(post_save, sender=Article)
+def article_category_counts(sender, instance, created, **kwargs):
+    """文章发布、取消发布或更换分类后更新分类子树的已发布文章数"""
+    if 'status' not in instance.__dict__ or 'category_id' not in instance.__dict__:
+        return
+    was_counted = not created and instance._loaded_status == PUBLISHED
+    old = instance._loaded_category_id if was_counted else None
+    new = instance.category_id if instance.status == PUBLISHED else None
+    if old != new:
+        adjust_category_counts(old, -1)
+        adjust_category_counts(new, 1)
+
+
+@receiver(post_save, sender=Article)
+def article_status_changed(sender, instance, created, **kwargs):
+    """文章发布或取消发布（归档、改回草稿）后更新其标签的计数"""
+    if created or 'status' not in instance.__dict__:
+        return
+    was_published = instance._loaded_status == PUBLISHED
+    is_published = instance.status == PUBLISHED
+    if was_published != is_published:
+        adjust_tag_counts(article_tag_ids([instance.pk]), 1 if is_published else -1)
+
+
+@receiver(pre_delete, sender=Article)
+def article_deleting(sender, instance, **kwargs):
+    """删除已发布文章前减少其标签和所属分类子树的计数（关联行随文章级联删除，不触发 m2m_changed）"""
+    if instance.status == PUBLISHED:
+        adjust_tag_counts(article_tag_ids([instance.pk]), -1)
+        adjust_category_counts(instance.category_id, -1)
@@ -0,0 +1,64 @@
+"""标签的已发布文章数
+
+``Tag.article_count`` 冗余保存每个标签下已发布文章的数量，标签云和标签列表直接读取，
+不必每次对文章标签关联表做 GROUP BY。计数由信号增量维护：
+
+- 已发布文章增删标签（``m2m_changed``）时，对应标签加减；
+- 文章在已发布与其他状态之间切换（发布、归档、编辑时修改状态）时，文章的全部标签加减；
+- 删除已发布文章时，文章的全部标签减一。
+
+``QuerySet.update()`` 和批量写入不触发信号，之后需要用 ``recount_tags`` 重新统计
+（``repair_tag_counts`` 命令）。
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .caching import SCOPE_TAGS, invalidate_responses
+from .models import Article, Tag
+
+PUBLISHED = 'published'
+
+
+def adjust_tag_counts(tag_ids, delta):
+    """按 ``delta`` 增减标签计数，``tag_ids`` 可以重复（重复的次数累加）"""
+    counts = {}
+    for tag_id in tag_ids:
+        counts[tag_id] = counts.get(tag_id, 0) + delta
+    # 相同增量的标签合并为一条 UPDATE
+    by_delta = {}
+    for tag_id, amount in counts.items():
+        if amount:
+            by_delta.setdefault(amount, []).append(tag_id)
+    for amount, ids in by_delta.items():
+        queryset = Tag.objects.filter(pk__in=ids)
+        if amount < 0:
+            # 计数已经偏低时不减到负数，等待 recount_tags 修复
+            queryset = queryset.filter(article_count__gte=-amount)
+        queryset.update(article_count=F('article_count') + amount)
+    if by_delta:
+        # 计数直接 UPDATE，不触发 Tag 的信号，手动使标签列表的校验值失效
+        invalidate_responses(SCOPE_TAGS)
+
+
+def article_tag_ids(article_ids):
+    return list(
+        Article.tags.through.objects.filter(article_id__in=article_ids).values_list('tag_id', flat=True)
+    )
+
+
+def published_article_ids(article_ids):
+    return list(Article.objects.filter(pk__in=article_ids, status=PUBLISHED).values_list('pk', flat=True))
+
+
+def recount_tags(tag_ids=None):
+    """按关联表重新统计标签计数，``tag_ids`` 为空时统计全部标签，返回更新的行数"""
+    published = (
+        Article.tags.through.objects.filter(tag_id=OuterRef('pk'), article__status=PUBLISHED)
+        .order_by().values('tag_id').annotate(total=Count('article_id')).values('total')
+    )
+    queryset = Tag.objects.all() if tag_ids is None else Tag.objects.filter(pk__in=tag_ids)
+    updated = queryset.update(
+        article_count=Coalesce(Subquery(published, output_field=IntegerField()), 0)
+    )
+    invalidate_responses(SCOPE_TAGS)
+    return updated
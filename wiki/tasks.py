@@ -0,0 +1,12 @@
+from jobs.queue import task
+
+from .models import Article
+from .search import index_article
+
+
+@task('wiki.index_article')
+def reindex_article(article_id):
+    """重建文章的检索索引，文章已删除时跳过"""
+    article = Article.objects.select_related('body').filter(pk=article_id).first()
+    if article is not None:
+        index_article(article)
@@ -0,0 +1,333 @@
+"""文章的 NDJSON 导出与导入
+
+每行一篇文章（一个 JSON 对象），标签、分类、作者和评论人以名称表示，便于导入到另一个库::
+
+    {"id": 1, "title": "...", "summary": "...", "content": "...", "status": "published",
+     "is_pinned": false, "view_count": 10, "like_count": 2, "author": "admin",
+     "category": ["后端", "数据库"], "tags": ["mysql", "索引"],
+     "created_at": "...", "updated_at": "...", "published_at": "...",
+     "comments": [{"id": 7, "parent": null, "user": "bob", "content": "...", "is_active": true,
+                   "created_at": "...", "updated_at": "..."}],
+     "attachments": [{"name": "...", "file": "wiki/attachments/...", "file_size": 1024,
+                      "content_hash": "...", "download_count": 0, "created_at": "...", "updated_at": "..."}]}
+
+``category`` 为从顶级分类到文章所属分类的名称路径。附件只导出元数据，文件本身不在导出内容中。
+
+导出按主键分批读取（``WHERE id > 上一批最大 ID ORDER BY id LIMIT n``），每批一次查询取文章和正文，
+标签、评论、附件各一次查询，内存占用只与批大小有关。PyMySQL 默认把整个结果集读入客户端，
+``QuerySet.iterator()`` 在 MySQL 上并不能减少内存，这里用主键分批代替服务端游标。
+
+导入时标签、分类、用户按名称在内存中映射为 ID，缺少的标签和分类自动创建。文章使用新的主键，
+文章、正文、基线修订版本、标签关联、评论、附件和检索词项按批 ``bulk_create``，每批一个事务。
+主键按 ``Max(id) + 1`` 预先分配，导入期间如有其他写入占用了这些主键，整批回滚后重新分配主键重试；
+重试仍冲突时导入失败，因此大批量导入应在停止写入（维护模式）时进行。
+"""
+import json
+from collections import Counter
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bodies import decode_body
+from .bulk import article_rows, explicit_timestamps, next_pk
+from .models import (
+    Article, ArticleBody, ArticleRevision, Attachment, Category, Comment, FileBlob, SearchTerm, Tag,
+)
+
+ARTICLE_FIELDS = (
+    'id', 'title', 'summary', 'status', 'is_pinned', 'view_count', 'like_count',
+    'created_at', 'updated_at', 'published_at',
+)
+COMMENT_FIELDS = ('id', 'parent_id', 'user__username', 'content', 'is_active', 'created_at', 'updated_at')
+ATTACHMENT_FIELDS = ('name', 'file', 'file_size', 'content_hash', 'download_count', 'created_at', 'updated_at')
+
+CONTENT_TYPE = 'application/x-ndjson'
+
+# 预分配的主键与并发写入冲突时，每批最多尝试的次数
+WRITE_ATTEMPTS = 3
+
+
+class TransferError(ValueError):
+    """导入内容格式错误"""
+
+
+def category_paths():
+    """一次查询取出全部分类，返回 {分类ID: [顶级分类名, ..., 分类名]}"""
+    rows = {pk: (name, parent_id) for pk, name, parent_id in Category.objects.values_list('id', 'name', 'parent_id')}
+    paths = {}
+    for pk in rows:
+        # 自下而上找到第一个已算出路径的祖先，再自上而下补齐
+        chain = []
+        node = pk
+        while node in rows and node not in paths:
+            chain.append(node)
+            node = rows[node][1]
+        prefix = paths.get(node, [])
+        for node in reversed(chain):
+            prefix = paths[node] = prefix + [rows[node][0]]
+    return paths
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'无法序列化 {type(value).__name__}')
+
+
+def dump_line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+
+
+def iter_articles(queryset=None, batch_size=500):
+    """按主键顺序逐批导出文章，逐篇生成记录字典"""
+    queryset = Article.objects.all() if queryset is None else queryset
+    queryset = queryset.order_by('pk').values(
+        *ARTICLE_FIELDS, 'category_id', 'author__username', 'body__codec', 'body__data',
+    )
+    paths = category_paths()
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not rows:
+            return
+        ids = [row['id'] for row in rows]
+        last_pk = ids[-1]
+
+        tags = {article_id: [] for article_id in ids}
+        for article_id, name in (
+            Article.tags.through.objects.filter(article_id__in=ids)
+            .order_by('article_id', 'tag__name').values_list('article_id', 'tag__name')
+        ):
+            tags[article_id].append(name)
+
+        comments = {article_id: [] for article_id in ids}
+        for comment in (
+            Comment.objects.filter(article_id__in=ids).order_by('article_id', 'id')
+            .values('article_id', *COMMENT_FIELDS)
+        ):
+            comments[comment.pop('article_id')].append({
+                'id': comment['id'], 'parent': comment['parent_id'], 'user': comment['user__username'],
+                'content': comment['content'], 'is_active': comment['is_active'],
+                'created_at': comment['created_at'], 'updated_at': comment['updated_at'],
+            })
+
+        attachments = {article_id: [] for article_id in ids}
+        for attachment in (
+            Attachment.objects.filter(article_id__in=ids).order_by('article_id', 'id')
+            .values('article_id', *ATTACHMENT_FIELDS)
+        ):
+            attachments[attachment.pop('article_id')].append(attachment)
+
+        for row in rows:
+            codec, data = row.pop('body__codec'), row.pop('body__data')
+            record = {field: row[field] for field in ARTICLE_FIELDS}
+            record['content'] = decode_body(codec, data) if data is not None else ''
+            record['author'] = row['author__username']
+            record['category'] = paths.get(row['category_id'], [])
+            record['tags'] = tags[row['id']]
+            record['comments'] = comments[row['id']]
+            record['attachments'] = attachments[row['id']]
+            yield record
+
+
+def export_ndjson(queryset=None, batch_size=500):
+    """导出为 NDJSON 文本块，每块包含一批文章，用于流式响应"""
+    lines = []
+    for record in iter_articles(queryset, batch_size):
+        lines.append(dump_line(record))
+        if len(lines) >= batch_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def _parse_time(value, default=None):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise TransferError(f'无效的时间：{value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class ArticleImporter:
+    """把 NDJSON 记录批量写入数据库
+
+    ``default_author`` 为找不到作者或评论人时使用的用户ID，为空时遇到未知用户报错。
+    ``stats`` 记录各类写入的行数。
+    """
+
+    def __init__(self, batch_size=500, default_author=None, index=True):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.index = index
+        self.tags = dict(Tag.objects.values_list('name', 'id'))
+        self.categories = {}
+        for pk, path in sorted(category_paths().items()):
+            self.categories.setdefault(tuple(path), pk)
+        self.users = dict(get_user_model().objects.values_list('username', 'id'))
+        self.statuses = {value for value, _ in Article.STATUS_CHOICES}
+        self.stats = Counter()
+
+    def load(self, lines, progress=None):
+        """读取 NDJSON 行并按批写入，每写完一批调用 ``progress(stats)``"""
+        batch = []
+        for number, line in enumerate(lines, 1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise TransferError(f'第 {number} 行不是有效的 JSON：{exc}')
+            if not isinstance(record, dict):
+                raise TransferError(f'第 {number} 行不是 JSON 对象')
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+                if progress:
+                    progress(self.stats)
+        if batch:
+            self.write(batch)
+            if progress:
+                progress(self.stats)
+        return self.stats
+
+    def user_id(self, username, number):
+        user_id = self.users.get(username)
+        if user_id is None:
+            if self.default_author is None:
+                raise TransferError(f'第 {number} 行：用户 {username} 不存在')
+            self.stats['unknown_users'] += 1
+            user_id = self.default_author
+        return user_id
+
+    def category_id(self, path, number):
+        if not path or not isinstance(path, list):
+            raise TransferError(f'第 {number} 行缺少分类')
+        parent_id = None
+        for depth in range(1, len(path) + 1):
+            key = tuple(path[:depth])
+            pk = self.categories.get(key)
+            if pk is None:
+                pk = Category.objects.create(name=key[-1], parent_id=parent_id).pk
+                self.categories[key] = pk
+                self.stats['categories'] += 1
+            parent_id = pk
+        return parent_id
+
+    def ensure_tags(self, names):
+        """批量创建缺少的标签并补充到名称映射"""
+        missing = {name for name in names if name not in self.tags}
+        if not missing:
+            return
+        Tag.objects.bulk_create([Tag(name=name) for name in sorted(missing)], ignore_conflicts=True)
+        self.tags.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        self.stats['tags'] += len(missing)
+
+    def write(self, batch):
+        """写入一批记录；预分配的主键被并发插入占用时回滚并重新分配主键重试"""
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            # 回滚后事务内新建的标签、分类已不存在，恢复名称映射和计数
+            tags, categories, stats = dict(self.tags), dict(self.categories), self.stats.copy()
+            try:
+                return self._write(batch)
+            except IntegrityError:
+                self.tags, self.categories, self.stats = tags, categories, stats
+                if attempt == WRITE_ATTEMPTS:
+                    raise
+
+    def _write(self, batch):
+        with transaction.atomic(), explicit_timestamps(Article, ArticleBody, Comment, Attachment):
+            self.ensure_tags({name for _, record in batch for name in record.get('tags') or ()})
+            hashes = {
+                attachment.get('content_hash') for _, record in batch
+                for attachment in record.get('attachments') or () if attachment.get('content_hash')
+            }
+            blobs = set(FileBlob.objects.filter(sha256__in=hashes).values_list('sha256', flat=True))
+            blob_refs = Counter()
+
+            article_pk, comment_pk, attachment_pk = next_pk(Article), next_pk(Comment), next_pk(Attachment)
+            articles, bodies, revisions, article_tags, comments, attachments, terms = [], [], [], [], [], [], []
+            for number, record in batch:
+                status = record.get('status') or 'draft'
+                if status not in self.statuses:
+                    raise TransferError(f'第 {number} 行：无效的状态 {status}')
+                if not record.get('title'):
+                    raise TransferError(f'第 {number} 行缺少标题')
+                created_at = _parse_time(record.get('created_at'), timezone.now())
+                article = Article(
+                    pk=article_pk, title=record['title'], summary=record.get('summary') or '',
+                    category_id=self.category_id(record.get('category'), number),
+                    author_id=self.user_id(record.get('author'), number),
+                    status=status, is_pinned=bool(record.get('is_pinned')),
+                    view_count=record.get('view_count') or 0, like_count=record.get('like_count') or 0,
+                    created_at=created_at, updated_at=_parse_time(record.get('updated_at'), created_at),
+                    published_at=_parse_time(record.get('published_at')),
+                )
+                articles.append(article)
+                body, revision, article_terms = article_rows(article, record.get('content') or '', self.index)
+                bodies.append(body)
+                revisions.append(revision)
+                terms.extend(article_terms)
+                article_tags.extend(
+                    Article.tags.through(article_id=article_pk, tag_id=tag_id)
+                    for tag_id in {self.tags[name] for name in record.get('tags') or ()}
+                )
+
+                # 评论按原ID顺序导出，父评论总在回复之前
+                comment_ids = {}
+                for comment in record.get('comments') or ():
+                    comment_at = _parse_time(comment.get('created_at'), created_at)
+                    comments.append(Comment(
+                        pk=comment_pk, article_id=article_pk, user_id=self.user_id(comment.get('user'), number),
+                        parent_id=comment_ids.get(comment.get('parent')), content=comment.get('content') or '',
+                        is_active=comment.get('is_active', True),
+                        created_at=comment_at, updated_at=_parse_time(comment.get('updated_at'), comment_at),
+                    ))
+                    comment_ids[comment.get('id')] = comment_pk
+                    comment_pk += 1
+
+                for attachment in record.get('attachments') or ():
+                    content_hash = attachment.get('content_hash') or ''
+                    if content_hash in blobs:
+                        blob_refs[content_hash] += 1
+                    else:
+                        self.stats['missing_files'] += 1
+                    attached_at = _parse_time(attachment.get('created_at'), created_at)
+                    attachments.append(Attachment(
+                        pk=attachment_pk, article_id=article_pk, name=attachment.get('name') or '',
+                        file=attachment.get('file') or '', file_size=attachment.get('file_size') or 0,
+                        content_hash=content_hash, download_count=attachment.get('download_count') or 0,
+                        created_at=attached_at, updated_at=_parse_time(attachment.get('updated_at'), attached_at),
+                    ))
+                    attachment_pk += 1
+                article_pk += 1
+
+            Article.objects.bulk_create(articles)
+            ArticleBody.objects.bulk_create(bodies)
+            ArticleRevision.objects.bulk_create(revisions)
+            Article.tags.through.objects.bulk_create(article_tags)
+            Comment.objects.bulk_create(comments, batch_size=2000)
+            Attachment.objects.bulk_create(attachments, batch_size=2000)
+            SearchTerm.objects.bulk_create(terms, batch_size=5000)
+            # 导入的附件与已有的去重文件共用一份文件
+            for content_hash, refs in blob_refs.items():
+                FileBlob.objects.filter(sha256=content_hash).update(ref_count=F('ref_count') + refs)
+
+        self.stats['articles'] += len(articles)
+        self.stats['comments'] += len(comments)
+        self.stats['attachments'] += len(attachments)
+        self.stats['rows'] += (
+            len(articles) + len(bodies) + len(revisions) + len(article_tags)
+            + len(comments) + len(attachments) + len(terms)
+        )
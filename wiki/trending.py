@@ -0,0 +1,160 @@
+"""热门文章
+
+浏览和点赞在计数缓冲写库后按时间段（默认 1 小时）累加到 ``ArticleActivity``，
+``compute_trending`` 命令定时计算热度并保存排行：
+
+    热度 = Σ (浏览数 × 浏览权重 + 点赞数 × 点赞权重) × 0.5 ^ (时间段距今的时长 / 半衰期)
+
+只统计最近 ``WIKI_TRENDING_WINDOW_DAYS`` 天内已发布文章的时间段。衰减系数按时间段预先算好，
+以 CASE 表达式交给数据库一次 GROUP BY 得到每篇文章的热度；逐行读取结果时用大小为 K 的堆
+分别维护全站及每个分类（含子分类）的前 K 名，内存占用与文章数无关。
+排行整体替换写入 ``TrendingArticle``，接口按 (分类, 排名) 索引读取，耗时与文章总数无关。
+"""
+import heapq
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .counters import counter_buffer
+from .models import Article, ArticleActivity, CategoryClosure, TrendingArticle
+
+FIELDS = {'view_count': 'views', 'like_count': 'likes'}
+
+
+def bucket_seconds():
+    return getattr(settings, 'WIKI_TRENDING_BUCKET_SECONDS', 3600)
+
+
+def bucket_start(moment=None):
+    """时刻所在时间段的开始时间"""
+    size = bucket_seconds()
+    seconds = int((moment or timezone.now()).timestamp())
+    return datetime.fromtimestamp(seconds - seconds % size, tz=dt_timezone.utc)
+
+
+def record_activity(deltas, moment=None):
+    """计数缓冲的监听函数：把文章的浏览、点赞增量累加到当前时间段"""
+    groups = defaultdict(list)
+    article_ids = set()
+    for (model, pk, field), amount in deltas.items():
+        if model is Article and field in FIELDS and amount > 0:
+            groups[(FIELDS[field], amount)].append(pk)
+            article_ids.add(pk)
+    if not article_ids:
+        return
+
+    bucket = bucket_start(moment)
+    # 先插入缺少的行（多个进程同时插入时忽略冲突），再按增量分组 UPDATE，不会丢失并发的增量
+    ArticleActivity.objects.bulk_create(
+        [ArticleActivity(article_id=pk, bucket=bucket) for pk in sorted(article_ids)], ignore_conflicts=True,
+    )
+    for (field, amount), pks in groups.items():
+        ArticleActivity.objects.filter(bucket=bucket, article_id__in=pks).update(**{field: F(field) + amount})
+
+
+counter_buffer.add_listener(record_activity)
+
+
+def decay_weights(now, start):
+    """从 ``start`` 到当前的每个时间段的衰减系数，按时间段中点计算时长"""
+    size = bucket_seconds()
+    half_life = getattr(settings, 'WIKI_TRENDING_HALF_LIFE_HOURS', 24) * 3600
+    weights = {}
+    bucket = start
+    while bucket <= now:
+        age = max((now - bucket).total_seconds() - size / 2, 0)
+        weights[bucket] = 0.5 ** (age / half_life)
+        bucket += timedelta(seconds=size)
+    return weights
+
+
+def score_expression(weights):
+    view_weight = getattr(settings, 'WIKI_TRENDING_VIEW_WEIGHT', 1)
+    like_weight = getattr(settings, 'WIKI_TRENDING_LIKE_WEIGHT', 5)
+    decay = Case(
+        *[When(bucket=bucket, then=Value(weight)) for bucket, weight in weights.items()],
+        default=Value(0.0), output_field=FloatField(),
+    )
+    return Sum((F('views') * view_weight + F('likes') * like_weight) * decay, output_field=FloatField())
+
+
+def _push(heap, size, item):
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def compute_trending(now=None, top_k=None, chunk_size=5000):
+    """计算热度并替换保存全站和各分类的前 K 名，清理窗口之外的时间段，返回统计信息"""
+    started = time.perf_counter()
+    now = now or timezone.now()
+    top_k = top_k or getattr(settings, 'WIKI_TRENDING_TOP_K', 100)
+    start = bucket_start(now - timedelta(days=getattr(settings, 'WIKI_TRENDING_WINDOW_DAYS', 7)))
+    weights = decay_weights(now, start)
+
+    # 分类排行包含子分类：文章计入所属分类及其全部祖先
+    ancestors = defaultdict(list)
+    for descendant_id, ancestor_id in CategoryClosure.objects.values_list('descendant_id', 'ancestor_id'):
+        ancestors[descendant_id].append(ancestor_id)
+
+    rows = (
+        ArticleActivity.objects.filter(bucket__gte=start, article__status='published')
+        .values('article_id', 'article__category_id').order_by()
+        .annotate(score=score_expression(weights))
+        .values_list('article_id', 'article__category_id', 'score')
+    )
+    overall, by_category = [], defaultdict(list)
+    scored = 0
+    for article_id, category_id, score in rows.iterator(chunk_size=chunk_size):
+        if not score:
+            continue
+        scored += 1
+        # 热度相同时 ID 大（较新）的文章在前
+        item = (score, article_id)
+        _push(overall, top_k, item)
+        for ancestor_id in ancestors.get(category_id, ()):
+            _push(by_category[ancestor_id], top_k, item)
+    computed = time.perf_counter()
+
+    entries = []
+    for category_id, heap in [(None, overall), *by_category.items()]:
+        for rank, (score, article_id) in enumerate(sorted(heap, reverse=True), 1):
+            entries.append(TrendingArticle(
+                category_id=category_id, rank=rank, article_id=article_id, score=score, computed_at=now,
+            ))
+    with transaction.atomic():
+        TrendingArticle.objects.all().delete()
+        TrendingArticle.objects.bulk_create(entries, batch_size=1000)
+
+    pruned = prune_activity(start)
+    return {
+        'articles': scored,
+        'entries': len(entries),
+        'pruned': pruned,
+        'compute_seconds': computed - started,
+        'total_seconds': time.perf_counter() - started,
+    }
+
+
+def prune_activity(before, batch_size=10000):
+    """分批删除早于 ``before`` 的时间段，避免一条 DELETE 长时间锁表"""
+    deleted = 0
+    while True:
+        ids = list(ArticleActivity.objects.filter(bucket__lt=before).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ArticleActivity.objects.filter(pk__in=ids).delete()[0]
+
+
+def get_trending(category_id=None, limit=None):
+    """读取排行，返回 [(文章ID, 热度), ...]"""
+    queryset = TrendingArticle.objects.filter(
+        **({'category_id': category_id} if category_id else {'category__isnull': True})
+    ).order_by('rank')
+    return list(queryset.values_list('article_id', 'score')[:limit])
@@ -0,0 +1,198 @@
+"""附件上传与按内容去重存储
+
+- 所有附件文件按 SHA-256 存放在 ``wiki/attachments/<前两位>/<哈希><扩展名>``，
+  内容相同的文件只存一份，由 FileBlob.ref_count 记录引用它的附件数，
+  最后一个附件删除时才删除文件；
+- 分块上传：客户端创建上传会话后按顺序 PUT 各个分块，每个分块边接收边写入临时文件并计算哈希，
+  连接中断后查询会话的 ``received_size`` 即可从断点继续；全部分块到齐后合并为附件。
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Attachment, FileBlob, UploadSession
+
+READ_SIZE = 64 * 1024
+UPLOAD_TMP_DIR = 'wiki/uploads'
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = '分块偏移量与已接收的数据不一致'
+    default_code = 'upload_conflict'
+
+
+def blob_name(sha256, filename):
+    ext = os.path.splitext(filename or '')[1].lower()[:16]
+    return f'wiki/attachments/{sha256[:2]}/{sha256}{ext}'
+
+
+def hash_file(fileobj):
+    """流式计算文件的 SHA-256，返回 (十六进制哈希, 大小)"""
+    digest = hashlib.sha256()
+    size = 0
+    chunks = fileobj.chunks(READ_SIZE) if hasattr(fileobj, 'chunks') else iter(lambda: fileobj.read(READ_SIZE), b'')
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(sha256, size, filename, content=None, path=None):
+    """获取内容哈希对应的文件并增加引用计数，不存在时保存新文件
+
+    新文件的内容来自 ``content``（Django File 对象）或本地临时文件 ``path``（直接移动，不复制）。
+    临时文件在事务提交后才移动，事务回滚时保留在原处，可以重新完成上传；
+    ``content`` 写入的文件在记录创建失败时删除。
+    """
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            return blob
+
+        name = blob_name(sha256, filename)
+        if path is None:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            content.seek(0)
+            name = default_storage.save(name, content)
+        try:
+            with transaction.atomic():
+                blob = FileBlob.objects.create(sha256=sha256, file=name, size=size, ref_count=1)
+        except IntegrityError:
+            # 并发上传了相同内容的文件，改为引用已存在的记录
+            blob = FileBlob.objects.select_for_update().get(sha256=sha256)
+            if path is None and blob.file.name != name:
+                default_storage.delete(name)
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            return blob
+        except Exception:
+            if path is None:
+                default_storage.delete(name)
+            raise
+        if path is not None:
+            transaction.on_commit(lambda: move_file(path, default_storage.path(name)))
+        return blob
+
+
+def move_file(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(source, target)
+
+
+def release_blob(sha256):
+    """减少引用计数，最后一个引用释放时删除文件"""
+    if not sha256:
+        return
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+        name = blob.file.name
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+
+def store_uploaded_file(uploaded_file):
+    """保存普通（非分块）上传的文件，返回 (FileBlob, 大小)"""
+    sha256, size = hash_file(uploaded_file)
+    blob = acquire_blob(sha256, size, uploaded_file.name, content=uploaded_file)
+    return blob, size
+
+
+def temp_path(session):
+    return default_storage.path(f'{UPLOAD_TMP_DIR}/{session.pk}.part')
+
+
+def append_chunk(session, stream, offset, expected_hash=None):
+    """把一个分块追加到上传会话
+
+    ``offset`` 必须等于已接收的字节数，否则抛出 UploadConflict（响应中带有当前的 received_size），
+    客户端据此从断点续传。分块内容从 ``stream`` 流式读取，边写边计算哈希，
+    提供 ``expected_hash`` 时校验分块的 SHA-256。
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != 'uploading':
+            raise ValidationError({'detail': '上传已完成'})
+        if offset != session.received_size:
+            raise UploadConflict({'detail': UploadConflict.default_detail, 'received_size': session.received_size})
+
+        limit = min(session.chunk_size, session.total_size - offset)
+        path = temp_path(session)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        written = 0
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            # 丢弃上次失败时残留的未确认数据
+            f.seek(offset)
+            f.truncate()
+            while True:
+                data = stream.read(min(READ_SIZE, limit - written + 1))
+                if not data:
+                    break
+                written += len(data)
+                if written > limit:
+                    f.truncate(offset)
+                    raise ValidationError({'detail': f'分块大小不能超过 {limit} 字节'})
+                digest.update(data)
+                f.write(data)
+            chunk_hash = digest.hexdigest()
+            if written == 0:
+                raise ValidationError({'detail': '分块内容为空'})
+            if expected_hash and expected_hash.lower() != chunk_hash:
+                f.truncate(offset)
+                raise ValidationError({'detail': '分块哈希校验失败', 'sha256': chunk_hash})
+
+        session.received_size = offset + written
+        session.chunk_hashes = session.chunk_hashes + [chunk_hash]
+        session.save(update_fields=['received_size', 'chunk_hashes', 'updated_at'])
+        return session
+
+
+def complete_upload(session):
+    """所有分块到齐后生成附件，重复调用返回同一个附件"""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'completed':
+            return session.attachment
+        if session.received_size != session.total_size:
+            raise ValidationError({'detail': '文件尚未上传完整', 'received_size': session.received_size})
+
+        path = temp_path(session)
+        with open(path, 'rb') as f:
+            sha256, size = hash_file(f)
+        blob = acquire_blob(sha256, size, session.filename, path=path)
+        attachment = Attachment.objects.create(
+            article_id=session.article_id,
+            name=session.name,
+            file=blob.file.name,
+            file_size=size,
+            content_hash=sha256,
+        )
+        session.status = 'completed'
+        session.attachment = attachment
+        session.save(update_fields=['status', 'attachment', 'updated_at'])
+        # 在移动文件之后执行：文件已存在时临时文件没有被移走，提交后删除
+        transaction.on_commit(lambda: discard_file(path))
+    return attachment
+
+
+def discard_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def discard_upload(session):
+    """删除上传会话及其临时文件"""
+    discard_file(temp_path(session))
+    session.delete()
@@ -1,12 +1,34 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import F
-from .models import Category, Tag, Article, Comment, Attachment
+from .models import Category, Tag, Article, ArticleBody, Comment, Attachment, UploadSession, ArticleRevision
+from .category_closure import in_subtree
+from .counters import counter_buffer
+from .category_tree import get_active_categories
+from .comments import load_comment_thread
+from .pagination import ArticlePagination, CommentPagination, RevisionPagination
+from .filters import ArticleSearchFilter
+from .search import highlight, snippet
+from .listing import article_list_plan, filter_articles
+from .downloads import serve_file
+from .uploads import append_chunk, complete_upload, discard_upload
+from .revisions import get_revision, diff_revisions
+from .transfer import CONTENT_TYPE as NDJSON_CONTENT_TYPE, export_ndjson
+from .trending import get_trending
+from .caching import (
+    SCOPE_ARTICLES, SCOPE_CATEGORIES, SCOPE_TAGS, conditional_response, response_versions,
+    annotate_article_stamps, article_stamp
+)
 from .serializers import (
-    CategorySerializer, TagSerializer, ArticleListSerializer, 
-    ArticleDetailSerializer, CommentSerializer, AttachmentSerializer
+    CategorySerializer, TagCountSerializer, ArticleListSerializer, 
+    ArticleDetailSerializer, CommentSerializer, AttachmentSerializer,
+    UploadSessionSerializer, ArticleRevisionSerializer, ArticleRevisionDetailSerializer,
+    check_article_editable,
 )
 from authority.permissions import IsOwnerOrAdmin, HasRolePermission
 
@@ -21,37 +43,60 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            return [HasRolePermission(['admin', 'editor'])()]
+            return [HasRolePermission(['admin', 'editor'])]
         return [permissions.IsAuthenticated()]
 
     @action(detail=False, methods=['get'])
     def all(self, request):
-        """获取所有分类（包括子分类）"""
-        categories = Category.objects.filter(is_active=True).order_by('sort_order')
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        """获取所有分类（包括子分类），直接使用缓存的分类树"""
+        return conditional_response(
+            request, SCOPE_CATEGORIES, [response_versions(SCOPE_CATEGORIES)], get_active_categories,
+        )
 
 
 class TagViewSet(viewsets.ModelViewSet):
     """标签视图集"""
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    serializer_class = TagCountSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            return [HasRolePermission(['admin', 'editor'])()]
+            return [HasRolePermission(['admin', 'editor'])]
         return [permissions.IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        """获取标签列表，标签未变化时返回 304 或缓存的响应"""
+        build = super().list
+        return conditional_response(
+            request, SCOPE_TAGS, [response_versions(SCOPE_TAGS)], lambda: build(request, *args, **kwargs).data
+        )
+
+    @action(detail=False, methods=['get'])
+    def cloud(self, request):
+        """标签云：已发布文章数最多的前 ``limit`` 个标签，按文章数倒序读取冗余计数的索引"""
+        size = getattr(settings, 'WIKI_TAG_CLOUD_SIZE', 50)
+        try:
+            limit = int(request.query_params.get('limit', size))
+        except ValueError:
+            limit = size
+        limit = min(max(limit, 1), getattr(settings, 'WIKI_TAG_CLOUD_MAX_SIZE', 200))
+
+        def build():
+            rows = Tag.objects.filter(article_count__gt=0).order_by('-article_count', 'name')
+            return list(rows.values('id', 'name', 'article_count')[:limit])
+
+        return conditional_response(request, SCOPE_TAGS, [response_versions(SCOPE_TAGS)], build)
+
 
 class ArticleViewSet(viewsets.ModelViewSet):
     """文章视图集"""
     queryset = Article.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['title', 'content', 'summary']
+    filter_backends = [ArticleSearchFilter]
+    pagination_class = ArticlePagination
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -61,73 +106,150 @@ class ArticleViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             return [IsOwnerOrAdmin()]
+        if self.action == 'export':
+            return [HasRolePermission(['admin'])]
         return [permissions.IsAuthenticated()]
 
     def get_queryset(self):
         """根据不同条件获取文章列表"""
-        queryset = Article.objects.all()
-        
-        # 根据状态筛选
-        status_param = self.request.query_params.get('status')
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-        else:
-            # 默认只显示已发布的文章
-            queryset = queryset.filter(status='published')
-        
-        # 根据分类筛选
-        category_id = self.request.query_params.get('category')
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-        
-        # 根据标签筛选
-        tag_id = self.request.query_params.get('tag')
-        if tag_id:
-            queryset = queryset.filter(tags__id=tag_id)
-        
-        # 根据作者筛选
-        author_id = self.request.query_params.get('author')
-        if author_id:
-            queryset = queryset.filter(author_id=author_id)
-        
         # 我的文章
-        if self.action == 'my_articles':
-            queryset = queryset.filter(author=self.request.user)
-        
-        # 置顶文章优先
-        queryset = queryset.order_by('-is_pinned', '-created_at')
+        mine = self.request.user.pk if self.action == 'my_articles' else None
+        queryset = filter_articles(self.request.query_params, author_id=mine)
+
+        # 正文单独存储，只在需要正文的接口中随文章一起取出
+        if self.action in ['retrieve', 'update', 'partial_update']:
+            queryset = queryset.select_related('body')
+
+        # 详情接口需要评论、附件的修改时间生成 ETag，相关文章随文章一起取出
+        if self.action == 'retrieve':
+            queryset = annotate_article_stamps(queryset.select_related('related_set'))
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """获取文章列表，使用快速序列化路径，内容未变化时返回 304 或缓存的响应"""
+        # 列表内容只随文章（含作者资料、分类和标签名称）变化，版本号即可校验，不对筛选结果做聚合；
+        # 检索在 build 中执行，返回 304 或命中缓存时不查询倒排索引
+        return conditional_response(
+            request, SCOPE_ARTICLES, [response_versions(SCOPE_ARTICLES)],
+            lambda: self._list_response(self.filter_queryset(self.get_queryset()), request).data,
+        )
+
+    def _list_response(self, queryset, request=None):
+        """只查询列表所需的列，标签一次查询取出，按字段计划生成响应"""
+        rows = article_list_plan.queryset(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(article_list_plan.serialize(page, request))
+        return Response(article_list_plan.serialize(rows, request))
+
     def retrieve(self, request, *args, **kwargs):
-        """获取文章详情，并增加浏览次数"""
+        """获取文章详情，并增加浏览次数；内容未变化时返回 304 或缓存的响应"""
         instance = self.get_object()
-        # 增加浏览次数
-        instance.view_count = F('view_count') + 1
-        instance.save(update_fields=['view_count'])
-        instance.refresh_from_db()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # 增加浏览次数，由计数缓冲区批量写库；返回 304 时同样计数
+        counter_buffer.incr_instance(instance, 'view_count')
+        # 详情中的分类带有文章数和子分类，随分类版本号变化
+        stamps = [response_versions(SCOPE_CATEGORIES), article_stamp(instance)]
+        return conditional_response(
+            request, SCOPE_ARTICLES, stamps,
+            lambda: self.get_serializer(instance).data,
+            vary_on_role=True,
+            refresh=lambda data: self.refresh_counters(instance, data),
+        )
+
+    @staticmethod
+    def refresh_counters(article, data):
+        """缓存的响应中计数可能已落后，叠加最新的未落库增量"""
+        counter_buffer.apply(article, 'view_count', 'like_count')
+        return dict(data, view_count=article.view_count, like_count=article.like_count)
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         """点赞文章"""
         article = self.get_object()
-        article.like_count = F('like_count') + 1
-        article.save(update_fields=['like_count'])
-        article.refresh_from_db()
+        counter_buffer.incr_instance(article, 'like_count')
+        counter_buffer.apply(article, 'like_count')
         return Response({'like_count': article.like_count})
 
     @action(detail=False, methods=['get'])
     def my_articles(self, request):
         """获取我的文章"""
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
+        return self._list_response(self.get_queryset())
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """热门文章：读取 compute_trending 预先计算的排行，``category`` 为分类（含子分类）"""
+        top_k = getattr(settings, 'WIKI_TRENDING_TOP_K', 100)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), top_k)
+        except ValueError:
+            limit = 20
+        category_id = request.query_params.get('category') or None
+        if category_id is not None:
+            try:
+                category_id = int(category_id)
+            except ValueError:
+                return Response({'detail': 'category 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+        entries = get_trending(category_id, limit)
+
+        # 排行计算后被取消发布或删除的文章不再返回
+        ids = [article_id for article_id, _ in entries]
+        rows = {row['id']: row for row in article_list_plan.queryset(Article.objects.filter(pk__in=ids, status='published'))}
+        data = article_list_plan.serialize([rows[article_id] for article_id in ids if article_id in rows], request)
+        scores = dict(entries)
+        for item in data:
+            item['score'] = round(scores[item['id']], 3)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """全文检索文章，按相关度排序并返回高亮的标题和正文摘要"""
+        query = ArticleSearchFilter().get_search_query(request)
+        if not query:
+            return Response({'detail': '请提供检索关键词'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 与列表一样只取列表所需的列，正文只为本页文章单独取出用于生成摘要
+        rows = article_list_plan.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else list(rows)
+        data = article_list_plan.serialize(rows, request)
+        bodies = {body.article_id: body.text for body in ArticleBody.objects.filter(article_id__in=[row['id'] for row in rows])}
+        for item, row in zip(data, rows):
+            item['highlight'] = {
+                'title': highlight(row['title'], query),
+                'snippet': snippet(query, [row['summary'], bodies.get(row['id'], '')]),
+            }
         if page is not None:
-            serializer = ArticleListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = ArticleListSerializer(queryset, many=True)
-        return Response(serializer.data)
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """流式导出文章为 NDJSON（每行一篇文章，含标签、分类路径、评论和附件元数据）
+
+        默认导出全部状态的文章，可按 ``status``、``category``（含子分类）、``tag``、``author`` 筛选。
+        """
+        params = {}
+        for param in ('category', 'tag', 'author'):
+            value = request.query_params.get(param)
+            if value:
+                # 查询在流式输出时才执行，参数需要预先校验，否则出错时响应已经开始
+                try:
+                    params[param] = int(value)
+                except ValueError:
+                    return Response({'detail': f'{param} 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Article.objects.all()
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+        for param, lookup in (('tag', 'tags__id'), ('author', 'author_id')):
+            if param in params:
+                queryset = queryset.filter(**{lookup: params[param]})
+        if 'category' in params:
+            queryset = queryset.filter(in_subtree(params['category']))
+        response = StreamingHttpResponse(export_ndjson(queryset), content_type=NDJSON_CONTENT_TYPE)
+        response['Content-Disposition'] = 'attachment; filename="articles.ndjson"'
+        return response
 
     @action(detail=True, methods=['post'])
     def publish(self, request, pk=None):
@@ -151,12 +273,60 @@ class ArticleViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(article)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def revisions(self, request, pk=None):
+        """获取文章的修订历史（不含正文），按版本号倒序分页"""
+        article = self.get_object()
+        queryset = article.revisions.select_related('editor').order_by('-number')
+        paginator = RevisionPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ArticleRevisionSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    def _get_revision(self, article, number):
+        try:
+            return get_revision(article.pk, int(number))
+        except (ArticleRevision.DoesNotExist, TypeError, ValueError):
+            raise NotFound(f'版本 {number} 不存在')
+
+    @action(detail=True, methods=['get'], url_path=r'revisions/(?P<number>[0-9]+)')
+    def revision(self, request, pk=None, number=None):
+        """获取指定版本的完整内容"""
+        revision = self._get_revision(self.get_object(), number)
+        serializer = ArticleRevisionDetailSerializer(revision, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='revisions/diff')
+    def revision_diff(self, request, pk=None):
+        """比较两个版本，``from`` 默认为 ``to`` 的前一版本，``to`` 默认为最新版本"""
+        article = self.get_object()
+        numbers = article.revisions.order_by('-number').values_list('number', flat=True)
+        to_number = request.query_params.get('to') or numbers.first()
+        from_number = request.query_params.get('from')
+        if from_number is None and to_number is not None:
+            try:
+                from_number = numbers.filter(number__lt=int(to_number)).first()
+            except ValueError:
+                pass
+        if from_number is None or to_number is None:
+            return Response({'detail': '没有可比较的版本'}, status=status.HTTP_400_BAD_REQUEST)
+
+        old = self._get_revision(article, from_number)
+        new = self._get_revision(article, to_number)
+        return Response({
+            'from': old.number,
+            'to': new.number,
+            'title': [old.title, new.title] if old.title != new.title else None,
+            'diff': diff_revisions(old, new),
+        })
+
 
 class CommentViewSet(viewsets.ModelViewSet):
     """评论视图集"""
     queryset = Comment.objects.filter(is_active=True)
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CommentPagination
 
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
@@ -169,12 +339,26 @@ class CommentViewSet(viewsets.ModelViewSet):
         article_id = self.request.query_params.get('article')
         if article_id:
             queryset = queryset.filter(article_id=article_id, parent=None)
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        """按文章获取评论时，一次加载整棵评论树后对顶级评论分页"""
+        article_id = request.query_params.get('article')
+        if not article_id:
+            return super().list(request, *args, **kwargs)
+
+        comments = load_comment_thread(article_id)
+        page = self.paginate_queryset(comments)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(comments, many=True)
+        return Response(serializer.data)
 
     def perform_destroy(self, instance):
         """软删除评论"""
         instance.is_active = False
-        instance.save(update_fields=['is_active'])
+        instance.save(update_fields=['is_active', 'updated_at'])
 
 
 class AttachmentViewSet(viewsets.ModelViewSet):
@@ -198,9 +382,54 @@ class AttachmentViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        """下载附件并增加下载次数"""
+        """下载附件（支持断点续传和条件请求），并增加下载次数"""
         attachment = self.get_object()
-        attachment.download_count = F('download_count') + 1
-        attachment.save(update_fields=['download_count'])
-        # 实际下载逻辑在前端处理，这里只增加下载次数
-        return Response({'detail': '下载次数已增加'})
\ No newline at end of file
+        response, is_new_download = serve_file(request, attachment.file, attachment.name)
+        if is_new_download:
+            counter_buffer.incr(Attachment, attachment.pk, 'download_count')
+        return response
+
+    def _get_upload_session(self, upload_id):
+        """获取当前用户的上传会话"""
+        try:
+            return UploadSession.objects.get(pk=upload_id, user_id=self.request.user.pk)
+        except (UploadSession.DoesNotExist, ValueError, ValidationError):
+            raise NotFound('上传会话不存在')
+
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        """创建分块上传会话"""
+        serializer = UploadSessionSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get', 'put', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)')
+    def upload(self, request, upload_id=None):
+        """查询上传进度（GET）、上传分块（PUT）或取消上传（DELETE）
+
+        PUT 请求体为分块的原始字节，``offset`` 查询参数为分块在文件中的起始位置，
+        可选的 ``X-Chunk-Sha256`` 请求头用于校验分块内容。
+        """
+        session = self._get_upload_session(upload_id)
+        if request.method == 'DELETE':
+            discard_upload(session)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PUT':
+            try:
+                offset = int(request.query_params.get('offset', session.received_size))
+            except ValueError:
+                return Response({'detail': 'offset 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+            # 直接读取原始请求体，不经过解析器，也不会整体读入内存
+            session = append_chunk(session, request._request, offset, request.headers.get('X-Chunk-Sha256'))
+        return Response(UploadSessionSerializer(session, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)/complete')
+    def finish_upload(self, request, upload_id=None):
+        """所有分块上传完成后生成附件"""
+        session = self._get_upload_session(upload_id)
+        # 创建会话后文章可能已转给他人，生成附件前再次检查
+        check_article_editable(request.user, session.article)
+        attachment = complete_upload(session)
+        serializer = self.get_serializer(attachment)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)